@@ -0,0 +1,138 @@
+import json
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from pathlib import Path
+
+import mysql.connector as mq
+from mysql.connector.errors import PoolError
+
+DEFAULT_POOL_SETTINGS = {
+    "size": 8,
+    "idle_timeout": 300,
+    "checkout_timeout": 10,
+}
+
+CONNECTION_FILE = Path(__file__).resolve().parent.parent / "connection.json"
+
+
+class MySQLConnectionPool:
+    """Pool de conexiones MySQL compartido por todo el proceso.
+
+    Mantiene como maximo `size` conexiones abiertas. Las conexiones ociosas por
+    mas de `idle_timeout` segundos se cierran, y cada conexion se verifica con un
+    ping antes de entregarse.
+    """
+
+    def __init__(self, db_config, size=8, idle_timeout=300, checkout_timeout=10):
+        self.db_config = db_config
+        self.size = size
+        self.idle_timeout = idle_timeout
+        self.checkout_timeout = checkout_timeout
+        self._idle = deque()
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(size)
+
+    def _evict_idle(self):
+        now = time.monotonic()
+        expired = []
+        with self._lock:
+            while self._idle and now - self._idle[0][1] > self.idle_timeout:
+                expired.append(self._idle.popleft()[0])
+        for conn in expired:
+            self._discard(conn)
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except mq.Error:
+            pass
+
+    def _is_healthy(self, conn):
+        try:
+            conn.ping(reconnect=False)
+            return True
+        except mq.Error:
+            return False
+
+    def acquire(self):
+        if not self._slots.acquire(timeout=self.checkout_timeout):
+            raise PoolError(
+                f"No hay conexiones disponibles tras {self.checkout_timeout}s "
+                f"(tamano del pool: {self.size})"
+            )
+        try:
+            self._evict_idle()
+            while True:
+                with self._lock:
+                    conn = self._idle.pop()[0] if self._idle else None
+                if conn is None:
+                    return mq.connect(**self.db_config)
+                if self._is_healthy(conn):
+                    return conn
+                self._discard(conn)
+        except Exception:
+            self._slots.release()
+            raise
+
+    def release(self, conn):
+        try:
+            conn.consume_results()
+            if conn.in_transaction:
+                conn.rollback()
+            with self._lock:
+                self._idle.append((conn, time.monotonic()))
+        except mq.Error:
+            self._discard(conn)
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = list(self._idle), deque()
+        for conn, _ in idle:
+            self._discard(conn)
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+_settings = None
+
+
+def load_connection_settings(path=CONNECTION_FILE):
+    global _settings
+    if _settings is None:
+        with open(path, "r") as file:
+            settings = json.load(file)
+        pool_settings = {**DEFAULT_POOL_SETTINGS, **settings.get("mysql_pool", {})}
+        _settings = (settings["mysql"], pool_settings)
+    return _settings
+
+
+def get_pool(db_config=None):
+    """Retorna el pool del proceso para `db_config` (por defecto connection.json)"""
+    if db_config is None:
+        db_config, pool_settings = load_connection_settings()
+    elif CONNECTION_FILE.exists():
+        pool_settings = load_connection_settings()[1]
+    else:
+        pool_settings = DEFAULT_POOL_SETTINGS
+
+    key = tuple(sorted(db_config.items()))
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = MySQLConnectionPool(db_config, **pool_settings)
+        return _pools[key]
+
+
+def pooled_connection(db_config=None):
+    return get_pool(db_config).connection()
@@ -1,8 +1,117 @@
-queries = {
-    "a": """
+from datetime import date
+
+import pandas as pd
+
+LIGHT = "light"
+HEAVY = "heavy"
+
+COST_TTL = {
+    LIGHT: 300,
+    HEAVY: 900,
+}
+
+# dtype de pandas para cada tipo declarado; los enteros y textos admiten nulos
+COLUMN_DTYPES = {
+    int: "Int64",
+    float: "float64",
+    str: "string",
+}
+
+
+class RegisteredQuery:
+    def __init__(self, query_id, sql, columns, tables, params=(), cost=LIGHT):
+        self.query_id = query_id
+        self.sql = sql
+        self.columns = list(columns)
+        self.tables = tuple(tables)
+        self.params = tuple(params)
+        self.cost = cost
+
+    @property
+    def column_names(self):
+        return [name for name, _ in self.columns]
+
+    @property
+    def ttl(self):
+        return COST_TTL[self.cost]
+
+    def bind(self, params=()):
+        """Parametros en el orden declarado, a partir de una tupla o de un dict"""
+        if isinstance(params, dict):
+            missing = [name for name in self.params if name not in params]
+            if missing:
+                raise ValueError(
+                    f"Faltan parametros de la consulta '{self.query_id}': {missing}"
+                )
+            return tuple(params[name] for name in self.params)
+
+        params = tuple(params or ())
+        if len(params) != len(self.params):
+            raise ValueError(
+                f"La consulta '{self.query_id}' recibe {len(self.params)} "
+                f"parametros {list(self.params)}, no {len(params)}"
+            )
+        return params
+
+    def apply_types(self, df):
+        """Verifica las columnas del resultado y las convierte a los tipos declarados"""
+        if list(df.columns) != self.column_names:
+            raise ValueError(
+                f"La consulta '{self.query_id}' retorno {list(df.columns)}, "
+                f"se esperaba {self.column_names}"
+            )
+        for name, column_type in self.columns:
+            if column_type is date:
+                df[name] = pd.to_datetime(df[name], errors="coerce").dt.date
+            else:
+                df[name] = df[name].astype(COLUMN_DTYPES[column_type])
+        return df
+
+
+class QueryRegistry:
+    """Consultas del ejercicio junto con las tablas que leen, sus parametros y su costo"""
+
+    def __init__(self):
+        self._queries = {}
+
+    def register(self, query_id, sql, columns, tables, params=(), cost=LIGHT):
+        if query_id in self._queries:
+            raise ValueError(f"La consulta '{query_id}' ya esta registrada")
+        query = RegisteredQuery(query_id, sql, columns, tables, params, cost)
+        self._queries[query_id] = query
+        return query
+
+    def __getitem__(self, query_id):
+        return self._queries[query_id]
+
+    def __contains__(self, query_id):
+        return query_id in self._queries
+
+    def __iter__(self):
+        return iter(self._queries.values())
+
+    def by_cost(self, cost):
+        return [query for query in self if query.cost == cost]
+
+    def reading(self, table):
+        return [query for query in self if table in query.tables]
+
+
+registry = QueryRegistry()
+
+registry.register(
+    "a",
+    sql="""
         SELECT * FROM Producto
         """,
-    "b": """
+    columns=[("IDProd", int), ("Nombre", str), ("Descripcion", str), ("Precio", float)],
+    tables=["Producto"],
+    cost=LIGHT,
+)
+
+registry.register(
+    "b",
+    sql="""
         SELECT
             usu.Nombre AS Nombre_Autor,
             pub.Texto,
@@ -14,7 +123,19 @@ queries = {
         GROUP BY pub.IDPub, usu.Nombre, pub.Texto
         ORDER BY Cantidad_Reacciones DESC
         """,
-    "c": """
+    columns=[
+        ("Nombre_Autor", str),
+        ("Texto", str),
+        ("IDPub", int),
+        ("Cantidad_Reacciones", int),
+    ],
+    tables=["Publicacion", "Usuario", "Reaccionar"],
+    cost=LIGHT,
+)
+
+registry.register(
+    "c",
+    sql="""
         SELECT
             plt.Categoria,
             COUNT(*) AS Total_Reacciones_Positivas
@@ -24,7 +145,14 @@ queries = {
         ORDER BY Total_Reacciones_Positivas DESC
         LIMIT 3
         """,
-    "d": """
+    columns=[("Categoria", str), ("Total_Reacciones_Positivas", int)],
+    tables=["Gustar", "Planta"],
+    cost=LIGHT,
+)
+
+registry.register(
+    "d",
+    sql="""
         SELECT
             usu.IDU,
             usu.Nombre,
@@ -42,7 +170,20 @@ queries = {
         GROUP BY usu.IDU, usu.Nombre, usu.Email, usu.DireccionParticular
         HAVING Ultima_Fecha_Actividad > '0000-00-00'
         """,
-    "e": """
+    columns=[
+        ("IDU", int),
+        ("Nombre", str),
+        ("Email", str),
+        ("DireccionParticular", str),
+        ("Ultima_Fecha_Actividad", date),
+    ],
+    tables=["Usuario", "Reaccionar", "Contribucion"],
+    cost=LIGHT,
+)
+
+registry.register(
+    "e",
+    sql="""
         SELECT
             pub.IDPub,
             pub.Texto,
@@ -63,7 +204,21 @@ queries = {
         HAVING Positivas > Negativas
         ORDER BY Total_Reacciones DESC
         """,
-    "f": """
+    columns=[
+        ("IDPub", int),
+        ("Texto", str),
+        ("Nombre_Autor", str),
+        ("Total_Reacciones", int),
+        ("Positivas", int),
+        ("Negativas", int),
+    ],
+    tables=["Publicacion", "Usuario", "Reaccionar"],
+    cost=LIGHT,
+)
+
+registry.register(
+    "f",
+    sql="""
         SELECT DISTINCT
             plt.NombreComun AS Planta
         FROM Planta plt
@@ -75,7 +230,14 @@ queries = {
         ) = 1
         AND c1.Fecha <> c2.Fecha
         """,
-    "g": """
+    columns=[("Planta", str)],
+    tables=["Planta", "Contribucion"],
+    cost=LIGHT,
+)
+
+registry.register(
+    "g",
+    sql="""
         WITH UsuarioMultimedia AS (
             SELECT
                 pub.IDU,
@@ -105,7 +267,14 @@ queries = {
         WHERE tu.Ranking <= 10
         ORDER BY tu.Ranking
         """,
-    "h": """
+    columns=[("IDU", int), ("Nombre", str), ("Promedio_Actividad_Mensual", float)],
+    tables=["Publicacion", "Tener_Foto", "Reaccionar", "Usuario"],
+    cost=HEAVY,
+)
+
+registry.register(
+    "h",
+    sql="""
         WITH UsuariosEdad AS (
             SELECT
                 IDU,
@@ -132,7 +301,14 @@ queries = {
         GROUP BY Rango_Edad
         ORDER BY MIN(Edad)
         """,
-    "i": """
+    columns=[("Rango_Edad", str), ("Cantidad_Usuarios", int), ("Porcentaje", float)],
+    tables=["Usuario"],
+    cost=LIGHT,
+)
+
+registry.register(
+    "i",
+    sql="""
         WITH VentasMensuales AS (
             SELECT
                 IDProd,
@@ -164,7 +340,14 @@ queries = {
         JOIN Producto prod ON vm.IDProd = prod.IDProd
         WHERE vm.IDProd NOT IN (SELECT IDProd FROM ProductosConIncremento)
         """,
-    "j": """
+    columns=[("IDProd", int), ("Nombre", str)],
+    tables=["Compra", "Producto"],
+    cost=HEAVY,
+)
+
+registry.register(
+    "j",
+    sql="""
         WITH ContribucionesPorClima AS (
             SELECT
                 p.IDC,
@@ -188,7 +371,14 @@ queries = {
         WHERE cp.Ranking = 1
         ORDER BY cli.Tipo
         """,
-    "k": """
+    columns=[("Clima", str), ("Planta_Mas_Popular", str), ("Num_Contribuciones", int)],
+    tables=["Contribucion", "Planta", "Clima"],
+    cost=HEAVY,
+)
+
+registry.register(
+    "k",
+    sql="""
         WITH ContribucionesAnuales AS (
             SELECT
                 c.IDU,
@@ -236,7 +426,21 @@ queries = {
         FROM CambiosCategoria cc
         JOIN Usuario usu ON cc.IDU = usu.IDU
         """,
-    "l": """
+    columns=[
+        ("IDU", int),
+        ("Nombre", str),
+        ("Anio1", int),
+        ("Categoria1", str),
+        ("Anio2", int),
+        ("Categoria2", str),
+    ],
+    tables=["Contribucion", "Planta", "Usuario"],
+    cost=HEAVY,
+)
+
+registry.register(
+    "l",
+    sql="""
         WITH ComprasAnalizadas AS (
             SELECT
                 com.IDUC AS IDU,
@@ -268,7 +472,19 @@ queries = {
         WHERE rc.Compras_No_Gustadas > rc.Compras_Gustadas
         ORDER BY rc.Compras_No_Gustadas DESC
         """,
-    "m": """
+    columns=[
+        ("IDU", int),
+        ("Nombre", str),
+        ("Compras_Gustadas", int),
+        ("Compras_No_Gustadas", int),
+    ],
+    tables=["Compra", "Gustar", "Usuario"],
+    cost=LIGHT,
+)
+
+registry.register(
+    "m",
+    sql="""
         SELECT
             usu.IDU,
             usu.Nombre,
@@ -288,7 +504,14 @@ queries = {
         )
         ORDER BY usu.IDU
         """,
-    "n": """
+    columns=[("IDU", int), ("Nombre", str), ("Email", str)],
+    tables=["Usuario", "Publicacion", "Tener_Foto"],
+    cost=LIGHT,
+)
+
+registry.register(
+    "n",
+    sql="""
         SELECT
             usu.IDU AS ID_Vendedor,
             usu.Nombre AS Nombre_Vendedor,
@@ -304,37 +527,15 @@ queries = {
         ORDER BY Calificacion_Promedio DESC
         LIMIT 5
         """,
-}
-
-
-columns = {
-    "a": ["IDProd", "Nombre", "Descripcion", "Precio"],
-    "b": ["Nombre_Autor", "Texto", "IDPub", "Cantidad_Reacciones"],
-    "c": ["Categoria", "Total_Reacciones_Positivas"],
-    "d": ["IDU", "Nombre", "Email", "DireccionParticular", "Ultima_Fecha_Actividad"],
-    "e": [
-        "IDPub",
-        "Texto",
-        "Nombre_Autor",
-        "Total_Reacciones",
-        "Positivas",
-        "Negativas",
-    ],
-    "f": ["Planta"],
-    "g": ["IDU", "Nombre", "Promedio_Actividad_Mensual"],
-    "h": ["Rango_Edad", "Cantidad_Usuarios", "Porcentaje"],
-    "i": ["IDProd", "Nombre"],
-    "j": ["Clima", "Planta_Mas_Popular", "Num_Contribuciones"],
-    "k": ["IDU", "Nombre", "Anio1", "Categoria1", "Anio2", "Categoria2"],
-    "l": ["IDU", "Nombre", "Compras_Gustadas", "Compras_No_Gustadas"],
-    "m": ["IDU", "Nombre", "Email"],
-    "n": [
-        "ID_Vendedor",
-        "Nombre_Vendedor",
-        "Email",
-        "DireccionParticular",
-        "Total_Productos_Vendidos",
-        "Calificacion_Promedio",
-        "Unidades_Vendidas",
+    columns=[
+        ("ID_Vendedor", int),
+        ("Nombre_Vendedor", str),
+        ("Email", str),
+        ("DireccionParticular", str),
+        ("Total_Productos_Vendidos", int),
+        ("Calificacion_Promedio", float),
+        ("Unidades_Vendidas", int),
     ],
-}
+    tables=["Compra", "Usuario", "Producto"],
+    cost=LIGHT,
+)
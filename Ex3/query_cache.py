@@ -0,0 +1,115 @@
+import threading
+import time
+from collections import OrderedDict, defaultdict
+
+DEFAULT_TTL = 300
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+_MISSING = object()
+
+
+def _result_size(result):
+    if result is None:
+        return 0
+    return int(result.memory_usage(index=True, deep=True).sum())
+
+
+class QueryResultCache:
+    """Cache LRU de DataFrames por (query, parametros).
+
+    Cada entrada expira tras su TTL y se descarta en cuanto se escribe en alguna
+    de las tablas que lee. El tamano total se limita a `max_bytes`. Cada tabla
+    lleva un contador de invalidaciones para no guardar un resultado que se
+    leyo antes de una escritura que termino durante la carga.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, default_ttl=DEFAULT_TTL):
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self._entries = OrderedDict()
+        self._keys_by_table = defaultdict(set)
+        self._total_bytes = 0
+        self._generations = defaultdict(int)
+        self._epoch = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(query_id, params):
+        return (query_id, tuple(params or ()))
+
+    def _remove(self, key):
+        result, expires_at, size, tables = self._entries.pop(key)
+        self._total_bytes -= size
+        for table in tables:
+            self._keys_by_table[table].discard(key)
+
+    def get(self, query_id, params=(), default=None):
+        key = self._key(query_id, params)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            if entry[1] <= time.monotonic():
+                self._remove(key)
+                return default
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def generation(self, tables=()):
+        """Marca de invalidaciones de `tables`; se pasa a `put` tras la carga"""
+        with self._lock:
+            return self._epoch, tuple(self._generations[table] for table in tables)
+
+    def put(self, query_id, result, params=(), tables=(), ttl=None, generation=None):
+        key = self._key(query_id, params)
+        size = _result_size(result)
+        if size > self.max_bytes:
+            return
+        expires_at = time.monotonic() + (ttl or self.default_ttl)
+        with self._lock:
+            current = (self._epoch, tuple(self._generations[table] for table in tables))
+            if generation is not None and generation != current:
+                return
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (result, expires_at, size, tuple(tables))
+            self._total_bytes += size
+            for table in tables:
+                self._keys_by_table[table].add(key)
+            while self._total_bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+
+    def get_or_load(self, query_id, loader, params=(), tables=(), ttl=None):
+        result = self.get(query_id, params, default=_MISSING)
+        if result is _MISSING:
+            generation = self.generation(tables)
+            result = loader()
+            self.put(query_id, result, params, tables, ttl, generation)
+        return result
+
+    def invalidate(self, query_id, params=()):
+        key = self._key(query_id, params)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def invalidate_tables(self, *tables):
+        with self._lock:
+            for table in tables:
+                self._generations[table] += 1
+                for key in list(self._keys_by_table.get(table, ())):
+                    self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_table.clear()
+            self._total_bytes = 0
+            self._epoch += 1
+
+
+_cache = QueryResultCache()
+
+
+def get_query_cache():
+    return _cache
@@ -0,0 +1,180 @@
+import pandas as pd
+
+# Agregados por vendedor calculados en una sola pasada sobre Compra. La tabla
+# se agrupa una vez por (vendedor, producto, comprador) y de ahi se derivan las
+# estadisticas de precio, calificaciones polarizadas y compradores unicos.
+SELLER_FEATURES_SQL = """
+    WITH Base AS (
+        SELECT
+            IDUV,
+            IDProd,
+            IDUC,
+            COUNT(*) AS Ventas,
+            SUM(Precio) AS Suma_Precio,
+            SUM(Precio * Precio) AS Suma_Precio2,
+            SUM(Puntuacion = 1) AS count_1,
+            SUM(Puntuacion = 2) AS count_2,
+            SUM(Puntuacion = 3) AS count_3,
+            SUM(Puntuacion = 4) AS count_4,
+            SUM(Puntuacion = 5) AS count_5,
+            COUNT(Puntuacion) AS total_ratings
+        FROM Compra
+        GROUP BY IDUV, IDProd, IDUC
+    ),
+    ProductRatings AS (
+        SELECT
+            IDUV,
+            IDProd,
+            SUM(count_1) AS count_1,
+            SUM(count_5) AS count_5,
+            SUM(count_2 + count_3 + count_4) AS count_middle,
+            SUM(total_ratings) AS total_ratings
+        FROM Base
+        GROUP BY IDUV, IDProd
+    ),
+    PolarizedProducts AS (
+        SELECT
+            IDUV,
+            COUNT(*) AS Productos_Polarizados,
+            AVG(count_1) AS Promedio_1_estrella,
+            AVG(count_5) AS Promedio_5_estrella,
+            AVG(count_middle) AS Promedio_medio
+        FROM ProductRatings
+        WHERE total_ratings >= 5
+            AND (count_1 + count_5) > count_middle * 2
+            AND count_1 > 0
+            AND count_5 > 0
+        GROUP BY IDUV
+    ),
+    Vendedores AS (
+        SELECT
+            IDUV,
+            COUNT(DISTINCT IDProd) AS Productos_Diferentes,
+            SUM(Suma_Precio) / SUM(Ventas) AS Precio_Promedio,
+            SQRT(GREATEST(
+                SUM(Suma_Precio2) / SUM(Ventas) - POW(SUM(Suma_Precio) / SUM(Ventas), 2),
+                0
+            )) AS Desviacion_Precio,
+            COUNT(DISTINCT IDUC) AS Compradores_Unicos
+        FROM Base
+        GROUP BY IDUV
+    )
+    SELECT
+        v.IDUV AS Vendedor,
+        u.Nombre,
+        v.Productos_Diferentes,
+        v.Precio_Promedio,
+        v.Desviacion_Precio,
+        v.Compradores_Unicos,
+        COALESCE(pp.Productos_Polarizados, 0) AS Productos_Polarizados,
+        pp.Promedio_1_estrella,
+        pp.Promedio_5_estrella,
+        pp.Promedio_medio
+    FROM Vendedores v
+    LEFT JOIN PolarizedProducts pp ON v.IDUV = pp.IDUV
+    LEFT JOIN Usuario u ON v.IDUV = u.IDU
+    ORDER BY v.IDUV
+"""
+
+SELLER_FEATURE_COLUMNS = [
+    ("Vendedor", int),
+    ("Nombre", object),
+    ("Productos_Diferentes", int),
+    ("Precio_Promedio", float),
+    ("Desviacion_Precio", float),
+    ("Compradores_Unicos", int),
+    ("Productos_Polarizados", int),
+    ("Promedio_1_estrella", float),
+    ("Promedio_5_estrella", float),
+    ("Promedio_medio", float),
+]
+
+SELLER_FEATURE_TABLES = ("Compra", "Usuario")
+
+SUSPICIOUS_TOP = 5
+
+
+def load_seller_features(conn):
+    """Retorna un DataFrame con una fila de estadisticas por vendedor"""
+    cursor = conn.cursor()
+    cursor.execute(SELLER_FEATURES_SQL)
+    rows = cursor.fetchall()
+    cursor.close()
+
+    return pd.DataFrame(
+        rows, columns=[name for name, _ in SELLER_FEATURE_COLUMNS]
+    ).astype(dict(SELLER_FEATURE_COLUMNS))
+
+
+def price_variation(features, lower, upper):
+    """Vendedores con desviacion de precio en (lower, upper]"""
+    mask = (features["Desviacion_Precio"] > lower) & (
+        features["Desviacion_Precio"] <= upper
+    )
+    return features[mask].sort_values("Desviacion_Precio", ascending=False)
+
+
+def polarized_ratings(features, min_products=2):
+    """Vendedores con al menos `min_products` productos de calificacion polarizada"""
+    mask = features["Productos_Polarizados"] >= min_products
+    return features[mask].sort_values("Productos_Polarizados", ascending=False)
+
+
+def unique_buyers(features, lower, upper):
+    """Vendedores con compradores unicos en [lower, upper]"""
+    mask = features["Compradores_Unicos"].between(lower, upper)
+    return features[mask].sort_values("Compradores_Unicos")
+
+
+def suspicious_sellers(pattern1, pattern2, pattern3, top=SUSPICIOUS_TOP):
+    """Combina los primeros `top` vendedores de cada patron en un resumen"""
+    evidence = pd.concat(
+        [
+            pd.DataFrame(
+                {
+                    "Vendedor": pattern1["Vendedor"],
+                    "Nombre": pattern1["Nombre"],
+                    "Evidencia": pattern1["Desviacion_Precio"].map(
+                        "Desviación: {:.2f}".format
+                    ),
+                }
+            ).head(top),
+            pd.DataFrame(
+                {
+                    "Vendedor": pattern2["Vendedor"],
+                    "Nombre": pattern2["Nombre"],
+                    "Evidencia": pattern2["Promedio_5_estrella"].map(
+                        "Desv. calificación: {:.2f}".format
+                    ),
+                }
+            ).head(top),
+            pd.DataFrame(
+                {
+                    "Vendedor": pattern3["Vendedor"],
+                    "Nombre": pattern3["Nombre"],
+                    "Evidencia": pattern3["Compradores_Unicos"].map(
+                        "Compradores: {}".format
+                    ),
+                }
+            ).head(top),
+        ]
+    )
+    if evidence.empty:
+        return evidence
+
+    evidence["Nombre"] = evidence["Nombre"].fillna(
+        "Vendedor " + evidence["Vendedor"].astype(str)
+    )
+    summary = evidence.groupby(["Vendedor", "Nombre"], sort=False).agg(
+        Patrones=("Evidencia", "size"), Evidencias=("Evidencia", "; ".join)
+    )
+    summary = summary.reset_index().sort_values(
+        "Patrones", ascending=False, kind="stable"
+    )
+    summary.columns = [
+        "ID Vendedor",
+        "Nombre",
+        "Patrones Detectados",
+        "Evidencias",
+    ]
+    return summary
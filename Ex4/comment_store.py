@@ -0,0 +1,123 @@
+from typing import Protocol
+
+COMMENT_BACKEND_MYSQL = "mysql"
+COMMENT_BACKEND_NEO4J = "neo4j"
+DEFAULT_COMMENT_BACKEND = COMMENT_BACKEND_NEO4J
+
+COMMENT_PAGE_SIZE = 20
+
+
+class CommentStore(Protocol):
+    """Operaciones comunes de los sistemas de comentarios.
+
+    Los comentarios se devuelven como diccionarios con `id`, `texto`,
+    `fechaCreacion`, `user_id` y `responses`; los metodos paginados agregan
+    `reply_count`.
+    """
+
+    def add_comment(self, user_id, publication_id, text, parent_id=None): ...
+
+    def add_comments_bulk(self, comments, batch_size=1000): ...
+
+    def delete_comments(self, comment_ids): ...
+
+    def get_full_conversation(self, publication_id): ...
+
+    def get_comment_page(
+        self, publication_id, parent_id=None, limit=COMMENT_PAGE_SIZE, after=None
+    ): ...
+
+    def get_conversation(
+        self,
+        publication_id,
+        limit=COMMENT_PAGE_SIZE,
+        after=None,
+        max_depth=1,
+        replies_limit=5,
+    ): ...
+
+    def get_all_publications(self): ...
+
+    def get_all_users(self): ...
+
+    def create_test_conversations(self, publication_id=1, user_id=1): ...
+
+    def clear_comments(self): ...
+
+    def close(self): ...
+
+
+def comment_node(row):
+    """Nodo de comentario a partir de una fila con `reply_count`"""
+    return {
+        "id": row["id"],
+        "texto": row["texto"],
+        "fechaCreacion": row["fechaCreacion"],
+        "user_id": row["user_id"],
+        "reply_count": row["reply_count"],
+        "responses": [],
+    }
+
+
+def comment_page(rows, limit):
+    """Arma una pagina a partir de `limit + 1` filas ordenadas por (fecha, id)"""
+    comments = [comment_node(row) for row in rows[:limit]]
+    next_cursor = None
+    if len(rows) > limit:
+        next_cursor = (comments[-1]["fechaCreacion"], comments[-1]["id"])
+    return {"comments": comments, "next_cursor": next_cursor}
+
+
+def build_comment_tree(publication_id, rows):
+    """Arbol de conversacion a partir de filas con `id` y `parent_id`.
+
+    Las filas deben venir ordenadas por fecha; las respuestas cuyo padre no
+    esta en `rows` se descartan.
+    """
+    nodes = {
+        row["id"]: {
+            "id": row["id"],
+            "texto": row["texto"],
+            "fechaCreacion": row["fechaCreacion"],
+            "user_id": row["user_id"],
+            "responses": [],
+        }
+        for row in rows
+    }
+
+    roots = []
+    for row in rows:
+        parent_id = row["parent_id"]
+        if parent_id is None:
+            roots.append(nodes[row["id"]])
+        else:
+            parent = nodes.get(parent_id)
+            if parent is not None:
+                parent["responses"].append(nodes[row["id"]])
+
+    return {
+        "Publicacion": publication_id,
+        "comments": roots,
+        "total_comments": len(nodes),
+    }
+
+
+def open_comment_store(connections):
+    """Crea el sistema de comentarios indicado en `comments.backend`"""
+    settings = connections.get("comments", {})
+    backend = settings.get("backend", DEFAULT_COMMENT_BACKEND)
+
+    if backend == COMMENT_BACKEND_MYSQL:
+        from comments_mysql import STORAGE_ADJACENCY, MySqlCommentSystem
+
+        return MySqlCommentSystem(
+            connections["mysql"],
+            storage=settings.get("mysql_storage", STORAGE_ADJACENCY),
+        )
+    if backend == COMMENT_BACKEND_NEO4J:
+        from comments_neo4j import Neo4jCommentSystem
+
+        return Neo4jCommentSystem(
+            **connections["neo4j"], mysql_db_connection=connections["mysql"]
+        )
+    raise ValueError(f"Backend de comentarios desconocido: {backend}")
@@ -0,0 +1,497 @@
+import argparse
+import json
+import random
+import statistics
+import time
+import tracemalloc
+from datetime import datetime
+from urllib.parse import urlparse
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from comment_store import (
+    COMMENT_BACKEND_MYSQL,
+    COMMENT_BACKEND_NEO4J,
+    open_comment_store,
+)
+from comments_mysql import STORAGE_ADJACENCY, STORAGE_CLOSURE, MySqlCommentSystem
+from comments_neo4j import LEGACY_CONVERSATION_QUERY, Neo4jCommentSystem
+
+BENCHMARK_PUBLICATION = 1
+BENCHMARK_USER = 1
+BENCHMARK_DEPTH = 6
+BENCHMARK_FANOUT = 3
+BENCHMARK_REPEATS = 20
+BENCHMARK_ROOTS = 200
+BENCHMARK_REPLIES = 4
+BENCHMARK_SINGLE_WRITES = 50
+
+# Carga sintetica de la suite: `threads` hilos repartidos entre publicaciones
+# con pesos 1 / rango**skew (skew=0 es uniforme; valores mayores concentran
+# los hilos en pocas publicaciones "virales"). Cada comentario recibe entre 0 y
+# 2 * fanout respuestas hasta `depth` niveles.
+SUITE_THREADS = 100
+SUITE_FANOUT = 3
+SUITE_DEPTH = 3
+SUITE_SKEW = 1.2
+SUITE_PUBLICATIONS = 20
+SUITE_USERS = 50
+SUITE_SEED = 42
+SUITE_OUTPUT = "comments_benchmark.json"
+
+LOCAL_HOSTS = {"localhost", "127.0.0.1", "::1"}
+
+
+def build_thread(system, depth, fanout, publication_id, user_id):
+    """Crea un hilo de `depth` niveles con `fanout` respuestas por comentario.
+
+    Retorna el id de la raiz y los ids de las hojas.
+    """
+    root_id = system.add_comment(user_id, publication_id, "Benchmark raíz")
+    level = [root_id]
+    for d in range(1, depth + 1):
+        next_level = []
+        for parent_id in level:
+            for i in range(fanout):
+                next_level.append(
+                    system.add_comment(
+                        user_id, publication_id, f"Benchmark {d}.{i}", parent_id
+                    )
+                )
+        level = next_level
+    return root_id, level
+
+
+def time_call(fn, repeats):
+    """Tiempos en milisegundos de `repeats` llamadas a `fn`"""
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return times
+
+
+def benchmark_storage(
+    db_config,
+    storage,
+    depth=BENCHMARK_DEPTH,
+    fanout=BENCHMARK_FANOUT,
+    repeats=BENCHMARK_REPEATS,
+    publication_id=BENCHMARK_PUBLICATION,
+    user_id=BENCHMARK_USER,
+):
+    """Mide escritura y lecturas de un hilo sintetico en el modo `storage`.
+
+    El hilo se elimina al terminar.
+    """
+    system = MySqlCommentSystem(db_config, storage=storage)
+    start = time.perf_counter()
+    root_id, leaves = build_thread(system, depth, fanout, publication_id, user_id)
+    write_seconds = time.perf_counter() - start
+    comments = sum(fanout**d for d in range(depth + 1))
+
+    try:
+        results = {
+            "Escritura (ms/comentario)": [write_seconds * 1000 / comments],
+            "Subárbol completo": time_call(
+                lambda: system.get_subtree(root_id), repeats
+            ),
+            "Subárbol 2 niveles": time_call(
+                lambda: system.get_subtree(root_id, max_depth=2), repeats
+            ),
+            "Contar descendientes": time_call(
+                lambda: system.count_descendants(root_id), repeats
+            ),
+            "Ancestros de una hoja": time_call(
+                lambda: system.get_ancestors(leaves[-1]), repeats
+            ),
+        }
+    finally:
+        system.delete_comments([root_id])
+        system.close()
+
+    return {name: statistics.median(times) for name, times in results.items()}
+
+
+def print_comparison(results):
+    """Imprime una tabla con una columna por modo o backend"""
+    names = list(results)
+    print(f"{'Operación (mediana)':<32}" + "".join(f"{name:>14}" for name in names))
+    for operation in results[names[0]]:
+        print(
+            f"{operation:<32}"
+            + "".join(f"{results[name][operation]:>14.3f}" for name in names)
+        )
+
+
+def compare_storages(db_config, **kwargs):
+    """Ejecuta el benchmark en ambos modos e imprime la comparacion"""
+    results = {
+        storage: benchmark_storage(db_config, storage, **kwargs)
+        for storage in (STORAGE_ADJACENCY, STORAGE_CLOSURE)
+    }
+    print_comparison(results)
+    return results
+
+
+def benchmark_store(
+    store,
+    roots=BENCHMARK_ROOTS,
+    replies=BENCHMARK_REPLIES,
+    single_writes=BENCHMARK_SINGLE_WRITES,
+    repeats=BENCHMARK_REPEATS,
+    publication_id=BENCHMARK_PUBLICATION,
+    user_id=BENCHMARK_USER,
+):
+    """Mide escritura y lectura de un CommentStore con una carga fija.
+
+    Crea `roots` comentarios raiz con `replies` respuestas cada uno por
+    `add_comments_bulk`, luego `single_writes` respuestas con `add_comment`, y
+    mide las lecturas de la publicacion. Los comentarios se eliminan al
+    terminar.
+    """
+    start = time.perf_counter()
+    root_ids = store.add_comments_bulk(
+        [(user_id, publication_id, f"Benchmark raíz {i}", None) for i in range(roots)]
+    )
+    store.add_comments_bulk(
+        [
+            (user_id, publication_id, f"Benchmark respuesta {j}", root_id)
+            for root_id in root_ids
+            for j in range(replies)
+        ]
+    )
+    bulk_seconds = time.perf_counter() - start
+
+    try:
+        results = {
+            "Escritura masiva (coment./s)": [roots * (1 + replies) / bulk_seconds],
+            "add_comment (ms)": time_call(
+                lambda: store.add_comment(
+                    user_id, publication_id, "Benchmark", parent_id=root_ids[0]
+                ),
+                single_writes,
+            ),
+            "get_full_conversation (ms)": time_call(
+                lambda: store.get_full_conversation(publication_id), repeats
+            ),
+            "get_conversation (ms)": time_call(
+                lambda: store.get_conversation(publication_id), repeats
+            ),
+            "get_comment_page respuestas (ms)": time_call(
+                lambda: store.get_comment_page(publication_id, parent_id=root_ids[0]),
+                repeats,
+            ),
+        }
+    finally:
+        store.delete_comments(root_ids)
+
+    return {name: statistics.median(values) for name, values in results.items()}
+
+
+def compare_stores(connections, **kwargs):
+    """Ejecuta la misma carga sobre MySQL y Neo4j e imprime la comparacion"""
+    results = {}
+    for backend in (COMMENT_BACKEND_MYSQL, COMMENT_BACKEND_NEO4J):
+        settings = {**connections.get("comments", {}), "backend": backend}
+        store = open_comment_store({**connections, "comments": settings})
+        try:
+            results[backend] = benchmark_store(store, **kwargs)
+        finally:
+            store.close()
+    print_comparison(results)
+    return results
+
+
+def print_conversation_plans(neo4j_config, publication_id=BENCHMARK_PUBLICATION):
+    """Imprime el PROFILE de la consulta de conversacion anterior y la actual"""
+    system = Neo4jCommentSystem(**neo4j_config)
+    try:
+        print("Plan anterior (relaciones PERTENECE_A / RESPONDE_A / ESCRIBIO):")
+        print(system.profile_conversation(publication_id, LEGACY_CONVERSATION_QUERY))
+        print()
+        print("Plan actual (indice comentario_pub_fecha):")
+        print(system.profile_conversation(publication_id))
+    finally:
+        system.close()
+
+
+def ensure_local(connections, allowed_hosts=()):
+    """Falla si MySQL o Neo4j no apuntan a un host local.
+
+    La suite escribe y borra comentarios, por lo que solo debe correr contra los
+    contenedores de docker-compose. `allowed_hosts` admite nombres de servicio
+    de Docker (por ejemplo "mysql" o "neo4j").
+    """
+    hosts = {
+        connections["mysql"].get("host", "localhost"),
+        urlparse(connections["neo4j"]["uri"]).hostname,
+    }
+    remote = sorted(hosts - LOCAL_HOSTS - set(allowed_hosts))
+    if remote:
+        raise ValueError(
+            f"El benchmark solo se ejecuta contra contenedores locales: {remote}"
+        )
+
+
+def percentiles(values):
+    """p50, p95, p99 y media de una lista de latencias"""
+    if len(values) < 2:
+        value = values[0] if values else 0.0
+        return {"p50": value, "p95": value, "p99": value, "media": value}
+    cuts = statistics.quantiles(values, n=100, method="inclusive")
+    return {
+        "p50": cuts[49],
+        "p95": cuts[94],
+        "p99": cuts[98],
+        "media": statistics.fmean(values),
+    }
+
+
+def generate_threads(
+    publications,
+    users,
+    threads=SUITE_THREADS,
+    fanout=SUITE_FANOUT,
+    depth=SUITE_DEPTH,
+    skew=SUITE_SKEW,
+    seed=SUITE_SEED,
+):
+    """Genera los comentarios de hilos sinteticos, nivel por nivel.
+
+    Cada comentario es (user_id, publication_id, text, parent_index), donde
+    parent_index es la posicion del padre en el nivel anterior. Con la misma
+    semilla, publicaciones y usuarios la carga es identica entre backends.
+    """
+    rng = random.Random(seed)
+    weights = [1 / rank**skew for rank in range(1, len(publications) + 1)]
+    thread_publications = rng.choices(publications, weights=weights, k=threads)
+
+    levels = [
+        [
+            (rng.choice(users), publication_id, f"Carga raíz {i}", None)
+            for i, publication_id in enumerate(thread_publications)
+        ]
+    ]
+    for d in range(1, depth + 1):
+        level = []
+        for parent_index, (_, publication_id, _, _) in enumerate(levels[-1]):
+            for j in range(rng.randint(0, 2 * fanout)):
+                level.append(
+                    (rng.choice(users), publication_id, f"Carga {d}.{j}", parent_index)
+                )
+        if not level:
+            break
+        levels.append(level)
+    return levels
+
+
+def write_threads(store, levels, batch_size=1000):
+    """Escribe los niveles con add_comments_bulk.
+
+    Retorna los ids de las raices y los segundos empleados.
+    """
+    start = time.perf_counter()
+    created = []
+    for level in levels:
+        parent_ids = created[-1] if created else []
+        comments = [
+            (
+                user_id,
+                publication_id,
+                text,
+                None if parent_index is None else parent_ids[parent_index],
+            )
+            for user_id, publication_id, text, parent_index in level
+        ]
+        created.append(store.add_comments_bulk(comments, batch_size))
+    return created[0], time.perf_counter() - start
+
+
+def measure_reads(store, publication_ids, repeats):
+    """Latencias de get_full_conversation y memoria pico de los arboles"""
+    latencies = []
+    tracemalloc.start()
+    try:
+        for _ in range(repeats):
+            for publication_id in publication_ids:
+                start = time.perf_counter()
+                store.get_full_conversation(publication_id)
+                latencies.append((time.perf_counter() - start) * 1000)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return latencies, peak
+
+
+def run_suite(
+    connections,
+    backends=(COMMENT_BACKEND_MYSQL, COMMENT_BACKEND_NEO4J),
+    threads=SUITE_THREADS,
+    fanout=SUITE_FANOUT,
+    depth=SUITE_DEPTH,
+    skew=SUITE_SKEW,
+    publications=SUITE_PUBLICATIONS,
+    users=SUITE_USERS,
+    seed=SUITE_SEED,
+    repeats=BENCHMARK_REPEATS,
+    output=SUITE_OUTPUT,
+    allowed_hosts=(),
+):
+    """Ejecuta la carga sintetica en cada backend y guarda el reporte en JSON"""
+    ensure_local(connections, allowed_hosts)
+    config = {
+        "threads": threads,
+        "fanout": fanout,
+        "depth": depth,
+        "skew": skew,
+        "publications": publications,
+        "users": users,
+        "seed": seed,
+        "repeats": repeats,
+    }
+    results = {}
+
+    for backend in backends:
+        settings = {**connections.get("comments", {}), "backend": backend}
+        store = open_comment_store({**connections, "comments": settings})
+        try:
+            levels = generate_threads(
+                store.get_all_publications()[:publications],
+                store.get_all_users()[:users],
+                threads,
+                fanout,
+                depth,
+                skew,
+                seed,
+            )
+            total = sum(len(level) for level in levels)
+            root_ids, write_seconds = write_threads(store, levels)
+            try:
+                read_publications = sorted({row[1] for row in levels[0]})
+                latencies, peak = measure_reads(store, read_publications, repeats)
+            finally:
+                store.delete_comments(root_ids)
+        finally:
+            store.close()
+
+        results[backend] = {
+            "comentarios": total,
+            "escritura_comentarios_por_s": total / write_seconds,
+            "lectura_get_full_conversation_ms": percentiles(latencies),
+            "memoria_pico_lectura_mb": peak / 1024 / 1024,
+            "rss_max_mb": (
+                resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+                if resource
+                else None
+            ),
+        }
+        print(
+            f"{backend}: {total} comentarios, "
+            f"{results[backend]['escritura_comentarios_por_s']:.0f} coment./s, "
+            "p50/p95/p99 = "
+            + "/".join(
+                f"{results[backend]['lectura_get_full_conversation_ms'][p]:.1f}"
+                for p in ("p50", "p95", "p99")
+            )
+            + " ms"
+        )
+
+    report = {
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "config": config,
+        "resultados": results,
+    }
+    with open(output, "w") as file:
+        json.dump(report, file, indent=2)
+    print(f"Reporte guardado en {output}")
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmarks del sistema de comentarios"
+    )
+    parser.add_argument(
+        "comparacion",
+        choices=["storage", "stores", "plan", "suite"],
+        help=(
+            "storage: modos adjacency/closure de MySQL; stores: MySQL contra "
+            "Neo4j; plan: PROFILE de la lectura de conversaciones en Neo4j; "
+            "suite: carga sintetica con reporte JSON"
+        ),
+    )
+    parser.add_argument(
+        "--publication",
+        type=int,
+        help="Publicacion usada por storage, stores y plan (suite genera las suyas)",
+    )
+    parser.add_argument("--depth", type=int)
+    parser.add_argument("--fanout", type=int)
+    parser.add_argument("--roots", type=int, default=BENCHMARK_ROOTS)
+    parser.add_argument("--replies", type=int, default=BENCHMARK_REPLIES)
+    parser.add_argument("--repeats", type=int, default=BENCHMARK_REPEATS)
+    parser.add_argument("--threads", type=int, default=SUITE_THREADS)
+    parser.add_argument("--skew", type=float, default=SUITE_SKEW)
+    parser.add_argument("--publications", type=int, default=SUITE_PUBLICATIONS)
+    parser.add_argument("--users", type=int, default=SUITE_USERS)
+    parser.add_argument("--seed", type=int, default=SUITE_SEED)
+    parser.add_argument("--output", default=SUITE_OUTPUT)
+    parser.add_argument(
+        "--backends",
+        nargs="+",
+        choices=[COMMENT_BACKEND_MYSQL, COMMENT_BACKEND_NEO4J],
+        default=[COMMENT_BACKEND_MYSQL, COMMENT_BACKEND_NEO4J],
+    )
+    parser.add_argument(
+        "--allow-host",
+        action="append",
+        default=[],
+        help="Host adicional permitido, p. ej. el nombre del servicio en Docker",
+    )
+    args = parser.parse_args()
+    if args.comparacion == "suite" and args.publication is not None:
+        parser.error("--publication no aplica a suite; use --publications")
+    publication_id = args.publication or BENCHMARK_PUBLICATION
+
+    with open("connection.json", "r") as connections:
+        connection_settings = json.load(connections)
+    ensure_local(connection_settings, args.allow_host)
+
+    if args.comparacion == "storage":
+        compare_storages(
+            connection_settings["mysql"],
+            depth=args.depth or BENCHMARK_DEPTH,
+            fanout=args.fanout or BENCHMARK_FANOUT,
+            repeats=args.repeats,
+            publication_id=publication_id,
+        )
+    elif args.comparacion == "suite":
+        run_suite(
+            connection_settings,
+            backends=args.backends,
+            threads=args.threads,
+            fanout=args.fanout or SUITE_FANOUT,
+            depth=args.depth or SUITE_DEPTH,
+            skew=args.skew,
+            publications=args.publications,
+            users=args.users,
+            seed=args.seed,
+            repeats=args.repeats,
+            output=args.output,
+            allowed_hosts=args.allow_host,
+        )
+    elif args.comparacion == "plan":
+        print_conversation_plans(connection_settings["neo4j"], publication_id)
+    else:
+        compare_stores(
+            connection_settings,
+            roots=args.roots,
+            replies=args.replies,
+            repeats=args.repeats,
+            publication_id=publication_id,
+        )
@@ -3,10 +3,174 @@ from datetime import datetime
 import mysql.connector as mq
 import pandas as pd
 
+from comment_store import (
+    COMMENT_PAGE_SIZE,
+    build_comment_tree,
+    comment_node,
+    comment_page,
+)
+
+COMMENT_SEQUENCE = "ComentarRec"
+
+MIGRATION_BATCH_SIZE = 1000
+
+INSERT_COMMENT_QUERY = "INSERT INTO ComentarRec (IDComentario, IDU, IDPub, Texto, IDPadre) VALUES (%s, %s, %s, %s, %s)"
+
+MIGRATE_COMMENTS_QUERY = """
+    INSERT INTO ComentarRec (IDU, IDPub, Texto, IDPadre)
+    SELECT IDU, IDPub, Comentario, NULL FROM Comentar
+"""
+
+# Indices compuestos para paginar por publicacion y por comentario padre
+COMMENT_INDEXES = {
+    "idx_comentarrec_pub_fecha": "(IDPub, FechaCreacion)",
+    "idx_comentarrec_padre_fecha": "(IDPadre, FechaCreacion)",
+}
+
+COMMENT_COLUMNS = """
+    c.IDComentario AS id,
+    c.Texto AS texto,
+    c.FechaCreacion AS fechaCreacion,
+    c.IDPadre AS parent_id,
+    c.IDU AS user_id,
+    (SELECT COUNT(*) FROM ComentarRec r WHERE r.IDPadre = c.IDComentario) AS reply_count
+"""
+
+
+STORAGE_ADJACENCY = "adjacency"
+STORAGE_CLOSURE = "closure"
+
+# Una fila por cada par (ancestro, descendiente) del arbol, incluido el propio
+# comentario con profundidad 0
+CLOSURE_TABLE_QUERY = """
+    CREATE TABLE IF NOT EXISTS ComentarioAncestro (
+        Ancestro INT NOT NULL,
+        Descendiente INT NOT NULL,
+        Profundidad INT NOT NULL,
+        PRIMARY KEY (Ancestro, Profundidad, Descendiente),
+        INDEX idx_comentarioancestro_descendiente (Descendiente, Profundidad),
+        FOREIGN KEY (Ancestro) REFERENCES ComentarRec(IDComentario) ON DELETE CASCADE,
+        FOREIGN KEY (Descendiente) REFERENCES ComentarRec(IDComentario) ON DELETE CASCADE
+    );
+"""
+
+CLOSURE_INSERT_QUERY = """
+    INSERT INTO ComentarioAncestro (Ancestro, Descendiente, Profundidad)
+    SELECT %s, %s, 0
+    UNION ALL
+    SELECT Ancestro, %s, Profundidad + 1
+    FROM ComentarioAncestro
+    WHERE Descendiente = %s
+"""
+
+CLOSURE_BACKFILL_QUERY = """
+    INSERT INTO ComentarioAncestro (Ancestro, Descendiente, Profundidad)
+    WITH RECURSIVE Cierre AS (
+        SELECT IDComentario AS Ancestro, IDComentario AS Descendiente, 0 AS Profundidad
+        FROM ComentarRec
+        UNION ALL
+        SELECT ci.Ancestro, c.IDComentario, ci.Profundidad + 1
+        FROM ComentarRec c
+        JOIN Cierre ci ON c.IDPadre = ci.Descendiente
+    )
+    SELECT Ancestro, Descendiente, Profundidad FROM Cierre
+"""
+
+
+# Subarbol de un comentario; parametros (id, max_depth, max_depth)
+SUBTREE_QUERIES = {
+    STORAGE_ADJACENCY: f"""
+        WITH RECURSIVE Hilo AS (
+            SELECT IDComentario, 0 AS Profundidad
+            FROM ComentarRec
+            WHERE IDComentario = %s
+            UNION ALL
+            SELECT c.IDComentario, h.Profundidad + 1
+            FROM ComentarRec c
+            JOIN Hilo h ON c.IDPadre = h.IDComentario
+            WHERE %s IS NULL OR h.Profundidad < %s
+        )
+        SELECT {COMMENT_COLUMNS}
+        FROM Hilo h
+        JOIN ComentarRec c ON c.IDComentario = h.IDComentario
+        ORDER BY h.Profundidad, c.FechaCreacion, c.IDComentario
+    """,
+    STORAGE_CLOSURE: f"""
+        SELECT {COMMENT_COLUMNS}
+        FROM ComentarioAncestro ca
+        JOIN ComentarRec c ON c.IDComentario = ca.Descendiente
+        WHERE ca.Ancestro = %s AND (%s IS NULL OR ca.Profundidad <= %s)
+        ORDER BY ca.Profundidad, c.FechaCreacion, c.IDComentario
+    """,
+}
+
+# Ancestros de un comentario, de la raiz hacia abajo
+ANCESTORS_QUERIES = {
+    STORAGE_ADJACENCY: f"""
+        WITH RECURSIVE Ancestros AS (
+            SELECT IDComentario, IDPadre, 0 AS Nivel
+            FROM ComentarRec
+            WHERE IDComentario = %s
+            UNION ALL
+            SELECT c.IDComentario, c.IDPadre, a.Nivel + 1
+            FROM ComentarRec c
+            JOIN Ancestros a ON c.IDComentario = a.IDPadre
+        )
+        SELECT {COMMENT_COLUMNS}
+        FROM Ancestros a
+        JOIN ComentarRec c ON c.IDComentario = a.IDComentario
+        WHERE a.Nivel > 0
+        ORDER BY a.Nivel DESC
+    """,
+    STORAGE_CLOSURE: f"""
+        SELECT {COMMENT_COLUMNS}
+        FROM ComentarioAncestro ca
+        JOIN ComentarRec c ON c.IDComentario = ca.Ancestro
+        WHERE ca.Descendiente = %s AND ca.Profundidad > 0
+        ORDER BY ca.Profundidad DESC
+    """,
+}
+
+DESCENDANTS_QUERIES = {
+    STORAGE_ADJACENCY: """
+        WITH RECURSIVE Hilo AS (
+            SELECT IDComentario FROM ComentarRec WHERE IDPadre = %s
+            UNION ALL
+            SELECT c.IDComentario
+            FROM ComentarRec c
+            JOIN Hilo h ON c.IDPadre = h.IDComentario
+        )
+        SELECT COUNT(*) FROM Hilo
+    """,
+    STORAGE_CLOSURE: """
+        SELECT COUNT(*)
+        FROM ComentarioAncestro
+        WHERE Ancestro = %s AND Profundidad > 0
+    """,
+}
+
+
+def ensure_comment_indexes(cursor):
+    """Crea los indices de COMMENT_INDEXES que aun no existan en ComentarRec"""
+    cursor.execute(
+        """
+        SELECT DISTINCT INDEX_NAME
+        FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'ComentarRec'
+    """
+    )
+    existing = {row[0] for row in cursor.fetchall()}
+    for name, columns in COMMENT_INDEXES.items():
+        if name not in existing:
+            cursor.execute(f"CREATE INDEX {name} ON ComentarRec {columns}")
+
 
 class MySqlCommentSystem:
-    def __init__(self, db_config):
+    def __init__(self, db_config, storage=STORAGE_ADJACENCY):
+        if storage not in (STORAGE_ADJACENCY, STORAGE_CLOSURE):
+            raise ValueError(f"Modo de almacenamiento desconocido: {storage}")
         self.db_config = db_config
+        self.storage = storage
         self.connection = self.get_db_connection()
         self.init_database()
 
@@ -29,6 +193,14 @@ class MySqlCommentSystem:
         """
 
         cursor.execute(init_query)
+        ensure_comment_indexes(cursor)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS SecuenciaId (
+                Nombre VARCHAR(50) NOT NULL,
+                Valor BIGINT NOT NULL,
+                PRIMARY KEY (Nombre)
+            );
+        """)
 
         cursor.execute("SELECT COUNT(*) FROM ComentarRec")
         count = cursor.fetchone()[0]
@@ -36,34 +208,139 @@ class MySqlCommentSystem:
         if count == 0:
             self.migrate_comments()
 
+        # La secuencia nunca queda por debajo de los ids ya usados
+        cursor.execute(
+            """
+            INSERT INTO SecuenciaId (Nombre, Valor)
+            SELECT %s, COALESCE(MAX(IDComentario), 0) FROM ComentarRec
+            ON DUPLICATE KEY UPDATE Valor = GREATEST(Valor, VALUES(Valor))
+        """,
+            (COMMENT_SEQUENCE,),
+        )
+
+        if self.storage == STORAGE_CLOSURE:
+            cursor.execute(CLOSURE_TABLE_QUERY)
+            self._sync_closure(cursor)
+
         self.connection.commit()
         cursor.close()
 
-    def migrate_comments(self):
-        cursor = self.connection.cursor()
-        cursor.execute("SELECT IDU, IDPub, Comentario FROM Comentar")
-        original_comments = cursor.fetchall()
+    def _sync_closure(self, cursor):
+        """Reconstruye ComentarioAncestro si hay comentarios que no estan en ella.
 
-        for comment in original_comments:
-            user_id, pub_id, text = comment
-            query = "INSERT INTO ComentarRec (IDU, IDPub, Texto, IDPadre) VALUES (%s, %s, %s, %s)"
-            cursor.execute(query, (user_id, pub_id, text, None))
+        Pasa cuando la tabla es nueva o se agregaron comentarios en modo
+        adjacency.
+        """
+        cursor.execute(
+            """
+            SELECT
+                (SELECT COUNT(*) FROM ComentarRec),
+                (SELECT COUNT(*) FROM ComentarioAncestro WHERE Profundidad = 0)
+        """
+        )
+        comments, indexed = cursor.fetchone()
+        if comments != indexed:
+            cursor.execute("DELETE FROM ComentarioAncestro")
+            cursor.execute(CLOSURE_BACKFILL_QUERY)
+
+    def _index_comments(self, cursor, comments):
+        """Agrega las filas de ComentarioAncestro de los pares (id, padre) nuevos.
+
+        Los padres deben aparecer antes que sus respuestas.
+        """
+        if self.storage == STORAGE_CLOSURE:
+            cursor.executemany(
+                CLOSURE_INSERT_QUERY,
+                [
+                    (comment_id, comment_id, comment_id, parent_id)
+                    for comment_id, parent_id in comments
+                ],
+            )
+
+    def migrate_comments(self, batch_size=MIGRATION_BATCH_SIZE):
+        """Copia los comentarios de Comentar a ComentarRec como comentarios raiz.
+
+        Se hace con un solo INSERT ... SELECT dentro del servidor. Si falla, las
+        filas se leen en lotes de `batch_size` por una segunda conexion y se
+        insertan con executemany, sin cargar toda la tabla en memoria.
+        """
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute(MIGRATE_COMMENTS_QUERY)
+        except mq.Error as e:
+            self.connection.rollback()
+            print(f"INSERT ... SELECT falló ({e}), migrando por lotes")
+            self._migrate_comments_batched(cursor, batch_size)
 
         self.connection.commit()
         cursor.close()
 
+    def _migrate_comments_batched(self, cursor, batch_size):
+        source = self.get_db_connection()
+        reader = source.cursor()
+        try:
+            reader.execute("SELECT IDU, IDPub, Comentario, NULL FROM Comentar")
+            while rows := reader.fetchmany(batch_size):
+                cursor.executemany(
+                    "INSERT INTO ComentarRec (IDU, IDPub, Texto, IDPadre) VALUES (%s, %s, %s, %s)",
+                    rows,
+                )
+        finally:
+            reader.close()
+            source.close()
+
     def get_db_connection(self):
         return mq.connect(**self.db_config)
 
-    def add_comment(self, user_id, publication_id, comment_text, parent_id=None):
+    def add_comment(self, user_id, publication_id, text, parent_id=None):
+        comment_id = self.allocate_comment_ids(1)[0]
         cursor = self.connection.cursor()
-        query = "INSERT INTO ComentarRec (IDU, IDPub, Texto, IDPadre) VALUES (%s, %s, %s, %s)"
-        cursor.execute(query, (user_id, publication_id, comment_text, parent_id))
-        comment_id = cursor.lastrowid
+        cursor.execute(
+            INSERT_COMMENT_QUERY,
+            (comment_id, user_id, publication_id, text, parent_id),
+        )
+        self._index_comments(cursor, [(comment_id, parent_id)])
         self.connection.commit()
         cursor.close()
         return comment_id
 
+    def add_comments_bulk(self, comments, batch_size=MIGRATION_BATCH_SIZE):
+        """Agrega comentarios (user_id, publication_id, text, parent_id) por lotes.
+
+        Cada lote reserva un bloque de ids y se inserta con executemany en una
+        sola transaccion. Retorna los ids creados en el mismo orden.
+        """
+        created = []
+        cursor = self.connection.cursor()
+        for start in range(0, len(comments), batch_size):
+            batch = comments[start : start + batch_size]
+            comment_ids = self.allocate_comment_ids(len(batch))
+            rows = [
+                (comment_id, user_id, publication_id, text, parent_id)
+                for comment_id, (user_id, publication_id, text, parent_id) in zip(
+                    comment_ids, batch
+                )
+            ]
+            cursor.executemany(INSERT_COMMENT_QUERY, rows)
+            self._index_comments(cursor, [(row[0], row[4]) for row in rows])
+            self.connection.commit()
+            created.extend(comment_ids)
+        cursor.close()
+        return created
+
+    def delete_comments(self, comment_ids):
+        """Elimina los comentarios indicados junto con sus respuestas"""
+        if not comment_ids:
+            return
+        placeholders = ", ".join(["%s"] * len(comment_ids))
+        cursor = self.connection.cursor()
+        cursor.execute(
+            f"DELETE FROM ComentarRec WHERE IDComentario IN ({placeholders})",
+            tuple(comment_ids),
+        )
+        self.connection.commit()
+        cursor.close()
+
     def get_full_conversation(self, publication_id):
         cursor = self.connection.cursor(dictionary=True)
 
@@ -76,89 +353,168 @@ class MySqlCommentSystem:
                 c.IDU as user_id
             FROM ComentarRec c
             WHERE c.IDPub = %s
-            ORDER BY c.FechaCreacion
+            ORDER BY c.FechaCreacion, c.IDComentario
         """
 
         cursor.execute(query, (publication_id,))
         rows = cursor.fetchall()
+        cursor.close()
+        return build_comment_tree(publication_id, rows)
 
-        if not rows:
-            return {"Publicacion": publication_id, "comments": []}
-
-        comments_by_id = {}
-        roots = []
-
-        for row in rows:
-            comment_id = row["id"]
-            comments_by_id[comment_id] = {
-                "id": comment_id,
-                "texto": row["texto"],
-                "fechaCreacion": row["fechaCreacion"],
-                "user_id": row["user_id"],
-                "responses": [],
-            }
+    def get_comment_page(
+        self, publication_id, parent_id=None, limit=COMMENT_PAGE_SIZE, after=None
+    ):
+        """Pagina de comentarios raiz, o de respuestas a `parent_id`.
 
-        for row in rows:
-            comment_id = row["id"]
-            parent_id = row["parent_id"]
+        `after` es el cursor (fechaCreacion, id) devuelto en `next_cursor` por
+        la pagina anterior.
+        """
+        conditions = ["c.IDPub = %s"]
+        params = [publication_id]
+        if parent_id is None:
+            conditions.append("c.IDPadre IS NULL")
+        else:
+            conditions.append("c.IDPadre = %s")
+            params.append(parent_id)
+        if after is not None:
+            conditions.append(
+                "(c.FechaCreacion > %s OR (c.FechaCreacion = %s AND c.IDComentario > %s))"
+            )
+            params.extend([after[0], after[0], after[1]])
+        params.append(limit + 1)
+
+        query = f"""
+            SELECT {COMMENT_COLUMNS}
+            FROM ComentarRec c
+            WHERE {" AND ".join(conditions)}
+            ORDER BY c.FechaCreacion, c.IDComentario
+            LIMIT %s
+        """
 
-            if parent_id and parent_id in comments_by_id:
-                comments_by_id[parent_id]["responses"].append(
-                    comments_by_id[comment_id]
-                )
-            elif not parent_id:
-                roots.append(comments_by_id[comment_id])
+        cursor = self.connection.cursor(dictionary=True)
+        cursor.execute(query, params)
+        rows = cursor.fetchall()
+        cursor.close()
+        return comment_page(rows, limit)
+
+    def get_conversation(
+        self,
+        publication_id,
+        limit=COMMENT_PAGE_SIZE,
+        after=None,
+        max_depth=1,
+        replies_limit=5,
+    ):
+        """Pagina de comentarios raiz con hasta `max_depth` niveles de respuestas.
+
+        Cada nivel se carga con una sola consulta y trae como maximo
+        `replies_limit` respuestas por comentario; `reply_count` indica cuantas
+        hay en total para poder expandir el resto con `get_comment_page`.
+        """
+        page = self.get_comment_page(publication_id, None, limit, after)
+        level = page["comments"]
+
+        for _ in range(max_depth):
+            parents = {c["id"]: c for c in level if c["reply_count"]}
+            if not parents:
+                break
+            level = []
+            for row in self._get_first_replies(list(parents), replies_limit):
+                node = comment_node(row)
+                parents[row["parent_id"]]["responses"].append(node)
+                level.append(node)
 
+        cursor = self.connection.cursor()
+        cursor.execute(
+            "SELECT COUNT(*) FROM ComentarRec WHERE IDPub = %s", (publication_id,)
+        )
+        total = cursor.fetchone()[0]
         cursor.close()
+
         return {
             "Publicacion": publication_id,
-            "comments": roots,
-            "total_comments": len(comments_by_id),
+            "comments": page["comments"],
+            "next_cursor": page["next_cursor"],
+            "total_comments": total,
         }
 
+    def _get_first_replies(self, parent_ids, limit):
+        """Primeras `limit` respuestas de cada comentario en `parent_ids`"""
+        placeholders = ", ".join(["%s"] * len(parent_ids))
+        query = f"""
+            SELECT *
+            FROM (
+                SELECT
+                    {COMMENT_COLUMNS},
+                    ROW_NUMBER() OVER (
+                        PARTITION BY c.IDPadre
+                        ORDER BY c.FechaCreacion, c.IDComentario
+                    ) AS rn
+                FROM ComentarRec c
+                WHERE c.IDPadre IN ({placeholders})
+            ) replies
+            WHERE rn <= %s
+            ORDER BY parent_id, rn
+        """
+        cursor = self.connection.cursor(dictionary=True)
+        cursor.execute(query, (*parent_ids, limit))
+        rows = cursor.fetchall()
+        cursor.close()
+        return rows
+
     def get_all_publications(self):
         cursor = self.connection.cursor()
-        query = """
-            SELECT DISTINCT p.IDPub
-            FROM Publicacion p
-            INNER JOIN ComentarRec c ON p.IDPub = c.IDPub
-            ORDER BY p.IDPub
-        """
-        cursor.execute(query)
+        cursor.execute("SELECT IDPub FROM Publicacion ORDER BY IDPub")
         publications = [row[0] for row in cursor.fetchall()]
         cursor.close()
         return publications
 
-    def create_test_conversations(self):
+    def get_all_users(self):
         cursor = self.connection.cursor()
+        cursor.execute("SELECT IDU FROM Usuario ORDER BY IDU")
+        users = [row[0] for row in cursor.fetchall()]
+        cursor.close()
+        return users
 
-        print("Creando conversaciones de prueba (20+ comentarios)...")
+    def create_test_conversations(self, publication_id=1, user_id=1):
+        cursor = self.connection.cursor()
 
-        publication_id = 1
-        user_id = 1
+        print("Creando conversaciones de prueba (20+ comentarios)...")
 
         root_comments = []
+        rows = []
+
+        # 5 raices x (1 + 3 respuestas x (1 + 2 respuestas anidadas))
+        comment_ids = iter(self.allocate_comment_ids(50))
 
         for i in range(1, 6):
             text = f"Comentario raíz {i}"
-            query = "INSERT INTO ComentarRec (IDU, IDPub, Texto, IDPadre) VALUES (%s, %s, %s, %s)"
-            cursor.execute(query, (user_id, publication_id, text, None))
-            root_id = cursor.lastrowid
+            root_id = next(comment_ids)
+            rows.append((root_id, user_id, publication_id, text, None))
             root_comments.append(root_id)
 
             for j in range(1, 4):
                 reply_text = f"Respuesta {j} al comentario {i}"
-                cursor.execute(
-                    query, (user_id + j, publication_id, reply_text, root_id)
+                reply_id = next(comment_ids)
+                rows.append(
+                    (reply_id, user_id + j, publication_id, reply_text, root_id)
                 )
-                reply_id = cursor.lastrowid
 
                 for k in range(1, 3):
                     nested_reply = f"Respuesta anidada {k} a la respuesta {j}"
-                    cursor.execute(
-                        query, (user_id + k, publication_id, nested_reply, reply_id)
+                    rows.append(
+                        (
+                            next(comment_ids),
+                            user_id + k,
+                            publication_id,
+                            nested_reply,
+                            reply_id,
+                        )
                     )
 
+        cursor.executemany(INSERT_COMMENT_QUERY, rows)
+        self._index_comments(cursor, [(row[0], row[4]) for row in rows])
+
         self.connection.commit()
         cursor.close()
         print(f"Creados {len(root_comments) * 10} comentarios de prueba")
@@ -192,13 +548,65 @@ class MySqlCommentSystem:
         cursor.close()
         return children
 
-    def get_next_comment_id(self):
+    def get_subtree(self, comment_id, max_depth=None):
+        """Comentario `comment_id` con sus respuestas hasta `max_depth` niveles.
+
+        Solo recorre el hilo del comentario, no toda la publicacion. Retorna
+        None si el comentario no existe.
+        """
+        cursor = self.connection.cursor(dictionary=True)
+        cursor.execute(
+            SUBTREE_QUERIES[self.storage], (comment_id, max_depth, max_depth)
+        )
+        rows = cursor.fetchall()
+        cursor.close()
+
+        if not rows:
+            return None
+
+        comments_by_id = {}
+        for row in rows:
+            node = comment_node(row)
+            comments_by_id[row["id"]] = node
+            if row["id"] != comment_id:
+                comments_by_id[row["parent_id"]]["responses"].append(node)
+        return comments_by_id[comment_id]
+
+    def get_ancestors(self, comment_id):
+        """Cadena de comentarios desde la raiz hasta el padre de `comment_id`"""
+        cursor = self.connection.cursor(dictionary=True)
+        cursor.execute(ANCESTORS_QUERIES[self.storage], (comment_id,))
+        rows = cursor.fetchall()
+        cursor.close()
+        return [comment_node(row) for row in rows]
+
+    def count_descendants(self, comment_id):
+        """Cantidad de respuestas directas e indirectas de `comment_id`"""
         cursor = self.connection.cursor()
-        query = "SELECT MAX(IDComentario) FROM ComentarRec"
-        cursor.execute(query)
-        result = cursor.fetchone()
+        cursor.execute(DESCENDANTS_QUERIES[self.storage], (comment_id,))
+        count = cursor.fetchone()[0]
+        cursor.close()
+        return count
+
+    def allocate_comment_ids(self, count=1, commit=False):
+        """Reserva `count` ids consecutivos para comentarios y retorna el rango.
+
+        La fila de SecuenciaId queda bloqueada hasta que se confirma la
+        transaccion que inserta los comentarios. Si la reserva no va seguida de
+        un insert en la misma transaccion, `commit=True` la confirma de
+        inmediato para no bloquear a los demas escritores.
+        """
+        cursor = self.connection.cursor()
+        cursor.execute(
+            "UPDATE SecuenciaId SET Valor = LAST_INSERT_ID(Valor + %s) WHERE Nombre = %s",
+            (count, COMMENT_SEQUENCE),
+        )
+        cursor.execute("SELECT LAST_INSERT_ID()")
+        last = cursor.fetchone()[0]
         cursor.close()
-        return (result[0] or 0) + 1
+        if commit:
+            self.connection.commit()
+        return range(last - count + 1, last + 1)
 
     def close(self):
         if self.connection:
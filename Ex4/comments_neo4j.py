@@ -1,17 +1,317 @@
 import datetime
+import time
 from ast import USub
 
 import mysql.connector as mq
 from neo4j import GraphDatabase
 
+from comment_store import (
+    COMMENT_PAGE_SIZE,
+    build_comment_tree,
+    comment_node,
+    comment_page,
+)
+
+MIGRATION_BATCH_SIZE = 1000
+
+# Version de la limpieza de duplicados, constraints e indices ya aplicada al
+# grafo. La version 3 copia pubId, parentId y userId en cada Comentario.
+SCHEMA_VERSION = 3
+SCHEMA_MARKER = "Esquema"
+
+# Los comentarios migrados desde Comentar usan el id 1000 + Secuencia, y los
+# creados en Neo4j toman ids de un contador que empieza en NATIVE_COMMENT_ID_BASE
+MIGRATED_COMMENT_ID_OFFSET = 1000
+NATIVE_COMMENT_ID_BASE = 1_000_000_000
+COMMENT_SEQUENCE = "Comentario"
+
+# El lock explicito evita que dos transacciones lean el mismo valor del contador
+ALLOCATE_IDS_QUERY = """
+    MERGE (s:Secuencia {nombre: $nombre})
+    ON CREATE SET s.valor = $base
+    SET s._lock = true
+    WITH s, s.valor AS valor
+    SET s.valor = valor + $count
+    REMOVE s._lock
+    RETURN valor + 1 AS primero
+"""
+
+# Cada lote actualiza en la misma transaccion la ultima llave migrada
+SET_WATERMARK = """
+    WITH count(*) AS migrados
+    MERGE (m:Migracion {nombre: $nombre})
+    SET m.secuencia = $secuencia, m.actualizado = datetime()
+    RETURN migrados
+"""
+
+MERGE_USERS_QUERY = (
+    """
+    UNWIND $rows AS row
+    MERGE (:Usuario {id: row.id})
+"""
+    + SET_WATERMARK
+)
+
+MERGE_PUBLICATIONS_QUERY = (
+    """
+    UNWIND $rows AS row
+    MERGE (:Publicacion {id: row.id})
+"""
+    + SET_WATERMARK
+)
+
+MERGE_COMMENTS_QUERY = (
+    """
+    UNWIND $rows AS row
+    MERGE (u:Usuario {id: row.user_id})
+    MERGE (p:Publicacion {id: row.publication_id})
+    MERGE (c:Comentario {id: row.comment_id})
+    ON CREATE SET c.texto = row.text, c.fechaCreacion = datetime()
+    SET c.texto = row.text,
+        c.secuencia = row.secuencia,
+        c.pubId = row.publication_id,
+        c.userId = row.user_id
+    MERGE (u)-[:ESCRIBIO]->(c)
+    MERGE (c)-[:PERTENECE_A]->(p)
+"""
+    + SET_WATERMARK
+)
+
+# Nodos con el id de una fila de Comentar que no son esa fila migrada: otro
+# comentario ya ocupa el id y el MERGE lo sobrescribiria
+CONFLICTING_COMMENTS_QUERY = """
+    UNWIND $rows AS row
+    MATCH (c:Comentario {id: row.comment_id})
+    WHERE coalesce(c.secuencia, row.secuencia) <> row.secuencia
+        OR c.userId <> row.user_id
+        OR c.pubId <> row.publication_id
+    RETURN collect(c.id) AS ids
+"""
+
+# Mayor id por debajo del contador de comentarios nativos. Incluye los
+# comentarios creados por versiones anteriores con MAX(id) + 1, que quedaron
+# justo despues de los migrados.
+MAX_LOW_COMMENT_ID_QUERY = """
+    MATCH (c:Comentario)
+    WHERE c.id < $native_base
+    RETURN max(c.id) AS id
+"""
+
+# Crea los comentarios de $rows y los enlaza con su comentario padre, si existe.
+# parentId solo se guarda junto con RESPONDE_A, como en la migracion a la version
+# 3, para que las lecturas por parentId coincidan con el grafo
+CREATE_COMMENTS_QUERY = """
+    UNWIND $rows AS row
+    MERGE (u:Usuario {id: row.user_id})
+    MERGE (p:Publicacion {id: row.publication_id})
+    MERGE (c:Comentario {id: row.comment_id})
+    ON CREATE SET c.fechaCreacion = datetime()
+    SET c.texto = row.text,
+        c.pubId = row.publication_id,
+        c.userId = row.user_id
+    MERGE (u)-[:ESCRIBIO]->(c)
+    MERGE (c)-[:PERTENECE_A]->(p)
+    WITH c, row
+    OPTIONAL MATCH (parent:Comentario {id: row.parent_id})
+    FOREACH (_ IN CASE WHEN parent IS NULL THEN [] ELSE [1] END |
+        MERGE (c)-[:RESPONDE_A]->(parent)
+        SET c.parentId = parent.id
+    )
+"""
+
+# Columnas de un comentario paginado; `u` es su autor
+COMMENT_FIELDS = """c.id AS id,
+           c.texto AS texto,
+           c.fechaCreacion AS fechaCreacion,
+           c.userId AS user_id,
+           COUNT { (c)<-[:RESPONDE_A]-() } AS reply_count"""
+
+# Cursor de la primera pagina; con un valor fijo en vez de NULL la condicion
+# sigue siendo un rango sobre el indice (pubId, fechaCreacion)
+CURSOR_START = (datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc), -1)
+
+AFTER_CURSOR = """c.fechaCreacion >= $after_fecha
+      AND (c.fechaCreacion > $after_fecha OR c.id > $after_id)"""
+
+# Todas las lecturas filtran por pubId/parentId guardados en el comentario, asi
+# que empiezan con un index seek en vez de recorrer relaciones
+CONVERSATION_QUERY = """
+    MATCH (c:Comentario)
+    WHERE c.pubId = $pub_id AND c.fechaCreacion IS NOT NULL
+    RETURN c.id AS id,
+           c.texto AS texto,
+           c.fechaCreacion AS fechaCreacion,
+           c.parentId AS parent_id,
+           c.userId AS user_id
+    ORDER BY c.fechaCreacion, c.id
+"""
+
+# Consulta previa a SCHEMA_VERSION 3, solo para comparar planes
+LEGACY_CONVERSATION_QUERY = """
+    MATCH (c:Comentario)-[:PERTENECE_A]->(p:Publicacion {id: $pub_id})
+    OPTIONAL MATCH (c)-[:RESPONDE_A]->(parent:Comentario)
+    OPTIONAL MATCH (u:Usuario)-[:ESCRIBIO]->(c)
+    RETURN c.id as id,
+           c.texto as texto,
+           c.fechaCreacion as fechaCreacion,
+           parent.id as parent_id,
+           u.id as user_id
+    ORDER BY c.fechaCreacion
+"""
+
+ROOT_PAGE_QUERY = f"""
+    MATCH (c:Comentario)
+    WHERE c.pubId = $pub_id
+      AND {AFTER_CURSOR}
+      AND c.parentId IS NULL
+    RETURN {COMMENT_FIELDS}
+    ORDER BY c.fechaCreacion, c.id
+    LIMIT $limit
+"""
+
+REPLY_PAGE_QUERY = f"""
+    MATCH (c:Comentario)
+    WHERE c.parentId = $parent_id
+      AND {AFTER_CURSOR}
+    RETURN {COMMENT_FIELDS}
+    ORDER BY c.fechaCreacion, c.id
+    LIMIT $limit
+"""
+
+# Primeras $limit respuestas de cada comentario en $parent_ids
+FIRST_REPLIES_QUERY = f"""
+    MATCH (c:Comentario)
+    WHERE c.parentId IN $parent_ids AND c.fechaCreacion IS NOT NULL
+    WITH c ORDER BY c.fechaCreacion, c.id
+    WITH c.parentId AS parent_id, collect(c)[..$limit] AS replies
+    UNWIND replies AS c
+    RETURN parent_id,
+           {COMMENT_FIELDS}
+    ORDER BY parent_id, fechaCreacion, id
+"""
+
+# Copia pubId, parentId y userId en los comentarios creados antes de la version 3
+DENORMALIZE_COMMENTS_QUERY = """
+    MATCH (c:Comentario)-[:PERTENECE_A]->(p:Publicacion)
+    WHERE c.pubId IS NULL
+    CALL {
+        WITH c, p
+        OPTIONAL MATCH (c)-[:RESPONDE_A]->(parent:Comentario)
+        OPTIONAL MATCH (u:Usuario)-[:ESCRIBIO]->(c)
+        SET c.pubId = p.id, c.parentId = parent.id, c.userId = u.id
+    } IN TRANSACTIONS OF $batch_size ROWS
+"""
+
+ALL_PUBLICATIONS_QUERY = """
+    MATCH (p:Publicacion)
+    RETURN p.id as id
+    ORDER BY p.id
+"""
+
+ALL_USERS_QUERY = """
+    MATCH (u:Usuario)
+    RETURN u.id as id
+    ORDER BY u.id
+"""
+
+COUNT_COMMENTS_QUERY = """
+    MATCH (p:Publicacion {id: $pub_id})
+    RETURN COUNT { (:Comentario)-[:PERTENECE_A]->(p) } AS total
+"""
+
+# (nombre, tabla, llave creciente, columnas, query de Neo4j). Solo se copian las
+# filas con llave mayor a la ultima migrada.
+MIGRATIONS = [
+    ("Usuario", "Usuario", "IDU", "IDU AS id", MERGE_USERS_QUERY),
+    ("Publicacion", "Publicacion", "IDPub", "IDPub AS id", MERGE_PUBLICATIONS_QUERY),
+    (
+        "Comentar",
+        "Comentar",
+        "Secuencia",
+        "IDU AS user_id, IDPub AS publication_id, Comentario AS text, "
+        f"Secuencia + {MIGRATED_COMMENT_ID_OFFSET} AS comment_id",
+        MERGE_COMMENTS_QUERY,
+    ),
+]
+
+# Consulta que debe devolver una lista vacia antes de escribir cada lote
+MIGRATION_CONFLICTS = {"Comentar": CONFLICTING_COMMENTS_QUERY}
+
+SOURCE_WATERMARKS_QUERY = "SELECT " + ", ".join(
+    f"(SELECT COALESCE(MAX({key}), 0) FROM {table}) AS {name}"
+    for name, table, key, _, _ in MIGRATIONS
+)
+
+
+def comment_row(user_id, publication_id, text, parent_id=None, comment_id=None):
+    """Fila de CREATE_COMMENTS_QUERY; sin `comment_id` el id se reserva al escribir"""
+    return {
+        "user_id": user_id,
+        "publication_id": publication_id,
+        "text": text,
+        "parent_id": parent_id,
+        "comment_id": comment_id,
+    }
+
+
+def allocation_params(count):
+    """Parametros de ALLOCATE_IDS_QUERY para reservar `count` ids"""
+    return {"nombre": COMMENT_SEQUENCE, "base": NATIVE_COMMENT_ID_BASE, "count": count}
+
+
+def _format_plan(plan, depth=0):
+    """Lineas de un plan de Neo4j con filas y db hits por operador"""
+    args = plan.get("args", {})
+    line = "  " * depth + plan.get("operatorType", "?")
+    if "rows" in plan:
+        line += f"  rows={plan['rows']} dbHits={plan.get('dbHits', 0)}"
+    if args.get("Details"):
+        line += f"  [{args['Details']}]"
+    lines = [line]
+    for child in plan.get("children", []):
+        lines.extend(_format_plan(child, depth + 1))
+    return lines
+
+
+def ensure_comment_sequence(connection):
+    """Agrega a Comentar la columna Secuencia si la base de datos no la tiene.
+
+    La columna numera los comentarios en el orden de su llave (IDU, IDPub), el
+    mismo que usaba la migracion con ROW_NUMBER(), y los nuevos comentarios
+    reciben numeros mayores.
+    """
+    cursor = connection.cursor()
+    cursor.execute("""
+        SELECT COUNT(*)
+        FROM information_schema.columns
+        WHERE table_schema = DATABASE()
+            AND table_name = 'Comentar'
+            AND column_name = 'Secuencia'
+    """)
+    if cursor.fetchone()[0] == 0:
+        cursor.execute(
+            "ALTER TABLE Comentar ADD COLUMN Secuencia INT NOT NULL AUTO_INCREMENT UNIQUE"
+        )
+    cursor.close()
+
 
 class Neo4jCommentSystem:
-    def __init__(self, uri, user, password, mysql_db_connection=None):
+    def __init__(
+        self,
+        uri,
+        user,
+        password,
+        mysql_db_connection=None,
+        migration_batch_size=MIGRATION_BATCH_SIZE,
+    ):
         self.driver = GraphDatabase.driver(uri, auth=(user, password))
-        self._cleanup_duplicates()
-        self._setup_constraints()
+        if self.get_schema_version() < SCHEMA_VERSION:
+            self._cleanup_duplicates()
+            self._setup_constraints()
+            self._denormalize_comments(migration_batch_size)
+            self._set_schema_version(SCHEMA_VERSION)
         if mysql_db_connection is not None:
-            self.migrate(mysql_db_connection)
+            self.migrate(mysql_db_connection, batch_size=migration_batch_size)
 
     def _cleanup_duplicates(self):
         """Clean up duplicate nodes before setting constraints"""
@@ -55,60 +355,134 @@ class Neo4jCommentSystem:
                     CREATE CONSTRAINT IF NOT EXISTS FOR (c:Comentario)
                     REQUIRE c.id IS UNIQUE
                 """)
+                session.run("""
+                    CREATE CONSTRAINT IF NOT EXISTS FOR (m:Migracion)
+                    REQUIRE m.nombre IS UNIQUE
+                """)
+                session.run("""
+                    CREATE CONSTRAINT IF NOT EXISTS FOR (s:Secuencia)
+                    REQUIRE s.nombre IS UNIQUE
+                """)
+                session.run("""
+                    CREATE INDEX comentario_pub_fecha IF NOT EXISTS
+                    FOR (c:Comentario) ON (c.pubId, c.fechaCreacion)
+                """)
+                session.run("""
+                    CREATE INDEX comentario_padre_fecha IF NOT EXISTS
+                    FOR (c:Comentario) ON (c.parentId, c.fechaCreacion)
+                """)
             except Exception as e:
                 print(f"Warning: Could not create constraints: {e}")
 
-    def migrate(self, db_connection):
-        connection = mq.connect(**db_connection)
-        cursor = connection.cursor()
-
-        cursor.execute("SELECT DISTINCT IDU FROM Usuario")
-        usuarios = cursor.fetchall()
-
-        cursor.execute("SELECT DISTINCT IDPub FROM Publicacion")
-        publicaciones = cursor.fetchall()
-
-        cursor.execute("""
-                SELECT DISTINCT
-                    c.IDU,
-                    c.IDPub,
-                    c.Comentario,
-                    ROW_NUMBER() OVER (ORDER BY c.IDU, c.IDPub) + 1000 as comment_id
-                FROM Comentar c
-            """)
-        comentarios = cursor.fetchall()
+    def _denormalize_comments(self, batch_size=MIGRATION_BATCH_SIZE):
+        # CALL ... IN TRANSACTIONS solo se permite en transacciones implicitas
+        with self.driver.session() as session:
+            session.run(DENORMALIZE_COMMENTS_QUERY, batch_size=batch_size).consume()
 
-        connection.close()
+    def get_schema_version(self):
+        with self.driver.session() as session:
+            record = session.run(
+                "MATCH (m:Migracion {nombre: $nombre}) RETURN m.version AS version",
+                {"nombre": SCHEMA_MARKER},
+            ).single()
+            return (record and record["version"]) or 0
 
-        processed_users = set()
-        for usuario in usuarios:
-            user_id = usuario[0]
-            if user_id not in processed_users:
-                self.add_user(user_id)
-                processed_users.add(user_id)
+    def _set_schema_version(self, version):
+        with self.driver.session() as session:
+            session.run(
+                "MERGE (m:Migracion {nombre: $nombre}) SET m.version = $version",
+                {"nombre": SCHEMA_MARKER, "version": version},
+            )
 
-        processed_pubs = set()
-        for publicacion in publicaciones:
-            pub_id = publicacion[0]
-            if pub_id not in processed_pubs:
-                self.add_publication(pub_id)
-                processed_pubs.add(pub_id)
+    def migrate(self, db_connection, batch_size=MIGRATION_BATCH_SIZE):
+        """Sincroniza usuarios, publicaciones y comentarios de MySQL en lotes.
 
-        for comentario in comentarios:
-            user_id = comentario[0]
-            publication_id = comentario[1]
-            text = comentario[2]
-            comment_id = comentario[3]
+        Solo se copian las filas agregadas despues de la ultima llave migrada de
+        cada tabla; si ninguna tabla crecio no se lee nada mas. Cada lote se
+        escribe en una sola transaccion junto con su llave, por lo que una
+        migracion interrumpida continua desde el ultimo lote confirmado.
+        """
+        connection = mq.connect(**db_connection)
+        try:
+            ensure_comment_sequence(connection)
+            self._reserve_migrated_comment_ids(connection)
+            cursor = connection.cursor(dictionary=True)
+            cursor.execute(SOURCE_WATERMARKS_QUERY)
+            source = cursor.fetchone()
+            synced = self.get_migration_watermarks()
+
+            for name, table, key, columns, query in MIGRATIONS:
+                watermark = synced.get(name, 0)
+                if source[name] <= watermark:
+                    continue
+                cursor.execute(
+                    f"SELECT {key} AS secuencia, {columns} FROM {table} "
+                    f"WHERE {key} > %s ORDER BY {key}",
+                    (watermark,),
+                )
+                self._merge_batches(name, query, cursor, batch_size)
+            cursor.close()
+        finally:
+            connection.close()
+
+    def _reserve_migrated_comment_ids(self, connection):
+        """Hace que los proximos comentarios de Comentar tengan ids libres.
+
+        Si el grafo tiene comentarios por encima de `1000 + MAX(Secuencia)`
+        (los que versiones anteriores creaban con MAX(id) + 1), sube el
+        AUTO_INCREMENT de Comentar para que las filas nuevas caigan despues.
+        """
+        with self.driver.session() as session:
+            highest = session.run(
+                MAX_LOW_COMMENT_ID_QUERY, native_base=NATIVE_COMMENT_ID_BASE
+            ).single()["id"]
+        if highest is None:
+            return
 
-            if user_id not in processed_users:
-                self.add_user(user_id)
-                processed_users.add(user_id)
+        cursor = connection.cursor()
+        cursor.execute("SELECT COALESCE(MAX(Secuencia), 0) FROM Comentar")
+        next_sequence = highest - MIGRATED_COMMENT_ID_OFFSET + 1
+        if next_sequence > cursor.fetchone()[0] + 1:
+            cursor.execute(
+                f"ALTER TABLE Comentar AUTO_INCREMENT = {int(next_sequence)}"
+            )
+        cursor.close()
+
+    @staticmethod
+    def _merge_batch(tx, name, query, rows):
+        conflicts_query = MIGRATION_CONFLICTS.get(name)
+        if conflicts_query is not None:
+            conflicts = tx.run(conflicts_query, rows=rows).single()["ids"]
+            if conflicts:
+                # Al salir con error execute_write descarta el lote completo
+                raise ValueError(
+                    f"Los ids {conflicts[:10]} ya son de otros comentarios; "
+                    f"no se migra {name} sobre ellos"
+                )
+        tx.run(query, rows=rows, nombre=name, secuencia=rows[-1]["secuencia"]).consume()
 
-            if publication_id not in processed_pubs:
-                self.add_publication(publication_id)
-                processed_pubs.add(publication_id)
+    def _merge_batches(self, name, query, cursor, batch_size):
+        migrated = 0
+        start = time.perf_counter()
+        with self.driver.session() as session:
+            while rows := cursor.fetchmany(batch_size):
+                session.execute_write(self._merge_batch, name, query, rows)
+                migrated += len(rows)
+                elapsed = time.perf_counter() - start
+                print(
+                    f"Migrados {migrated} registros de {name} "
+                    f"({migrated / elapsed:.0f} filas/s)"
+                )
 
-            self.add_comment(user_id, publication_id, text, comment_id=comment_id)
+    def get_migration_watermarks(self):
+        """Ultima llave migrada de cada tabla de MySQL"""
+        with self.driver.session() as session:
+            result = session.run("""
+                MATCH (m:Migracion)
+                WHERE m.secuencia IS NOT NULL
+                RETURN m.nombre AS nombre, m.secuencia AS secuencia
+            """)
+            return {record["nombre"]: record["secuencia"] for record in result}
 
     def clear_database(self):
         with self.driver.session() as session:
@@ -135,63 +509,50 @@ class Neo4jCommentSystem:
             session.run(query, params)
 
     def add_comment(
-        self, user_id, publication_id, text, comment_id=None, parent_comment_id=None
+        self, user_id, publication_id, text, parent_id=None, comment_id=None
     ):
+        row = comment_row(user_id, publication_id, text, parent_id, comment_id)
         with self.driver.session() as session:
-            if comment_id is None:
-                comment_id = self._get_next_comment_id()
-
-            query = """
-            MERGE (u:Usuario {id: $user_id})
-            MERGE (p:Publicacion {id: $publication_id})
-            MERGE (c:Comentario {id: $comment_id})
-            ON CREATE SET c.texto = $text, c.fechaCreacion = datetime()
-            ON MATCH SET c.texto = $text
-            MERGE (u)-[:ESCRIBIO]->(c)
-            MERGE (c)-[:PERTENECE_A]->(p)
-            RETURN c.id as comment_id
-            """
+            return session.execute_write(self._create_comments, [row])[0]
 
-            params = {
-                "user_id": user_id,
-                "publication_id": publication_id,
-                "text": text,
-                "comment_id": comment_id,
-            }
-
-            result = session.run(query, params)
-            created_id = result.single()["comment_id"]
-
-            if parent_comment_id:
-                session.run(
-                    """
-                        MATCH (child:Comentario {id: $child_id})
-                        MATCH (parent:Comentario {id: $parent_id})
-                        MERGE (child)-[:RESPONDE_A]->(parent)
-                    """,
-                    {"child_id": created_id, "parent_id": parent_comment_id},
-                )
+    def add_comments_bulk(self, comments, batch_size=MIGRATION_BATCH_SIZE):
+        """Agrega comentarios (user_id, publication_id, text, parent_id) por lotes.
 
-            return created_id
+        Cada lote reserva un bloque de ids y se escribe en una sola transaccion.
+        Retorna los ids creados en el mismo orden.
+        """
+        rows = [comment_row(*comment) for comment in comments]
+        created = []
+        with self.driver.session() as session:
+            for start in range(0, len(rows), batch_size):
+                batch = rows[start : start + batch_size]
+                created.extend(session.execute_write(self._create_comments, batch))
+        return created
+
+    @staticmethod
+    def _create_comments(tx, rows):
+        # execute_write reintenta esta funcion con las mismas filas: se copian
+        # para que un reintento vuelva a reservar los ids del intento abortado
+        rows = [dict(row) for row in rows]
+        pending = [row for row in rows if row["comment_id"] is None]
+        if pending:
+            first = tx.run(
+                ALLOCATE_IDS_QUERY, allocation_params(len(pending))
+            ).single()["primero"]
+            for offset, row in enumerate(pending):
+                row["comment_id"] = first + offset
+
+        tx.run(CREATE_COMMENTS_QUERY, rows=rows).consume()
+        return [row["comment_id"] for row in rows]
 
     def get_all_publications(self):
         with self.driver.session() as session:
-            query = """
-            MATCH (p:Publicacion)
-            RETURN p.id as id
-            ORDER BY p.id
-            """
-            results = session.run(query)
+            results = session.run(ALL_PUBLICATIONS_QUERY)
             return [record["id"] for record in results]
 
     def get_all_users(self):
         with self.driver.session() as session:
-            query = """
-            MATCH (u:Usuario)
-            RETURN u.id as id
-            ORDER BY u.id
-            """
-            results = session.run(query)
+            results = session.run(ALL_USERS_QUERY)
             return [record["id"] for record in results]
 
     def get_all_comments(self):
@@ -206,93 +567,139 @@ class Neo4jCommentSystem:
 
     def get_full_conversation(self, publication_id):
         with self.driver.session() as session:
-            query = """
-                MATCH (c:Comentario)-[:PERTENECE_A]->(p:Publicacion {id: $pub_id})
-                OPTIONAL MATCH (c)-[:RESPONDE_A]->(parent:Comentario)
-                OPTIONAL MATCH (u:Usuario)-[:ESCRIBIO]->(c)
-                RETURN c.id as id,
-                       c.texto as texto,
-                       c.fechaCreacion as fecha,
-                       parent.id as parent_id,
-                       u.id as user_id
-                ORDER BY c.fechaCreacion
-                """
+            rows = list(session.run(CONVERSATION_QUERY, pub_id=publication_id))
+        return build_comment_tree(publication_id, rows)
 
-            result = session.run(query, {"pub_id": publication_id})
-            rows = list(result)
+    def profile_conversation(self, publication_id, query=CONVERSATION_QUERY):
+        """Plan de ejecucion (PROFILE) de una consulta de conversacion como texto.
 
-            if not rows:
-                return {"Publicacion": publication_id, "comments": []}
-
-            comments_by_id = {}
-            roots = []
+        Con `query=LEGACY_CONVERSATION_QUERY` muestra el plan anterior a la
+        version 3 para compararlos.
+        """
+        with self.driver.session() as session:
+            summary = session.run("PROFILE " + query, pub_id=publication_id).consume()
+        return "\n".join(_format_plan(summary.profile))
 
-            for row in rows:
-                comment_id = row["id"]
-                comments_by_id[comment_id] = {
-                    "id": comment_id,
-                    "texto": row["texto"],
-                    "fechaCreacion": row["fecha"],
-                    "user_id": row["user_id"],
-                    "responses": [],
-                }
+    def delete_comments(self, comment_ids):
+        """Elimina los comentarios indicados junto con sus respuestas"""
+        with self.driver.session() as session:
+            session.run(
+                """
+                MATCH (c:Comentario)
+                WHERE c.id IN $ids
+                OPTIONAL MATCH (r:Comentario)-[:RESPONDE_A*]->(c)
+                DETACH DELETE r, c
+                """,
+                ids=list(comment_ids),
+            ).consume()
+
+    def clear_comments(self):
+        """Elimina todos los comentarios; la proxima migracion vuelve a copiar Comentar"""
+        with self.driver.session() as session:
+            session.run("MATCH (c:Comentario) DETACH DELETE c").consume()
+            session.run("MATCH (m:Migracion {nombre: 'Comentar'}) DELETE m").consume()
+        return True
 
-            for row in rows:
-                comment_id = row["id"]
-                parent_id = row["parent_id"]
+    def get_comment_page(
+        self, publication_id, parent_id=None, limit=COMMENT_PAGE_SIZE, after=None
+    ):
+        """Pagina de comentarios raiz, o de respuestas a `parent_id`.
+
+        `after` es el cursor (fechaCreacion, id) devuelto en `next_cursor` por
+        la pagina anterior.
+        """
+        after_fecha, after_id = after if after is not None else CURSOR_START
+        params = {
+            "pub_id": publication_id,
+            "parent_id": parent_id,
+            "after_fecha": after_fecha,
+            "after_id": after_id,
+            "limit": limit + 1,
+        }
+        query = ROOT_PAGE_QUERY if parent_id is None else REPLY_PAGE_QUERY
+        with self.driver.session() as session:
+            rows = list(session.run(query, params))
+        return comment_page(rows, limit)
+
+    def get_conversation(
+        self,
+        publication_id,
+        limit=COMMENT_PAGE_SIZE,
+        after=None,
+        max_depth=1,
+        replies_limit=5,
+    ):
+        """Pagina de comentarios raiz con hasta `max_depth` niveles de respuestas.
 
-                if parent_id and parent_id in comments_by_id:
-                    comments_by_id[parent_id]["responses"].append(
-                        comments_by_id[comment_id]
-                    )
-                elif not parent_id:
-                    roots.append(comments_by_id[comment_id])
+        Cada nivel se carga con una sola consulta y trae como maximo
+        `replies_limit` respuestas por comentario; `reply_count` indica cuantas
+        hay en total para poder expandir el resto con `get_comment_page`.
+        """
+        page = self.get_comment_page(publication_id, None, limit, after)
+        level = page["comments"]
 
-            return {
-                "Publicacion": publication_id,
-                "comments": roots,
-                "total_comments": len(comments_by_id),
-            }
+        with self.driver.session() as session:
+            for _ in range(max_depth):
+                parents = {c["id"]: c for c in level if c["reply_count"]}
+                if not parents:
+                    break
+                level = []
+                result = session.run(
+                    FIRST_REPLIES_QUERY,
+                    parent_ids=list(parents),
+                    limit=replies_limit,
+                )
+                for row in result:
+                    node = comment_node(row)
+                    parents[row["parent_id"]]["responses"].append(node)
+                    level.append(node)
+
+            record = session.run(COUNT_COMMENTS_QUERY, pub_id=publication_id).single()
+
+        return {
+            "Publicacion": publication_id,
+            "comments": page["comments"],
+            "next_cursor": page["next_cursor"],
+            "total_comments": record["total"] if record else 0,
+        }
+
+    def _allocate_comment_ids(self, count=1):
+        """Reserva `count` ids consecutivos para comentarios y retorna el rango"""
+        with self.driver.session() as session:
+            first = session.execute_write(
+                lambda tx: tx.run(
+                    ALLOCATE_IDS_QUERY, allocation_params(count)
+                ).single()["primero"]
+            )
+        return range(first, first + count)
 
     def _get_next_comment_id(self):
         """Obtener el siguiente ID disponible para comentario"""
-        with self.driver.session() as session:
-            result = session.run("""
-            OPTIONAL MATCH (c:Comentario)
-            RETURN MAX(c.id) as max_id
-            """)
-            record = result.single()
-            if record is None or record["max_id"] is None:
-                return 1
-            return record["max_id"] + 1
+        return self._allocate_comment_ids(1)[0]
 
     def create_test_conversations(self, publication_id=1, user_id=1):
-        root_comments = []
-
-        for i in range(1, 6):
-            text = f"Root comment {i}"
-            root_id = self.add_comment(
-                user_id=user_id, publication_id=publication_id, text=text
-            )
-            root_comments.append(root_id)
-
-            for j in range(1, 4):
-                reply_text = f"Reply {j} to comment {i}"
-                reply_id = self.add_comment(
-                    user_id=user_id + j,
-                    publication_id=publication_id,
-                    text=reply_text,
-                    parent_comment_id=root_id,
-                )
-
-                for k in range(1, 3):
-                    nested_text = f"Nested reply {k} to reply {j}"
-                    self.add_comment(
-                        user_id=user_id + k,
-                        publication_id=publication_id,
-                        text=nested_text,
-                        parent_comment_id=reply_id,
+        root_ids = self.add_comments_bulk(
+            [(user_id, publication_id, f"Root comment {i}", None) for i in range(1, 6)]
+        )
+
+        replies = [
+            (user_id + j, publication_id, f"Reply {j} to comment {i}", root_id)
+            for i, root_id in enumerate(root_ids, start=1)
+            for j in range(1, 4)
+        ]
+        reply_ids = self.add_comments_bulk(replies)
+
+        nested = []
+        for index, reply_id in enumerate(reply_ids):
+            j = index % 3 + 1
+            for k in range(1, 3):
+                nested.append(
+                    (
+                        user_id + k,
+                        publication_id,
+                        f"Nested reply {k} to reply {j}",
+                        reply_id,
                     )
-
-        total = len(root_comments) * (1 + 3 + 3 * 2)
+                )
+        self.add_comments_bulk(nested)
         return True
@@ -0,0 +1,108 @@
+from neo4j import AsyncGraphDatabase
+
+from comment_store import COMMENT_PAGE_SIZE, build_comment_tree, comment_page
+from comments_neo4j import (
+    ALL_PUBLICATIONS_QUERY,
+    ALL_USERS_QUERY,
+    ALLOCATE_IDS_QUERY,
+    CONVERSATION_QUERY,
+    CREATE_COMMENTS_QUERY,
+    CURSOR_START,
+    MIGRATION_BATCH_SIZE,
+    REPLY_PAGE_QUERY,
+    ROOT_PAGE_QUERY,
+    allocation_params,
+    comment_row,
+)
+
+DEFAULT_POOL_SIZE = 100
+
+
+class AsyncNeo4jCommentSystem:
+    """Version asincrona de Neo4jCommentSystem sobre AsyncGraphDatabase.
+
+    Usa las mismas consultas que la clase sincrona; cada llamada abre su propia
+    sesion del pool, asi que muchas escrituras pueden estar en curso a la vez
+    en un mismo event loop (por ejemplo con asyncio.gather). El esquema y la
+    migracion desde MySQL los sigue aplicando Neo4jCommentSystem.
+    """
+
+    def __init__(self, uri, user, password, max_connection_pool_size=DEFAULT_POOL_SIZE):
+        self.driver = AsyncGraphDatabase.driver(
+            uri,
+            auth=(user, password),
+            max_connection_pool_size=max_connection_pool_size,
+        )
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def close(self):
+        await self.driver.close()
+
+    async def add_comment(
+        self, user_id, publication_id, text, parent_id=None, comment_id=None
+    ):
+        row = comment_row(user_id, publication_id, text, parent_id, comment_id)
+        async with self.driver.session() as session:
+            return (await session.execute_write(self._create_comments, [row]))[0]
+
+    async def add_comments_bulk(self, comments, batch_size=MIGRATION_BATCH_SIZE):
+        """Agrega comentarios (user_id, publication_id, text, parent_id) por lotes"""
+        rows = [comment_row(*comment) for comment in comments]
+        created = []
+        async with self.driver.session() as session:
+            for start in range(0, len(rows), batch_size):
+                batch = rows[start : start + batch_size]
+                created.extend(
+                    await session.execute_write(self._create_comments, batch)
+                )
+        return created
+
+    @staticmethod
+    async def _create_comments(tx, rows):
+        # execute_write reintenta esta funcion con las mismas filas: se copian
+        # para que un reintento vuelva a reservar los ids del intento abortado
+        rows = [dict(row) for row in rows]
+        pending = [row for row in rows if row["comment_id"] is None]
+        if pending:
+            result = await tx.run(ALLOCATE_IDS_QUERY, allocation_params(len(pending)))
+            first = (await result.single())["primero"]
+            for offset, row in enumerate(pending):
+                row["comment_id"] = first + offset
+
+        result = await tx.run(CREATE_COMMENTS_QUERY, rows=rows)
+        await result.consume()
+        return [row["comment_id"] for row in rows]
+
+    async def _fetch(self, query, **params):
+        async with self.driver.session() as session:
+            result = await session.run(query, params)
+            return [record async for record in result]
+
+    async def get_full_conversation(self, publication_id):
+        rows = await self._fetch(CONVERSATION_QUERY, pub_id=publication_id)
+        return build_comment_tree(publication_id, rows)
+
+    async def get_comment_page(
+        self, publication_id, parent_id=None, limit=COMMENT_PAGE_SIZE, after=None
+    ):
+        after_fecha, after_id = after if after is not None else CURSOR_START
+        rows = await self._fetch(
+            ROOT_PAGE_QUERY if parent_id is None else REPLY_PAGE_QUERY,
+            pub_id=publication_id,
+            parent_id=parent_id,
+            after_fecha=after_fecha,
+            after_id=after_id,
+            limit=limit + 1,
+        )
+        return comment_page(rows, limit)
+
+    async def get_all_publications(self):
+        return [record["id"] for record in await self._fetch(ALL_PUBLICATIONS_QUERY)]
+
+    async def get_all_users(self):
+        return [record["id"] for record in await self._fetch(ALL_USERS_QUERY)]
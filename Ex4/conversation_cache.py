@@ -0,0 +1,327 @@
+import copy
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from datetime import datetime
+
+from comment_store import COMMENT_PAGE_SIZE
+
+DEFAULT_MAX_COMMENTS = 50_000
+LIST_TTL = 60
+
+TREE = "tree"
+PAGE = "page"
+CONVERSATION = "conversation"
+
+
+def _index_tree(comments, index):
+    for comment in comments:
+        index[comment["id"]] = comment
+        _index_tree(comment["responses"], index)
+    return index
+
+
+def _count_nodes(comments):
+    return sum(1 + _count_nodes(comment["responses"]) for comment in comments)
+
+
+def _find_node(comments, comment_id, depth=0):
+    """(nodo, profundidad) de `comment_id` entre los comentarios cargados"""
+    for comment in comments:
+        if comment["id"] == comment_id:
+            return comment, depth
+        found = _find_node(comment["responses"], comment_id, depth + 1)
+        if found is not None:
+            return found
+    return None
+
+
+class SharedConversationCache:
+    """Entradas y contadores de un cache de conversaciones.
+
+    Varios CachedCommentSystem pueden compartir una instancia, cada uno con su
+    propio backend; asi las sesiones que no pueden compartir una conexion ven
+    el mismo cache y las escrituras de una invalidan las entradas de todas.
+    """
+
+    def __init__(self, max_comments=DEFAULT_MAX_COMMENTS, list_ttl=LIST_TTL):
+        self.max_comments = max_comments
+        self.list_ttl = list_ttl
+        self.hits = 0
+        self.misses = 0
+        self.entries = OrderedDict()
+        self.keys_by_pub = defaultdict(set)
+        self.generations = defaultdict(int)
+        self.indexes = {}
+        self.total_comments = 0
+        self.lists = {}
+        self.lock = threading.Lock()
+
+
+class CachedCommentSystem:
+    """Cache LRU delante de un sistema de comentarios.
+
+    Guarda las paginas que pide la interfaz (`get_conversation` y
+    `get_comment_page`, por publicacion, padre y cursor) y los arboles de
+    `get_full_conversation`, limitando el total de comentarios en memoria a
+    `max_comments`. `add_comment` actualiza las entradas de la publicacion en
+    vez de descartarlas: suma la respuesta al `reply_count` del padre y solo
+    descarta las ultimas paginas, que es donde aparece el comentario nuevo.
+    Las listas de publicaciones y usuarios expiran a los `list_ttl` segundos.
+    Con `shared` se usan las entradas de otro cache en vez de crear uno nuevo.
+    Los demas metodos se delegan al sistema original.
+    """
+
+    def __init__(
+        self,
+        backend,
+        max_comments=DEFAULT_MAX_COMMENTS,
+        list_ttl=LIST_TTL,
+        shared=None,
+    ):
+        self.backend = backend
+        self.shared = shared or SharedConversationCache(max_comments, list_ttl)
+
+    def __getattr__(self, name):
+        return getattr(self.backend, name)
+
+    def _remove(self, key):
+        _, size = self.shared.entries.pop(key)
+        self.shared.total_comments -= size
+        self.shared.keys_by_pub[key[1]].discard(key)
+        if key[0] == TREE:
+            self.shared.indexes.pop(key[1])
+
+    def _remove_publication(self, publication_id):
+        for key in list(self.shared.keys_by_pub.pop(publication_id, ())):
+            self._remove(key)
+
+    def _lookup(self, key):
+        """(valor, None) si esta en cache; (None, generacion) si hay que cargarlo"""
+        with self.shared.lock:
+            entry = self.shared.entries.get(key)
+            if entry is not None:
+                self.shared.entries.move_to_end(key)
+                self.shared.hits += 1
+                return entry[0], None
+            self.shared.misses += 1
+            return None, self.shared.generations[key[1]]
+
+    def _store(self, key, value, size, generation):
+        if size > self.shared.max_comments:
+            return
+        with self.shared.lock:
+            # Hubo una escritura en la publicacion mientras se cargaba
+            if self.shared.generations[key[1]] != generation:
+                return
+            if key in self.shared.entries:
+                self._remove(key)
+            self.shared.entries[key] = (value, size)
+            self.shared.keys_by_pub[key[1]].add(key)
+            if key[0] == TREE:
+                self.shared.indexes[key[1]] = _index_tree(value["comments"], {})
+            self.shared.total_comments += size
+            while self.shared.total_comments > self.shared.max_comments:
+                self._remove(next(iter(self.shared.entries)))
+
+    def _get_list(self, name, loader):
+        with self.shared.lock:
+            cached = self.shared.lists.get(name)
+            if cached is not None and cached[1] > time.monotonic():
+                self.shared.hits += 1
+                return cached[0]
+            self.shared.misses += 1
+        result = loader()
+        with self.shared.lock:
+            self.shared.lists[name] = (result, time.monotonic() + self.shared.list_ttl)
+        return result
+
+    def _drop_list_without(self, name, value):
+        cached = self.shared.lists.get(name)
+        if cached is not None and value not in cached[0]:
+            del self.shared.lists[name]
+
+    def get_all_publications(self):
+        return self._get_list("publications", self.backend.get_all_publications)
+
+    def get_all_users(self):
+        return self._get_list("users", self.backend.get_all_users)
+
+    def get_full_conversation(self, publication_id):
+        """Arbol completo de la publicacion.
+
+        Devuelve el arbol cacheado sin copiarlo, que puede ser muy grande: quien
+        lo recibe no debe modificarlo.
+        """
+        key = (TREE, publication_id)
+        tree, generation = self._lookup(key)
+        if tree is not None:
+            return tree
+
+        tree = self.backend.get_full_conversation(publication_id)
+        tree.setdefault("total_comments", 0)
+        self._store(key, tree, tree["total_comments"], generation)
+        return tree
+
+    def get_comment_page(
+        self, publication_id, parent_id=None, limit=COMMENT_PAGE_SIZE, after=None
+    ):
+        """Pagina cacheada por publicacion, padre y cursor; se devuelve una copia"""
+        key = (PAGE, publication_id, parent_id, limit, after)
+        page, generation = self._lookup(key)
+        if page is not None:
+            return copy.deepcopy(page)
+
+        page = self.backend.get_comment_page(
+            publication_id, parent_id=parent_id, limit=limit, after=after
+        )
+        size = _count_nodes(page["comments"])
+        self._store(key, copy.deepcopy(page), size, generation)
+        return page
+
+    def get_conversation(
+        self,
+        publication_id,
+        limit=COMMENT_PAGE_SIZE,
+        after=None,
+        max_depth=1,
+        replies_limit=5,
+    ):
+        """Pagina de conversacion cacheada; se devuelve una copia"""
+        key = (CONVERSATION, publication_id, limit, after, max_depth, replies_limit)
+        view, generation = self._lookup(key)
+        if view is not None:
+            return copy.deepcopy(view)
+
+        view = self.backend.get_conversation(
+            publication_id,
+            limit=limit,
+            after=after,
+            max_depth=max_depth,
+            replies_limit=replies_limit,
+        )
+        size = _count_nodes(view["comments"])
+        self._store(key, copy.deepcopy(view), size, generation)
+        return view
+
+    def _add_to_tree(self, publication_id, node, parent_id):
+        key = (TREE, publication_id)
+        tree = self.shared.entries[key][0]
+        index = self.shared.indexes[publication_id]
+        if parent_id is None:
+            siblings = tree["comments"]
+        elif parent_id in index:
+            siblings = index[parent_id]["responses"]
+        else:
+            self._remove(key)
+            return
+
+        siblings.append(node)
+        index[node["id"]] = node
+        tree["total_comments"] += 1
+        self.shared.entries[key] = (tree, self.shared.entries[key][1] + 1)
+        self.shared.total_comments += 1
+
+    def _add_to_page(self, key, parent_id):
+        """Aplica una respuesta nueva a una pagina; False si hay que descartarla"""
+        page = self.shared.entries[key][0]
+        if key[0] == PAGE:
+            page_parent, max_depth = key[2], 0
+        else:
+            page_parent, max_depth = None, key[4]
+
+        # El comentario nuevo es el ultimo de su lista y cae en la ultima pagina
+        if page_parent == parent_id and page["next_cursor"] is None:
+            return False
+
+        if parent_id is not None:
+            found = _find_node(page["comments"], parent_id)
+            if found is not None:
+                parent, depth = found
+                # Las respuestas del padre vienen precargadas en esta pagina
+                if depth < max_depth:
+                    return False
+                parent["reply_count"] += 1
+
+        if key[0] == CONVERSATION:
+            page["total_comments"] += 1
+        return True
+
+    def add_comment(self, user_id, publication_id, text, parent_id=None):
+        comment_id = self.backend.add_comment(
+            user_id, publication_id, text, parent_id=parent_id
+        )
+
+        with self.shared.lock:
+            self._drop_list_without("publications", publication_id)
+            self._drop_list_without("users", user_id)
+            self.shared.generations[publication_id] += 1
+
+            for key in list(self.shared.keys_by_pub.get(publication_id, ())):
+                if key[0] == TREE:
+                    node = {
+                        "id": comment_id,
+                        "texto": text,
+                        "fechaCreacion": datetime.now(),
+                        "user_id": user_id,
+                        "responses": [],
+                    }
+                    self._add_to_tree(publication_id, node, parent_id)
+                elif not self._add_to_page(key, parent_id):
+                    self._remove(key)
+        return comment_id
+
+    def add_comments_bulk(self, comments, *args, **kwargs):
+        """Agrega comentarios en el backend y descarta las publicaciones afectadas"""
+        created = self.backend.add_comments_bulk(comments, *args, **kwargs)
+        with self.shared.lock:
+            for _, publication_id, *_ in comments:
+                self.shared.generations[publication_id] += 1
+                self._remove_publication(publication_id)
+            self.shared.lists.clear()
+        return created
+
+    def delete_comments(self, comment_ids):
+        """Elimina en el backend y vacia las conversaciones cacheadas.
+
+        Los ids no indican a que publicacion pertenecen ni que paginas cuentan
+        sus respuestas, asi que se descartan todas las entradas.
+        """
+        result = self.backend.delete_comments(comment_ids)
+        with self.shared.lock:
+            self._clear_entries()
+        return result
+
+    def create_test_conversations(self, *args, **kwargs):
+        result = self.backend.create_test_conversations(*args, **kwargs)
+        self.clear()
+        return result
+
+    def clear_comments(self):
+        result = self.backend.clear_comments()
+        self.clear()
+        return result
+
+    def _clear_entries(self):
+        self.shared.entries.clear()
+        self.shared.keys_by_pub.clear()
+        for publication_id in self.shared.generations:
+            self.shared.generations[publication_id] += 1
+        self.shared.indexes.clear()
+        self.shared.total_comments = 0
+
+    def clear(self):
+        with self.shared.lock:
+            self._clear_entries()
+            self.shared.lists.clear()
+
+    def stats(self):
+        with self.shared.lock:
+            return {
+                "hits": self.shared.hits,
+                "misses": self.shared.misses,
+                "publicaciones": sum(
+                    1 for keys in self.shared.keys_by_pub.values() if keys
+                ),
+                "comentarios": self.shared.total_comments,
+            }
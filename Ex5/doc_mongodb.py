@@ -1,6 +1,8 @@
+import hashlib
 import json
 import mimetypes
 import os
+import tempfile
 from datetime import datetime
 from pathlib import Path
 from urllib.parse import quote_plus
@@ -8,6 +10,26 @@ from urllib.parse import quote_plus
 import pymongo
 from pymongo import MongoClient
 
+DOCUMENT_CHUNK_SIZE = 1024 * 1024
+
+# Permisos de los documentos guardados (mkstemp los crea con 0600)
+DOCUMENT_FILE_MODE = 0o644
+
+
+def iter_chunks(content, chunk_size=DOCUMENT_CHUNK_SIZE):
+    """Bloques de bytes de `content`: bytes, str o un objeto con `read()`"""
+    if not hasattr(content, "read"):
+        if not isinstance(content, (bytes, str)):
+            content = str(content)
+        if isinstance(content, str):
+            content = content.encode("utf-8")
+        for start in range(0, len(content), chunk_size):
+            yield content[start : start + chunk_size]
+        return
+
+    while chunk := content.read(chunk_size):
+        yield chunk.encode("utf-8") if isinstance(chunk, str) else chunk
+
 
 class MongoDBPlantDocumentSystem:
     def __init__(
@@ -51,6 +73,10 @@ class MongoDBPlantDocumentSystem:
             print(f"Note: Index creation may require authentication: {e}")
 
     def save_document_to_filesystem(self, plant_id, content, filename, is_principal):
+        """Guarda `content` (bytes, str u objeto con `read()`) en bloques.
+
+        Retorna la tupla `(ruta, tamano, sha256)` del archivo guardado.
+        """
         if is_principal:
             file_path = self.storage_base_path / str(plant_id) / "principal" / filename
         else:
@@ -60,20 +86,29 @@ class MongoDBPlantDocumentSystem:
 
         file_path.parent.mkdir(parents=True, exist_ok=True)
 
-        if isinstance(content, bytes):
-            with open(file_path, "wb") as f:
-                f.write(content)
-        else:
-            if not isinstance(content, str):
-                content = str(content)
-            with open(file_path, "w", encoding="utf-8") as f:
-                f.write(content)
-
-        return str(file_path)
+        # Se escribe en un temporal del mismo directorio y se renombra al
+        # final, asi nunca queda un archivo a medio escribir con el nombre real
+        digest = hashlib.sha256()
+        size = 0
+        fd, temp_path = tempfile.mkstemp(dir=file_path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for chunk in iter_chunks(content):
+                    f.write(chunk)
+                    digest.update(chunk)
+                    size += len(chunk)
+            os.chmod(temp_path, DOCUMENT_FILE_MODE)
+            os.replace(temp_path, file_path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+        return str(file_path), size, digest.hexdigest()
 
     def insert_main_document(self, plant_id, content, filename, plant_data=None):
-        file_path = self.save_document_to_filesystem(plant_id, content, filename, True)
-        file_size = os.path.getsize(file_path)
+        file_path, file_size, sha256 = self.save_document_to_filesystem(
+            plant_id, content, filename, True
+        )
         mime_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
 
         main_doc = {
@@ -83,6 +118,7 @@ class MongoDBPlantDocumentSystem:
             "ruta_archivo": file_path,
             "mime_type": mime_type,
             "tamano": file_size,
+            "sha256": sha256,
             "es_principal": True,
             "documentos_secundarios": [],
             "fecha_creacion": datetime.now(),
@@ -101,8 +137,9 @@ class MongoDBPlantDocumentSystem:
     def insert_secondary_document(
         self, plant_id, tipo_documento, content, filename, parent_id=None, metadata=None
     ):
-        file_path = self.save_document_to_filesystem(plant_id, content, filename, False)
-        file_size = os.path.getsize(file_path)
+        file_path, file_size, sha256 = self.save_document_to_filesystem(
+            plant_id, content, filename, False
+        )
         mime_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
 
         main_doc = self.documents.find_one({"plant_id": plant_id, "es_principal": True})
@@ -115,6 +152,7 @@ class MongoDBPlantDocumentSystem:
             "ruta_archivo": file_path,
             "mime_type": mime_type,
             "tamano": file_size,
+            "sha256": sha256,
             "es_principal": False,
             "documento_padre": parent_doc_id,
             "fecha_creacion": datetime.now(),
@@ -136,6 +174,7 @@ class MongoDBPlantDocumentSystem:
             "filepath": doc["ruta_archivo"],
             "mime_type": doc["mime_type"],
             "size": doc["tamano"],
+            "sha256": doc.get("sha256"),
             "created": doc["fecha_creacion"],
             "updated": doc["fecha_actualizacion"],
             "is_principal": doc.get("es_principal", False),
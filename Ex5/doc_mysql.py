@@ -4,45 +4,45 @@ import os
 from datetime import datetime
 from pathlib import Path
 
-import mysql.connector as mq
+from mysql_pool import get_pool
 
 
 class PlantDocumentSystem:
     def __init__(self, db_config, base_path="greenscape_docs"):
         self.db_config = db_config
+        self.pool = get_pool(db_config)
         self.base_path = Path(base_path)
         self.base_path.mkdir(exist_ok=True)
         self.create_table()
 
     def get_db_connection(self):
-        return mq.connect(**self.db_config)
+        return self.pool.connection()
 
     def create_table(self):
-        connection = self.get_db_connection()
-        cursor = connection.cursor()
-
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS DocumentoPlanta (
-            IDDocumento INT AUTO_INCREMENT PRIMARY KEY,
-            IDProd INT NOT NULL,
-            TipoDocumento VARCHAR(100) NOT NULL,
-            NombreArchivo VARCHAR(255) NOT NULL,
-            RutaArchivo TEXT NOT NULL,
-            MimeType VARCHAR(100),
-            Tamano INT,
-            EsPrincipal BOOLEAN DEFAULT FALSE,
-            DocumentoPadre INT,
-            FechaCreacion DATETIME DEFAULT CURRENT_TIMESTAMP,
-            FechaActualizacion DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
-            MetadatosAdicionales JSON,
-            INDEX idx_plant (IDProd),
-            INDEX idx_principal (IDProd, EsPrincipal)
-        )
-        """)
+        with self.get_db_connection() as connection:
+            cursor = connection.cursor()
+
+            cursor.execute("""
+            CREATE TABLE IF NOT EXISTS DocumentoPlanta (
+                IDDocumento INT AUTO_INCREMENT PRIMARY KEY,
+                IDProd INT NOT NULL,
+                TipoDocumento VARCHAR(100) NOT NULL,
+                NombreArchivo VARCHAR(255) NOT NULL,
+                RutaArchivo TEXT NOT NULL,
+                MimeType VARCHAR(100),
+                Tamano INT,
+                EsPrincipal BOOLEAN DEFAULT FALSE,
+                DocumentoPadre INT,
+                FechaCreacion DATETIME DEFAULT CURRENT_TIMESTAMP,
+                FechaActualizacion DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+                MetadatosAdicionales JSON,
+                INDEX idx_plant (IDProd),
+                INDEX idx_principal (IDProd, EsPrincipal)
+            )
+            """)
 
-        connection.commit()
-        cursor.close()
-        connection.close()
+            connection.commit()
+            cursor.close()
 
     def get_plant_directory(self, plant_id):
         plant_dir = self.base_path / str(plant_id)
@@ -83,9 +83,31 @@ class PlantDocumentSystem:
         is_principal=False,
         parent_doc_id=None,
         metadata=None,
+        cursor=None,
     ):
-        connection = self.get_db_connection()
-        cursor = connection.cursor()
+        """Inserta la fila del documento y retorna su id.
+
+        Con `cursor` se usa la conexion de quien llama y el commit queda a su
+        cargo; sin el se toma una conexion del pool y se confirma aqui.
+        """
+        if cursor is None:
+            with self.get_db_connection() as connection:
+                cursor = connection.cursor()
+                document_id = self.insert_document_metadata(
+                    plant_id,
+                    tipo_documento,
+                    filename,
+                    filepath,
+                    mime_type,
+                    file_size,
+                    is_principal=is_principal,
+                    parent_doc_id=parent_doc_id,
+                    metadata=metadata,
+                    cursor=cursor,
+                )
+                connection.commit()
+                cursor.close()
+            return document_id
 
         if metadata and not isinstance(metadata, str):
             metadata = json.dumps(metadata)
@@ -110,140 +132,134 @@ class PlantDocumentSystem:
                 metadata,
             ),
         )
-
-        document_id = cursor.lastrowid
-        connection.commit()
-        cursor.close()
-        connection.close()
-
-        return document_id
+        return cursor.lastrowid
 
     def insert_main_document(self, plant_id, content, filename, plant_data=None):
         mime_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
 
-        connection = self.get_db_connection()
-        cursor = connection.cursor(dictionary=True)
-
-        cursor.execute(
-            "SELECT IDDocumento FROM DocumentoPlanta WHERE IDProd = %s AND EsPrincipal = TRUE",
-            (plant_id,),
-        )
-        existing_main = cursor.fetchone()
+        with self.get_db_connection() as connection:
+            cursor = connection.cursor(dictionary=True)
 
-        if existing_main:
             cursor.execute(
-                """
-                UPDATE DocumentoPlanta
-                SET NombreArchivo = %s, RutaArchivo = %s, MimeType = %s, Tamano = %s, MetadatosAdicionales = %s
-                WHERE IDDocumento = %s
-                """,
-                (
-                    filename,
-                    str(self.save_document_file(plant_id, content, filename, True)),
-                    mime_type,
-                    len(content) if isinstance(content, str) else len(content),
-                    json.dumps(plant_data) if plant_data else None,
-                    existing_main["IDDocumento"],
-                ),
+                "SELECT IDDocumento FROM DocumentoPlanta WHERE IDProd = %s AND EsPrincipal = TRUE",
+                (plant_id,),
             )
-            doc_id = existing_main["IDDocumento"]
-        else:
-            filepath = self.save_document_file(plant_id, content, filename, True)
+            existing_main = cursor.fetchone()
+
+            if existing_main:
+                cursor.execute(
+                    """
+                    UPDATE DocumentoPlanta
+                    SET NombreArchivo = %s, RutaArchivo = %s, MimeType = %s, Tamano = %s, MetadatosAdicionales = %s
+                    WHERE IDDocumento = %s
+                    """,
+                    (
+                        filename,
+                        str(self.save_document_file(plant_id, content, filename, True)),
+                        mime_type,
+                        len(content) if isinstance(content, str) else len(content),
+                        json.dumps(plant_data) if plant_data else None,
+                        existing_main["IDDocumento"],
+                    ),
+                )
+                doc_id = existing_main["IDDocumento"]
+            else:
+                filepath = self.save_document_file(plant_id, content, filename, True)
+                file_size = os.path.getsize(filepath)
+
+                doc_id = self.insert_document_metadata(
+                    plant_id=plant_id,
+                    tipo_documento="Ficha Tecnica",
+                    filename=filename,
+                    filepath=filepath,
+                    mime_type=mime_type,
+                    file_size=file_size,
+                    is_principal=True,
+                    metadata=plant_data,
+                    cursor=cursor,
+                )
+
+            connection.commit()
+            cursor.close()
+        return doc_id
+
+    def insert_secondary_document(
+        self, plant_id, tipo_documento, content, filename, parent_id=None, metadata=None
+    ):
+        mime_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+
+        with self.get_db_connection() as connection:
+            cursor = connection.cursor(dictionary=True)
+
+            if parent_id is None:
+                cursor.execute(
+                    "SELECT IDDocumento FROM DocumentoPlanta WHERE IDProd = %s AND EsPrincipal = TRUE",
+                    (plant_id,),
+                )
+                main_doc = cursor.fetchone()
+
+                if main_doc:
+                    parent_id = main_doc["IDDocumento"]
+
+            filepath = self.save_document_file(plant_id, content, filename, False)
             file_size = os.path.getsize(filepath)
 
             doc_id = self.insert_document_metadata(
                 plant_id=plant_id,
-                tipo_documento="Ficha Tecnica",
+                tipo_documento=tipo_documento,
                 filename=filename,
                 filepath=filepath,
                 mime_type=mime_type,
                 file_size=file_size,
-                is_principal=True,
-                metadata=plant_data,
+                is_principal=False,
+                parent_doc_id=parent_id,
+                metadata=metadata,
+                cursor=cursor,
             )
 
-        connection.commit()
-        cursor.close()
-        connection.close()
+            connection.commit()
+            cursor.close()
         return doc_id
 
-    def insert_secondary_document(
-        self, plant_id, tipo_documento, content, filename, parent_id=None, metadata=None
-    ):
-        mime_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
-
-        if parent_id is None:
-            connection = self.get_db_connection()
+    def get_plant_documents(self, plant_id):
+        with self.get_db_connection() as connection:
             cursor = connection.cursor(dictionary=True)
+
             cursor.execute(
-                "SELECT IDDocumento FROM DocumentoPlanta WHERE IDProd = %s AND EsPrincipal = TRUE",
+                """
+                SELECT * FROM DocumentoPlanta
+                WHERE IDProd = %s AND EsPrincipal = TRUE
+                """,
                 (plant_id,),
             )
-            main_doc = cursor.fetchone()
-            cursor.close()
-            connection.close()
-
-            if main_doc:
-                parent_id = main_doc["IDDocumento"]
-
-        filepath = self.save_document_file(plant_id, content, filename, False)
-        file_size = os.path.getsize(filepath)
-
-        doc_id = self.insert_document_metadata(
-            plant_id=plant_id,
-            tipo_documento=tipo_documento,
-            filename=filename,
-            filepath=filepath,
-            mime_type=mime_type,
-            file_size=file_size,
-            is_principal=False,
-            parent_doc_id=parent_id,
-            metadata=metadata,
-        )
 
-        return doc_id
-
-    def get_plant_documents(self, plant_id):
-        connection = self.get_db_connection()
-        cursor = connection.cursor(dictionary=True)
+            principal_doc = cursor.fetchone()
 
-        cursor.execute(
-            """
-            SELECT * FROM DocumentoPlanta
-            WHERE IDProd = %s AND EsPrincipal = TRUE
-            """,
-            (plant_id,),
-        )
-
-        principal_doc = cursor.fetchone()
-
-        if not principal_doc:
-            cursor.close()
-            connection.close()
-            return None
+            if not principal_doc:
+                cursor.close()
+                return None
 
-        cursor.execute(
-            """
-            SELECT * FROM DocumentoPlanta
-            WHERE IDProd = %s AND EsPrincipal = FALSE
-            ORDER BY TipoDocumento, FechaCreacion
-            """,
-            (plant_id,),
-        )
+            cursor.execute(
+                """
+                SELECT * FROM DocumentoPlanta
+                WHERE IDProd = %s AND EsPrincipal = FALSE
+                ORDER BY TipoDocumento, FechaCreacion
+                """,
+                (plant_id,),
+            )
 
-        secondary_docs = cursor.fetchall()
+            secondary_docs = cursor.fetchall()
 
-        hierarchical_structure = {
-            "plant_id": plant_id,
-            "main_document": self.format_document(principal_doc),
-            "secondary_documents": [
-                self.format_document(doc) for doc in secondary_docs
-            ],
-            "total_documents": 1 + len(secondary_docs),
-        }
+            hierarchical_structure = {
+                "plant_id": plant_id,
+                "main_document": self.format_document(principal_doc),
+                "secondary_documents": [
+                    self.format_document(doc) for doc in secondary_docs
+                ],
+                "total_documents": 1 + len(secondary_docs),
+            }
 
-        cursor.close()
-        connection.close()
+            cursor.close()
         return hierarchical_structure
 
     def format_document(self, doc):
@@ -274,27 +290,28 @@ class PlantDocumentSystem:
         return formatted
 
     def get_all_plant_ids(self):
-        connection = self.get_db_connection()
-        cursor = connection.cursor()
+        with self.get_db_connection() as connection:
+            cursor = connection.cursor()
 
-        cursor.execute("SELECT DISTINCT IDProd FROM DocumentoPlanta ORDER BY IDProd")
-        plant_ids = [row[0] for row in cursor.fetchall()]
+            cursor.execute(
+                "SELECT DISTINCT IDProd FROM DocumentoPlanta ORDER BY IDProd"
+            )
+            plant_ids = [row[0] for row in cursor.fetchall()]
 
-        cursor.close()
-        connection.close()
+            cursor.close()
         return plant_ids
 
     def get_document_content(self, doc_id):
-        connection = self.get_db_connection()
-        cursor = connection.cursor(dictionary=True)
+        with self.get_db_connection() as connection:
+            cursor = connection.cursor(dictionary=True)
 
-        cursor.execute(
-            "SELECT RutaArchivo FROM DocumentoPlanta WHERE IDDocumento = %s", (doc_id,)
-        )
-        doc = cursor.fetchone()
+            cursor.execute(
+                "SELECT RutaArchivo FROM DocumentoPlanta WHERE IDDocumento = %s",
+                (doc_id,),
+            )
+            doc = cursor.fetchone()
 
-        cursor.close()
-        connection.close()
+            cursor.close()
 
         if doc:
             try:
@@ -306,30 +323,29 @@ class PlantDocumentSystem:
         return None
 
     def update_document_metadata(self, doc_id, metadata_updates):
-        connection = self.get_db_connection()
-        cursor = connection.cursor()
+        with self.get_db_connection() as connection:
+            cursor = connection.cursor()
 
-        current_metadata = {}
-        cursor.execute(
-            "SELECT MetadatosAdicionales FROM DocumentoPlanta WHERE IDDocumento = %s",
-            (doc_id,),
-        )
-        result = cursor.fetchone()
+            current_metadata = {}
+            cursor.execute(
+                "SELECT MetadatosAdicionales FROM DocumentoPlanta WHERE IDDocumento = %s",
+                (doc_id,),
+            )
+            result = cursor.fetchone()
 
-        if result and result[0]:
-            try:
-                current_metadata = json.loads(result[0])
-            except:
-                current_metadata = {}
+            if result and result[0]:
+                try:
+                    current_metadata = json.loads(result[0])
+                except:
+                    current_metadata = {}
 
-        current_metadata.update(metadata_updates)
+            current_metadata.update(metadata_updates)
 
-        cursor.execute(
-            "UPDATE DocumentoPlanta SET MetadatosAdicionales = %s WHERE IDDocumento = %s",
-            (json.dumps(current_metadata), doc_id),
-        )
+            cursor.execute(
+                "UPDATE DocumentoPlanta SET MetadatosAdicionales = %s WHERE IDDocumento = %s",
+                (json.dumps(current_metadata), doc_id),
+            )
 
-        connection.commit()
-        cursor.close()
-        connection.close()
+            connection.commit()
+            cursor.close()
         return True
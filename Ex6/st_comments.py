@@ -1,92 +1,223 @@
 import json
 import sys
 
-import mysql.connector as mq
 import streamlit as st
 
 sys.path.append("Ex4")
 
-from Ex4.comments_mysql import MySqlCommentSystem
-from Ex4.comments_neo4j import Neo4jCommentSystem
+from Ex4.comment_store import open_comment_store
+from Ex4.conversation_cache import CachedCommentSystem, SharedConversationCache
 
 with open("connection.json", "r") as connections:
-    file = json.load(connections)
-    neo4j_conn = file["neo4j"]
-    mysql_conn = file["mysql"]
+    connection_settings = json.load(connections)
 
 
-def init_neo4j_from_streamlit():
+@st.cache_resource
+def get_shared_conversation_cache():
+    """Cache de conversaciones comun a todas las sesiones del proceso"""
+    return SharedConversationCache()
+
+
+def init_comment_store_from_streamlit():
     try:
-        neo4j_system = Neo4jCommentSystem(**neo4j_conn, mysql_db_connection=mysql_conn)
-        st.session_state.neo4j_system = neo4j_system
-        st.session_state.neo4j_connected = True
-        st.success("✅ Conexión exitosa a Neo4j")
+        # Cada sesion abre su backend (la conexion de MySQL no se comparte entre
+        # hilos), pero todas leen y escriben el mismo cache
+        comment_store = CachedCommentSystem(
+            open_comment_store(connection_settings),
+            shared=get_shared_conversation_cache(),
+        )
+        st.session_state.comment_store = comment_store
+        st.session_state.comments_connected = True
+        st.success("✅ Conexión exitosa al sistema de comentarios")
         st.rerun()
     except Exception as e:
         st.error(f"❌ Error de conexión: {str(e)}")
 
 
-def display_comment_tree(pub_id, replier_id):
-    conversation_data = st.session_state.neo4j_system.get_full_conversation(pub_id)
-    if not conversation_data:
-        st.info("No hay comentarios en esta publicación.")
+COMMENTS_PAGE_SIZE = 10
+MAX_INDENT = 6
+
+
+def get_conversation_view(pub_id):
+    """Comentarios ya cargados de la publicacion, guardados en la sesion"""
+    view = st.session_state.get("conversation_view")
+    if view is None or view["Publicacion"] != pub_id:
+        view = st.session_state.comment_store.get_conversation(
+            pub_id, limit=COMMENTS_PAGE_SIZE, max_depth=0
+        )
+        st.session_state.conversation_view = view
+        st.session_state.pop("reply_target", None)
+    return view
+
+
+def reset_conversation_view():
+    st.session_state.pop("conversation_view", None)
+
+
+def load_more_comments(view):
+    page = st.session_state.comment_store.get_conversation(
+        view["Publicacion"],
+        limit=COMMENTS_PAGE_SIZE,
+        after=view["next_cursor"],
+        max_depth=0,
+    )
+    view["comments"].extend(page["comments"])
+    view["next_cursor"] = page["next_cursor"]
+
+
+def expand_replies(pub_id, comment):
+    responses = comment["responses"]
+    after = None
+    if responses:
+        after = (responses[-1]["fechaCreacion"], responses[-1]["id"])
+    page = st.session_state.comment_store.get_comment_page(
+        pub_id, parent_id=comment["id"], limit=COMMENTS_PAGE_SIZE, after=after
+    )
+    responses.extend(page["comments"])
+
+
+def add_reply_to_view(view, parent, comment_id, user_id, text):
+    """Agrega una respuesta recien creada a la vista sin volver a consultarla"""
+    # Si quedan respuestas sin cargar, la nueva aparecera al expandirlas
+    if len(parent["responses"]) == parent["reply_count"]:
+        parent["responses"].append(
+            {
+                "id": comment_id,
+                "texto": text,
+                "fechaCreacion": None,
+                "user_id": user_id,
+                "reply_count": 0,
+                "responses": [],
+            }
+        )
+    parent["reply_count"] += 1
+    view["total_comments"] += 1
+
+
+def select_reply_target(root_id, comment_id):
+    """Abre el editor de respuesta bajo `comment_id`, dentro del hilo `root_id`"""
+    previous = st.session_state.get("reply_target")
+    st.session_state.reply_target = (root_id, comment_id)
+    # El editor anterior esta en otro fragmento; hay que redibujar la pagina
+    if previous is not None and previous[0] != root_id:
+        st.rerun()
+    st.rerun(scope="fragment")
+
+
+def show_reply_composer(pub_id, comment, replier_id):
+    text = st.text_area(
+        f"Responder al comentario {comment['id']}", key="reply_composer"
+    )
+    col_send, col_cancel = st.columns(2)
+    with col_send:
+        if st.button("Publicar", key="reply_send", disabled=not text.strip()):
+            new_id = st.session_state.comment_store.add_comment(
+                replier_id, pub_id, text, parent_id=comment["id"]
+            )
+            add_reply_to_view(
+                st.session_state.conversation_view, comment, new_id, replier_id, text
+            )
+            comment["expanded"] = True
+            close_reply_composer()
+    with col_cancel:
+        if st.button("Cancelar", key="reply_cancel"):
+            close_reply_composer()
+
+
+def close_reply_composer():
+    st.session_state.pop("reply_target", None)
+    st.session_state.pop("reply_composer", None)
+    st.rerun(scope="fragment")
+
+
+def show_comment(pub_id, root_id, comment, replier_id, level=0):
+    """Dibuja un comentario y, si esta expandido, sus respuestas ya cargadas"""
+    comment_id = comment["id"]
+    _, body = st.columns([min(level, MAX_INDENT) + 0.01, 12])
+    with body:
+        st.write(f"**👤 Usuario {comment['user_id']}**")
+        st.write(comment["texto"])
+        st.caption(f"ID: {comment_id} • Respuestas: {comment['reply_count']}")
+
+        expanded = comment.get("expanded", False)
+        col_reply, col_toggle = st.columns(2)
+        with col_reply:
+            if st.button("Responder", key=f"reply {comment_id}"):
+                select_reply_target(root_id, comment_id)
+        with col_toggle:
+            if comment["reply_count"]:
+                label = (
+                    "Ocultar respuestas"
+                    if expanded
+                    else f"Ver respuestas ({comment['reply_count']})"
+                )
+                if st.button(label, key=f"toggle {comment_id}"):
+                    if not expanded and not comment["responses"]:
+                        expand_replies(pub_id, comment)
+                    comment["expanded"] = not expanded
+                    st.rerun(scope="fragment")
+
+        if st.session_state.get("reply_target") == (root_id, comment_id):
+            show_reply_composer(pub_id, comment, replier_id)
+
+    if not expanded:
         return
 
+    for reply in comment["responses"]:
+        show_comment(pub_id, root_id, reply, replier_id, level + 1)
+
+    pending = comment["reply_count"] - len(comment["responses"])
+    if pending > 0:
+        _, body = st.columns([min(level + 1, MAX_INDENT) + 0.01, 12])
+        with body:
+            if st.button(f"↳ Ver más ({pending})", key=f"more {comment_id}"):
+                expand_replies(pub_id, comment)
+                st.rerun(scope="fragment")
+
+
+@st.fragment
+def show_thread(pub_id, root, replier_id):
+    """Hilo de un comentario raiz; sus botones solo vuelven a ejecutar este hilo"""
+    show_comment(pub_id, root["id"], root, replier_id)
+
+
+def display_comment_tree(pub_id, replier_id):
     if st.button("Create Test Data for this publication"):
-        st.session_state.neo4j_system.create_test_conversations(pub_id, replier_id)
+        st.session_state.comment_store.create_test_conversations(pub_id, replier_id)
+        reset_conversation_view()
         st.rerun()
 
-    def show_comment(comment, level=0):
-        comment_id = comment["id"]
-        user_id = comment["user_id"]
-        if level > 0:
-            cols = st.columns([level, 12 - level])
-        else:
-            cols = st.columns(1)
-        with cols[-1]:
-            col1, col2 = st.columns([1, 4])
-            with col1:
-                st.write(f"**👤 Usuario {user_id}**")
-            with col2:
-                st.write(comment["texto"])
-                st.caption(
-                    f"ID: {comment_id} • Respuestas: {len(comment.get('responses', []))}"
-                )
-                reply_text = st.text_input(
-                    "Write a Reply", key=f"reply_text {comment_id}"
-                )
-                if st.button("Responder", key=f"reply_button {comment_id}"):
-                    st.session_state.neo4j_system.add_comment(
-                        replier_id, pub_id, reply_text, parent_comment_id=comment_id
-                    )
-                    st.rerun()
-
-        for reply in comment.get("responses", []):
-            with st.container():
-                st.markdown(
-                    """
-                <div style="margin-left: 30px; padding-left: 10px; border-left: 2px solid #4CAF50;">
-                """,
-                    unsafe_allow_html=True,
-                )
-                show_comment(reply, level + 1)
-                st.markdown("</div>", unsafe_allow_html=True)
+    conversation_data = get_conversation_view(pub_id)
+    if not conversation_data["comments"]:
+        st.info("No hay comentarios en esta publicación.")
+        return
 
     for comment in conversation_data["comments"]:
-        show_comment(comment)
+        show_thread(pub_id, comment, replier_id)
         st.divider()
 
+    if conversation_data["next_cursor"] is not None:
+        if st.button("Cargar más comentarios"):
+            load_more_comments(conversation_data)
+            st.rerun()
+
     st.metric("Total de comentarios", conversation_data.get("total_comments", 0))
 
 
 def show_conversation_manager():
-    if "neo4j_system" not in st.session_state:
-        init_neo4j_from_streamlit()
-    all_pubs = st.session_state.neo4j_system.get_all_publications()
-    all_users = st.session_state.neo4j_system.get_all_users()
+    if "comment_store" not in st.session_state:
+        init_comment_store_from_streamlit()
+    all_pubs = st.session_state.comment_store.get_all_publications()
+    all_users = st.session_state.comment_store.get_all_users()
     col1, col2 = st.columns(2)
     with col1:
         current_pub = st.selectbox("Selecciona una Publicación", all_pubs)
     with col2:
         current_user = st.selectbox("Selecciona un Usuario", all_users)
     display_comment_tree(current_pub, current_user)
+
+    stats = st.session_state.comment_store.stats()
+    st.caption(
+        f"Cache de conversaciones: {stats['hits']} aciertos, "
+        f"{stats['misses']} fallos, {stats['comentarios']} comentarios en memoria"
+    )
@@ -1,9 +1,8 @@
-import json
 import os
 
-import mysql.connector as mq
 import streamlit as st
 from doc_mongodb import MongoDBPlantDocumentSystem
+from mysql_pool import pooled_connection
 
 
 def show_document_system():
@@ -33,14 +32,12 @@ def show_document_system():
         if st.button("🔄 Actualizar"):
             st.rerun()
 
-    with open("connection.json", "r") as file:
-        mysql_connection = json.load(file)["mysql"]
-        conn = mq.connect(**mysql_connection)
-    cursor = conn.cursor()
-    cursor.execute("SELECT IDProd FROM Planta")
-    plant_ids = cursor.fetchall()
+    with pooled_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT IDProd FROM Planta")
+        plant_ids = cursor.fetchall()
+        cursor.close()
     plant_ids = [id[0] for id in plant_ids]
-    conn.close()
 
     selected_plant = st.selectbox(
         "🌱 **Selecciona una planta:**",
@@ -69,12 +66,13 @@ def show_document_system():
             st.write(f"📄 Archivo seleccionado: {uploaded_file.name}")
 
             if st.button("Subir como Documento Principal", type="primary"):
-                content = uploaded_file.read()
                 filename = uploaded_file.name
 
                 with st.spinner("Subiendo documento..."):
                     doc_system.insert_main_document(
-                        plant_id=selected_plant, content=content, filename=filename
+                        plant_id=selected_plant,
+                        content=uploaded_file,
+                        filename=filename,
                     )
                     st.success("✅ Documento principal agregado exitosamente!")
                     st.rerun()
@@ -282,7 +280,6 @@ def show_document_system():
         if upload_type == "Secundario":
             doc_type = st.text_input("Tipo de Documento")
         if st.button("Subir Documento", type="primary"):
-            content = uploaded_file.read()
             filename = uploaded_file.name
 
             with st.spinner("Subiendo documento..."):
@@ -290,7 +287,7 @@ def show_document_system():
                     if upload_type == "Principal":
                         doc_system.insert_main_document(
                             plant_id=selected_plant,
-                            content=content,
+                            content=uploaded_file,
                             filename=filename,
                         )
                         st.success("✅ Documento principal agregado exitosamente!")
@@ -298,7 +295,7 @@ def show_document_system():
                         doc_system.insert_secondary_document(
                             plant_id=selected_plant,
                             tipo_documento=doc_type,
-                            content=content,
+                            content=uploaded_file,
                             filename=filename,
                         )
                         st.success("✅ Documento secundario agregado exitosamente!")
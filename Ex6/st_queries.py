@@ -1,229 +1,293 @@
 import json
 
-import mysql.connector as mq
 import mysql_queries as queries
 import pandas as pd
+import seller_stats
 import streamlit as st
+from mysql_pool import get_pool
+from query_cache import get_query_cache
 
 with open("connection.json", "r") as file:
     db_connection = json.load(file)
 
 
 def get_db_connection(connection=db_connection):
-    return mq.connect(**connection["mysql"])
+    return get_pool(connection["mysql"]).connection()
 
 
-def mysql_run_query(query: str) -> list[tuple]:
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute(query)
-    results = cursor.fetchall()
+def mysql_run_query(query: str, params=None) -> list[tuple]:
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(query, params)
+        results = cursor.fetchall()
+        cursor.close()
     return results
 
 
-def mysql_get_query_results(inciso: str):
-    """Corre las queries del ejercicio y retorna una tabla en pandas"""
-    query = queries.queries[inciso]
-    columns = queries.columns[inciso]
-    results = mysql_run_query(query)
-    if results:
-        col_amount = len(results[0])
-        if len(columns) < col_amount:
-            columns = list(range(1, col_amount + 1))
-        return pd.DataFrame(results, columns=columns)
+def mysql_fetch_dataframe(query: str, params=None) -> pd.DataFrame:
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(query, params)
+        results = cursor.fetchall()
+        columns = [column[0] for column in cursor.description]
+        cursor.close()
+    return pd.DataFrame(results, columns=columns)
 
 
-def handle_query_trigger_auditoria():
-    st.markdown("## 🔧 Trigger de Auditoría de Precios")
+def mysql_get_query_results(inciso: str, params=()):
+    """Corre las queries del ejercicio y retorna una tabla en pandas"""
+    query = queries.registry[inciso]
+    params = query.bind(params)
 
-    conn = get_db_connection()
-    cursor = conn.cursor()
+    def load():
+        df = mysql_fetch_dataframe(query.sql, params or None)
+        return query.apply_types(df) if not df.empty else None
 
-    cursor.execute(
-        "SELECT COUNT(*) FROM information_schema.triggers WHERE trigger_schema = DATABASE() AND trigger_name = 'auditoria_precios'"
+    return get_query_cache().get_or_load(
+        inciso, load, params=params, tables=query.tables, ttl=query.ttl
     )
-    trigger_exists = cursor.fetchone()[0] > 0
-
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS Historial_Precios (
-            ID INT AUTO_INCREMENT PRIMARY KEY,
-            IDProd INT NOT NULL,
-            Precio_Anterior FLOAT,
-            Precio_Nuevo FLOAT,
-            Fecha_Cambio DATETIME DEFAULT CURRENT_TIMESTAMP,
-            Porcentaje_Cambio FLOAT,
-            FOREIGN KEY (IDProd) REFERENCES Producto(IDProd)
-        );
-    """)
-    create_trigger_query = """
-        CREATE TRIGGER auditoria_precios
-        AFTER UPDATE ON Producto
-        FOR EACH ROW
-        BEGIN
-            IF OLD.Precio <> NEW.Precio THEN
-                INSERT INTO Historial_Precios (IDProd, Precio_Anterior, Precio_Nuevo, Porcentaje_Cambio)
-                VALUES (
-                    NEW.IDProd,
-                    OLD.Precio,
-                    NEW.Precio,
-                    ROUND(((NEW.Precio - OLD.Precio) / OLD.Precio * 100), 2)
-                );
-            END IF;
-        END
-    """
-    with st.expander("Query Code"):
-        st.code(create_trigger_query)
-    if not trigger_exists:
-        try:
-            cursor.execute("SET GLOBAL log_bin_trust_function_creators = 1;")
-            cursor.execute(create_trigger_query)
-            st.success("✅ Trigger creado exitosamente.")
-        except Exception as e:
-            st.warning(f"⚠️ No se pudo crear el trigger automático: {str(e)[:100]}")
 
-    st.markdown("### 📋 Lista de Productos con Precios Actuales")
-    cursor.execute("SELECT IDProd, Nombre, Precio FROM Producto ORDER BY Nombre")
-    productos = cursor.fetchall()
 
-    if productos:
-        df_productos = pd.DataFrame(
-            productos, columns=["ID", "Producto", "Precio Actual"]
+def handle_query_trigger_auditoria():
+    st.markdown("## 🔧 Trigger de Auditoría de Precios")
+
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+
+        cursor.execute(
+            "SELECT COUNT(*) FROM information_schema.triggers WHERE trigger_schema = DATABASE() AND trigger_name = 'auditoria_precios'"
         )
-        st.dataframe(df_productos, use_container_width=True)
+        trigger_exists = cursor.fetchone()[0] > 0
+
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS Historial_Precios (
+                ID INT AUTO_INCREMENT PRIMARY KEY,
+                IDProd INT NOT NULL,
+                Precio_Anterior FLOAT,
+                Precio_Nuevo FLOAT,
+                Fecha_Cambio DATETIME DEFAULT CURRENT_TIMESTAMP,
+                Porcentaje_Cambio FLOAT,
+                FOREIGN KEY (IDProd) REFERENCES Producto(IDProd)
+            );
+        """)
+        create_trigger_query = """
+            CREATE TRIGGER auditoria_precios
+            AFTER UPDATE ON Producto
+            FOR EACH ROW
+            BEGIN
+                IF OLD.Precio <> NEW.Precio THEN
+                    INSERT INTO Historial_Precios (IDProd, Precio_Anterior, Precio_Nuevo, Porcentaje_Cambio)
+                    VALUES (
+                        NEW.IDProd,
+                        OLD.Precio,
+                        NEW.Precio,
+                        ROUND(((NEW.Precio - OLD.Precio) / OLD.Precio * 100), 2)
+                    );
+                END IF;
+            END
+        """
+        with st.expander("Query Code"):
+            st.code(create_trigger_query)
+        if not trigger_exists:
+            try:
+                cursor.execute("SET GLOBAL log_bin_trust_function_creators = 1;")
+                cursor.execute(create_trigger_query)
+                st.success("✅ Trigger creado exitosamente.")
+            except Exception as e:
+                st.warning(f"⚠️ No se pudo crear el trigger automático: {str(e)[:100]}")
 
-        st.markdown("### ✏️ Modificar Precio de Producto")
+        st.markdown("### 📋 Lista de Productos con Precios Actuales")
+        cursor.execute("SELECT IDProd, Nombre, Precio FROM Producto ORDER BY Nombre")
+        productos = cursor.fetchall()
 
-        col1, col2 = st.columns(2)
-        with col1:
-            selected_id = st.selectbox(
-                "Selecciona un producto:",
-                options=[f"{p[0]} - {p[1]}" for p in productos],
-                key="product_select",
+        if productos:
+            df_productos = pd.DataFrame(
+                productos, columns=["ID", "Producto", "Precio Actual"]
             )
-            selected_id = int(selected_id.split(" - ")[0])
+            st.dataframe(df_productos, use_container_width=True)
 
-            cursor.execute(
-                "SELECT Precio FROM Producto WHERE IDProd = %s", (selected_id,)
-            )
-            current_price = cursor.fetchone()[0]
-            st.metric("Precio Actual", f"${current_price:.2f}")
+            st.markdown("### ✏️ Modificar Precio de Producto")
 
-        with col2:
-            new_price = st.number_input(
-                "Nuevo Precio:",
-                min_value=0.01,
-                value=float(current_price),
-                step=0.01,
-                format="%.2f",
-                key="new_price_input",
-            )
+            col1, col2 = st.columns(2)
+            with col1:
+                selected_id = st.selectbox(
+                    "Selecciona un producto:",
+                    options=[f"{p[0]} - {p[1]}" for p in productos],
+                    key="product_select",
+                )
+                selected_id = int(selected_id.split(" - ")[0])
 
-        if st.button(
-            "💾 Actualizar Precio",
-            key="update_price",
-            disabled=(current_price == new_price),
-        ):
-            try:
                 cursor.execute(
                     "SELECT Precio FROM Producto WHERE IDProd = %s", (selected_id,)
                 )
-                old_price = cursor.fetchone()[0]
+                current_price = cursor.fetchone()[0]
+                st.metric("Precio Actual", f"${current_price:.2f}")
+
+            with col2:
+                new_price = st.number_input(
+                    "Nuevo Precio:",
+                    min_value=0.01,
+                    value=float(current_price),
+                    step=0.01,
+                    format="%.2f",
+                    key="new_price_input",
+                )
 
-                percent_change = 0
-                if old_price > 0:
-                    percent_change = round(
-                        ((new_price - old_price) / old_price * 100), 2
+            if st.button(
+                "💾 Actualizar Precio",
+                key="update_price",
+                disabled=(current_price == new_price),
+            ):
+                try:
+                    cursor.execute(
+                        "SELECT Precio FROM Producto WHERE IDProd = %s", (selected_id,)
                     )
+                    old_price = cursor.fetchone()[0]
 
-                cursor.execute(
-                    "UPDATE Producto SET Precio = %s WHERE IDProd = %s",
-                    (new_price, selected_id),
-                )
+                    percent_change = 0
+                    if old_price > 0:
+                        percent_change = round(
+                            ((new_price - old_price) / old_price * 100), 2
+                        )
 
-                conn.commit()
-                st.success(
-                    f"✅ Precio actualizado exitosamente de \${old_price:.2f} a \${new_price:.2f}"
-                )
+                    cursor.execute(
+                        "UPDATE Producto SET Precio = %s WHERE IDProd = %s",
+                        (new_price, selected_id),
+                    )
 
-                st.markdown("### 📜 Historial de Cambios de Precio")
-                cursor.execute(
-                    """
-                    SELECT
-                        Fecha_Cambio,
-                        Precio_Anterior,
-                        Precio_Nuevo,
-                        Porcentaje_Cambio
-                    FROM Historial_Precios
-                    WHERE IDProd = %s
-                    ORDER BY Fecha_Cambio DESC
-                """,
-                    (selected_id,),
-                )
+                    conn.commit()
+                    get_query_cache().invalidate_tables("Producto")
+                    st.success(
+                        f"✅ Precio actualizado exitosamente de \${old_price:.2f} a \${new_price:.2f}"
+                    )
 
-                historial = cursor.fetchall()
-                if historial:
-                    df_historial = pd.DataFrame(
-                        historial,
-                        columns=[
-                            "Fecha y Hora",
-                            "Precio Anterior",
-                            "Precio Nuevo",
-                            "% Cambio",
-                        ],
+                    st.markdown("### 📜 Historial de Cambios de Precio")
+                    cursor.execute(
+                        """
+                        SELECT
+                            Fecha_Cambio,
+                            Precio_Anterior,
+                            Precio_Nuevo,
+                            Porcentaje_Cambio
+                        FROM Historial_Precios
+                        WHERE IDProd = %s
+                        ORDER BY Fecha_Cambio DESC
+                    """,
+                        (selected_id,),
                     )
-                    st.dataframe(df_historial, use_container_width=True)
 
-                else:
-                    st.info("No hay historial de cambios para este producto.")
+                    historial = cursor.fetchall()
+                    if historial:
+                        df_historial = pd.DataFrame(
+                            historial,
+                            columns=[
+                                "Fecha y Hora",
+                                "Precio Anterior",
+                                "Precio Nuevo",
+                                "% Cambio",
+                            ],
+                        )
+                        st.dataframe(df_historial, use_container_width=True)
 
-            except Exception as e:
-                st.error(f"❌ Error al actualizar el precio: {str(e)}")
+                    else:
+                        st.info("No hay historial de cambios para este producto.")
 
-        st.markdown("### 📊 Tabla Completa de Auditoría")
+                except Exception as e:
+                    st.error(f"❌ Error al actualizar el precio: {str(e)}")
 
-        cursor.execute("""
-            SELECT
-                hp.IDProd,
-                p.Nombre AS Producto,
-                hp.Precio_Anterior,
-                hp.Precio_Nuevo,
-                hp.Fecha_Cambio,
-                hp.Porcentaje_Cambio
-            FROM Historial_Precios hp
-            JOIN Producto p ON hp.IDProd = p.IDProd
-            ORDER BY hp.Fecha_Cambio DESC
-            LIMIT 50
-        """)
+            st.markdown("### 📊 Tabla Completa de Auditoría")
 
-        audit_data = cursor.fetchall()
-        if audit_data:
-            df_audit = pd.DataFrame(
-                audit_data,
-                columns=[
-                    "ID Producto",
-                    "Producto",
-                    "Precio Anterior",
-                    "Precio Nuevo",
-                    "Fecha",
-                    "% Cambio",
-                ],
-            )
-            st.dataframe(df_audit, use_container_width=True)
+            cursor.execute("""
+                SELECT
+                    hp.IDProd,
+                    p.Nombre AS Producto,
+                    hp.Precio_Anterior,
+                    hp.Precio_Nuevo,
+                    hp.Fecha_Cambio,
+                    hp.Porcentaje_Cambio
+                FROM Historial_Precios hp
+                JOIN Producto p ON hp.IDProd = p.IDProd
+                ORDER BY hp.Fecha_Cambio DESC
+                LIMIT 50
+            """)
+
+            audit_data = cursor.fetchall()
+            if audit_data:
+                df_audit = pd.DataFrame(
+                    audit_data,
+                    columns=[
+                        "ID Producto",
+                        "Producto",
+                        "Precio Anterior",
+                        "Precio Nuevo",
+                        "Fecha",
+                        "% Cambio",
+                    ],
+                )
+                st.dataframe(df_audit, use_container_width=True)
 
-            if len(df_audit) > 0:
-                col1, col2, col3 = st.columns(3)
-                with col1:
-                    st.metric("Total de Cambios", len(audit_data))
-                with col2:
-                    avg_change = df_audit["% Cambio"].mean()
-                    st.metric("Cambio Promedio", f"{avg_change:.1f}%")
-                with col3:
-                    most_changed_idx = df_audit["% Cambio"].abs().idxmax()
-                    most_changed = df_audit.loc[most_changed_idx]
-                    st.metric("Mayor Cambio", f"{most_changed['% Cambio']:.1f}%")
+                if len(df_audit) > 0:
+                    col1, col2, col3 = st.columns(3)
+                    with col1:
+                        st.metric("Total de Cambios", len(audit_data))
+                    with col2:
+                        avg_change = df_audit["% Cambio"].mean()
+                        st.metric("Cambio Promedio", f"{avg_change:.1f}%")
+                    with col3:
+                        most_changed_idx = df_audit["% Cambio"].abs().idxmax()
+                        most_changed = df_audit.loc[most_changed_idx]
+                        st.metric("Mayor Cambio", f"{most_changed['% Cambio']:.1f}%")
+
+        cursor.close()
+
+
+# Columnas de cada conjunto de resultados de AnalizarUsuario, en el orden en que
+# el procedimiento los retorna. El ultimo conjunto es el resumen de plantas.
+USER_ACTIVITY_SERIES = {
+    "publicaciones": ["Fecha", "Cantidad"],
+    "reacciones_dadas": ["Fecha", "Total", "Positivas", "Negativas"],
+    "reacciones_recibidas": ["Fecha", "Total", "Positivas", "Negativas"],
+    "comentarios": ["Fecha", "Cantidad"],
+    "compras": ["Fecha", "Transacciones", "Unidades", "Monto"],
+    "contribuciones": ["Fecha", "Cantidad"],
+}
+
+USER_TOP_PLANTS = ("Planta_Mas_Comprada", "Planta_Mas_Contribuida")
+
+
+def refresh_activity_comments():
+    """Aplica a ActividadDiaria los cambios de comentarios pendientes"""
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.callproc("RefrescarComentariosActividad")
+        conn.commit()
+        cursor.close()
+
+
+def call_user_analysis_procedure(user_id, fecha_inicio, fecha_fin, granularidad):
+    """Llama a AnalizarUsuario y retorna sus conjuntos de resultados por serie"""
+    refresh_activity_comments()
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.callproc(
+            "AnalizarUsuario", (user_id, fecha_inicio, fecha_fin, granularidad)
+        )
+        result_sets = [result.fetchall() for result in cursor.stored_results()]
+        cursor.close()
+
+    *series, resumen = result_sets
+    results = dict(zip(USER_ACTIVITY_SERIES, series))
+    results.update(zip(USER_TOP_PLANTS, resumen[0]))
+    return results
 
-    cursor.close()
-    conn.close()
+
+def rebuild_activity_rollup():
+    """Reconstruye la tabla ActividadDiaria desde las tablas base"""
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.callproc("ReconstruirActividadDiaria")
+        conn.commit()
+        cursor.close()
 
 
 def handle_query_stored_procedure():
@@ -232,154 +296,26 @@ def handle_query_stored_procedure():
         "Utiliza el procedimiento almacenado para analizar la actividad de un usuario en un período específico."
     )
 
-    conn = get_db_connection()
-    cursor = conn.cursor()
-
-    cursor.execute("SELECT IDU, Nombre FROM Usuario ORDER BY Nombre")
-    usuarios = cursor.fetchall()
+    usuarios = mysql_run_query("SELECT IDU, Nombre FROM Usuario ORDER BY Nombre")
 
-    def analizar_usuario_con_series_temporales(user_id, fecha_inicio, fecha_fin):
+    def analizar_usuario_con_series_temporales(
+        user_id, fecha_inicio, fecha_fin, granularidad
+    ):
         """Enhanced analysis function that includes time series data"""
         results = {}
-        time_series_data = {}
-
-        fecha_inicio_str = fecha_inicio.strftime("%Y-%m-%d")
-        fecha_fin_str = fecha_fin.strftime("%Y-%m-%d")
-
-        try:
-            cursor.execute(
-                """
-                    SELECT
-                        DATE(r.Fecha) as Dia,
-                        COUNT(DISTINCT p.IDPub) as Publicaciones
-                    FROM Publicacion p
-                    LEFT JOIN Reaccionar r ON p.IDPub = r.IDPub
-                    WHERE p.IDU = %s
-                        AND r.Fecha BETWEEN %s AND %s
-                    GROUP BY DATE(r.Fecha)
-                    ORDER BY Dia
-                """,
-                (user_id, fecha_inicio_str, fecha_fin_str),
-            )
-            publications_ts = cursor.fetchall()
-            if publications_ts:
-                time_series_data["publicaciones"] = publications_ts
-        except Exception as e:
-            st.warning(f"No se pudieron obtener datos de publicaciones: {str(e)[:100]}")
-
-        try:
-            cursor.execute(
-                """
-                    SELECT
-                        DATE(Fecha) as Dia,
-                        COUNT(*) as Reacciones_Dadas,
-                        COUNT(CASE WHEN Tipo IN ('Me gusta', 'Me encanta', 'Me asombra', 'Me divierte') THEN 1 END) as Positivas,
-                        COUNT(CASE WHEN Tipo IN ('Me enoja', 'Me entristece') THEN 1 END) as Negativas
-                    FROM Reaccionar
-                    WHERE IDU = %s
-                        AND Fecha BETWEEN %s AND %s
-                    GROUP BY DATE(Fecha)
-                    ORDER BY Dia
-                """,
-                (user_id, fecha_inicio_str, fecha_fin_str),
-            )
-            reactions_given_ts = cursor.fetchall()
-            if reactions_given_ts:
-                time_series_data["reacciones_dadas"] = reactions_given_ts
-        except Exception as e:
-            st.warning(
-                f"No se pudieron obtener datos de reacciones dadas: {str(e)[:100]}"
-            )
-
-        try:
-            cursor.execute(
-                """
-                    SELECT
-                        DATE(r.Fecha) as Dia,
-                        COUNT(*) as Reacciones_Recibidas,
-                        COUNT(CASE WHEN r.Tipo IN ('Me gusta', 'Me encanta', 'Me asombra', 'Me divierte') THEN 1 END) as Positivas,
-                        COUNT(CASE WHEN r.Tipo IN ('Me enoja', 'Me entristece') THEN 1 END) as Negativas
-                    FROM Reaccionar r
-                    JOIN Publicacion p ON r.IDPub = p.IDPub
-                    WHERE p.IDU = %s
-                        AND r.Fecha BETWEEN %s AND %s
-                    GROUP BY DATE(r.Fecha)
-                    ORDER BY Dia
-                """,
-                (user_id, fecha_inicio_str, fecha_fin_str),
-            )
-            reactions_received_ts = cursor.fetchall()
-            if reactions_received_ts:
-                time_series_data["reacciones_recibidas"] = reactions_received_ts
-        except Exception as e:
-            st.warning(
-                f"No se pudieron obtener datos de reacciones recibidas: {str(e)[:100]}"
-            )
 
-        try:
-            cursor.execute(
-                """
-                    SELECT
-                        DATE(r.Fecha) as Dia,
-                        COUNT(DISTINCT c.IDPub) as Comentarios
-                    FROM Comentar c
-                    LEFT JOIN Reaccionar r ON c.IDPub = r.IDPub
-                    WHERE c.IDU = %s
-                        AND r.Fecha BETWEEN %s AND %s
-                    GROUP BY DATE(r.Fecha)
-                    ORDER BY Dia
-                """,
-                (user_id, fecha_inicio_str, fecha_fin_str),
-            )
-            comments_ts = cursor.fetchall()
-            if comments_ts:
-                time_series_data["comentarios"] = comments_ts
-        except Exception as e:
-            st.warning(f"No se pudieron obtener datos de comentarios: {str(e)[:100]}")
-
-        try:
-            cursor.execute(
-                """
-                    SELECT
-                        DATE(Fecha) as Dia,
-                        COUNT(*) as Compras,
-                        SUM(Cantidad) as Unidades,
-                        SUM(Precio * Cantidad) as Monto
-                    FROM Compra
-                    WHERE IDUC = %s
-                        AND Fecha BETWEEN %s AND %s
-                    GROUP BY DATE(Fecha)
-                    ORDER BY Dia
-                """,
-                (user_id, fecha_inicio_str, fecha_fin_str),
-            )
-            purchases_ts = cursor.fetchall()
-            if purchases_ts:
-                time_series_data["compras"] = purchases_ts
-        except Exception as e:
-            st.warning(f"No se pudieron obtener datos de compras: {str(e)[:100]}")
+        query_results = call_user_analysis_procedure(
+            user_id,
+            fecha_inicio.strftime("%Y-%m-%d"),
+            fecha_fin.strftime("%Y-%m-%d"),
+            granularidad,
+        )
 
-        try:
-            cursor.execute(
-                """
-                    SELECT
-                        DATE(Fecha) as Dia,
-                        COUNT(*) as Contribuciones
-                    FROM Contribucion
-                    WHERE IDU = %s
-                        AND Fecha BETWEEN %s AND %s
-                    GROUP BY DATE(Fecha)
-                    ORDER BY Dia
-                """,
-                (user_id, fecha_inicio_str, fecha_fin_str),
-            )
-            contributions_ts = cursor.fetchall()
-            if contributions_ts:
-                time_series_data["contribuciones"] = contributions_ts
-        except Exception as e:
-            st.warning(
-                f"No se pudieron obtener datos de contribuciones: {str(e)[:100]}"
-            )
+        time_series_data = {
+            key: query_results[key]
+            for key in USER_ACTIVITY_SERIES
+            if query_results.get(key)
+        }
 
         results["Total_Publicaciones"] = sum(
             [p[1] for p in time_series_data.get("publicaciones", [])]
@@ -403,69 +339,18 @@ def handle_query_stored_procedure():
             [c[1] for c in time_series_data.get("contribuciones", [])]
         )
 
-        try:
-            cursor.execute(
-                """
-                    SELECT IDProd
-                    FROM Compra
-                    WHERE IDUC = %s
-                        AND Fecha BETWEEN %s AND %s
-                    GROUP BY IDProd
-                    ORDER BY SUM(Cantidad) DESC
-                    LIMIT 1
-                """,
-                (user_id, fecha_inicio_str, fecha_fin_str),
-            )
-            planta_comprada = cursor.fetchone()
-            results["Planta_Mas_Comprada"] = (
-                planta_comprada[0] if planta_comprada else None
-            )
-        except:
-            results["Planta_Mas_Comprada"] = None
-
-        try:
-            cursor.execute(
-                """
-                    SELECT IDProd
-                    FROM Contribucion
-                    WHERE IDU = %s
-                        AND Fecha BETWEEN %s AND %s
-                    GROUP BY IDProd
-                    ORDER BY COUNT(*) DESC
-                    LIMIT 1
-                """,
-                (user_id, fecha_inicio_str, fecha_fin_str),
-            )
-            planta_contribuida = cursor.fetchone()
-            results["Planta_Mas_Contribuida"] = (
-                planta_contribuida[0] if planta_contribuida else None
-            )
-        except:
-            results["Planta_Mas_Contribuida"] = None
+        for key in USER_TOP_PLANTS:
+            results[key] = query_results.get(key)
 
         ts_dataframes = {}
 
         for key, data in time_series_data.items():
-            if data:
-                try:
-                    if key == "publicaciones":
-                        columns = ["Fecha", "Cantidad"]
-                    elif key == "reacciones_dadas":
-                        columns = ["Fecha", "Total", "Positivas", "Negativas"]
-                    elif key == "reacciones_recibidas":
-                        columns = ["Fecha", "Total", "Positivas", "Negativas"]
-                    elif key == "comentarios":
-                        columns = ["Fecha", "Cantidad"]
-                    elif key == "compras":
-                        columns = ["Fecha", "Transacciones", "Unidades", "Monto"]
-                    elif key == "contribuciones":
-                        columns = ["Fecha", "Cantidad"]
-
-                    df = pd.DataFrame(data, columns=columns)
-                    df["Fecha"] = pd.to_datetime(df["Fecha"])
-                    ts_dataframes[key] = df
-                except Exception as e:
-                    st.warning(f"Error procesando datos de {key}: {str(e)[:100]}")
+            try:
+                df = pd.DataFrame(data, columns=USER_ACTIVITY_SERIES[key])
+                df["Fecha"] = pd.to_datetime(df["Fecha"])
+                ts_dataframes[key] = df
+            except Exception as e:
+                st.warning(f"Error procesando datos de {key}: {str(e)[:100]}")
 
         return results, ts_dataframes
 
@@ -495,10 +380,23 @@ def handle_query_stored_procedure():
         key="granularidad",
     )
 
-    if st.button("📊 Analizar Usuario", key="analyze_user"):
+    col1, col2 = st.columns(2)
+
+    with col1:
+        analizar = st.button("📊 Analizar Usuario", key="analyze_user")
+
+    with col2:
+        if st.button("🔄 Reconstruir Actividad Diaria", key="rebuild_activity"):
+            try:
+                rebuild_activity_rollup()
+                st.success("✅ ActividadDiaria reconstruida desde las tablas base.")
+            except Exception as e:
+                st.error(f"❌ Error al reconstruir ActividadDiaria: {str(e)[:200]}")
+
+    if analizar:
         try:
             resultados, series_temporales = analizar_usuario_con_series_temporales(
-                user_id, fecha_inicio, fecha_fin
+                user_id, fecha_inicio, fecha_fin, granularidad
             )
 
             st.success("✅ Análisis completado exitosamente")
@@ -519,29 +417,13 @@ def handle_query_stored_procedure():
                 st.metric("🌱 Contribuciones", resultados["Total_Contribuciones"])
 
                 if resultados["Planta_Mas_Comprada"]:
-                    try:
-                        cursor.execute(
-                            "SELECT Nombre FROM Producto WHERE IDProd = %s",
-                            (resultados["Planta_Mas_Comprada"],),
-                        )
-                        planta_comprada = cursor.fetchone()
-                        if planta_comprada:
-                            st.metric("🏆 Planta Más Comprada", planta_comprada[0])
-                    except:
-                        pass
+                    st.metric(
+                        "🏆 Planta Más Comprada", resultados["Planta_Mas_Comprada"]
+                    )
 
                 if resultados["Planta_Mas_Contribuida"]:
-                    try:
-                        cursor.execute(
-                            "SELECT Nombre FROM Producto WHERE IDProd = %s",
-                            (resultados["Planta_Mas_Contribuida"],),
-                        )
-                        planta_contribuida = cursor.fetchone()
-                        if planta_contribuida:
-                            st.markdown("**🌿 Planta Más Contribuida:**")
-                            st.info(planta_contribuida[0])
-                    except:
-                        pass
+                    st.markdown("**🌿 Planta Más Contribuida:**")
+                    st.info(resultados["Planta_Mas_Contribuida"])
 
             st.markdown("### 📋 Resumen de Actividad")
             df_summary = pd.DataFrame(
@@ -579,16 +461,10 @@ def handle_query_stored_procedure():
                         try:
                             df_temp = df.set_index("Fecha")
 
-                            if granularidad == "Semanal":
-                                df_resampled = df_temp.resample("W").sum()
-                            elif granularidad == "Mensual":
-                                df_resampled = df_temp.resample("M").sum()
-                            else:
-                                df_resampled = df_temp
-
-                            for col in df_resampled.columns:
+                            for col in df_temp.columns:
                                 combined_df = combined_df.join(
-                                    df_resampled[col].rename(f"{key}_{col}"), how="left"
+                                    df_temp[col].rename(f"{key}_{col}"),
+                                    how="left",
                                 )
                         except Exception as e:
                             st.warning(f"Error procesando {key}: {str(e)[:100]}")
@@ -834,222 +710,298 @@ def handle_query_stored_procedure():
         except Exception as e:
             st.error(f"❌ Error en el análisis: {str(e)[:200]}")
 
-        finally:
-            cursor.close()
-            conn.close()
-
 
-def handle_query_influencers():
-    st.markdown("## 🌟 Análisis de Influencers y su Impacto en Ventas")
-
-    conn = get_db_connection()
-    cursor = conn.cursor()
-
-    cursor.execute("""
-        WITH InteraccionesUsuario AS (
+INFLUENCER_IMPACT_QUERIES = {
+    "plantas": (
+        """
+            SELECT
+                ranking.IDU,
+                ranking.IDProd,
+                ranking.Planta,
+                ranking.Total_Contribuciones,
+                calificaciones.Calificacion_Promedio
+            FROM (
+                SELECT
+                    c.IDU,
+                    c.IDProd,
+                    pr.Nombre AS Planta,
+                    COUNT(*) AS Total_Contribuciones,
+                    ROW_NUMBER() OVER (
+                        PARTITION BY c.IDU ORDER BY COUNT(*) DESC, c.IDProd
+                    ) AS Posicion
+                FROM Contribucion c
+                JOIN Producto pr ON c.IDProd = pr.IDProd
+                WHERE c.IDU IN ({ids})
+                GROUP BY c.IDU, c.IDProd, pr.Nombre
+            ) ranking
+            LEFT JOIN (
+                SELECT IDProd, AVG(Puntuacion) AS Calificacion_Promedio
+                FROM Compra
+                GROUP BY IDProd
+            ) calificaciones ON ranking.IDProd = calificaciones.IDProd
+            WHERE ranking.Posicion <= 5
+            ORDER BY ranking.IDU, ranking.Posicion
+        """,
+        ("Contribucion", "Producto", "Compra"),
+    ),
+    "impacto": (
+        """
+            WITH PlantasInfluencer AS (
+                SELECT
+                    IDU,
+                    IDProd,
+                    ROW_NUMBER() OVER (
+                        PARTITION BY IDU ORDER BY COUNT(*) DESC, IDProd
+                    ) AS Posicion
+                FROM Contribucion
+                WHERE IDU IN ({ids})
+                GROUP BY IDU, IDProd
+            ),
+            FechasActividad AS (
+                SELECT
+                    c.IDU,
+                    c.IDProd,
+                    c.Fecha,
+                    pi.Posicion,
+                    ROW_NUMBER() OVER (
+                        PARTITION BY c.IDU, c.IDProd ORDER BY c.Fecha DESC
+                    ) AS Reciente
+                FROM Contribucion c
+                JOIN PlantasInfluencer pi
+                    ON c.IDU = pi.IDU AND c.IDProd = pi.IDProd
+                WHERE pi.Posicion <= 3
+            )
             SELECT
-                p.IDU,
-                SUM(
-                    CASE
-                        WHEN r.Tipo = 'Me gusta' THEN 1
-                        WHEN r.Tipo = 'Me encanta' THEN 2
-                        WHEN r.Tipo = 'Me asombra' THEN 1.5
-                        ELSE 0
-                    END
-                ) AS Peso_Reacciones,
-                COUNT(DISTINCT c.IDPub) * 2 AS Peso_Comentarios
-            FROM Publicacion p
-            LEFT JOIN Reaccionar r ON p.IDPub = r.IDPub
-            LEFT JOIN Comentar c ON p.IDPub = c.IDPub
-            GROUP BY p.IDU
+                IDU,
+                Planta,
+                Fecha_Actividad,
+                Ventas_Antes,
+                Ventas_Despues,
+                CAST(COALESCE(ROUND(
+                    (Ventas_Despues - Ventas_Antes) * 100.0 / NULLIF(Ventas_Antes, 0), 2
+                ), 0) AS DOUBLE) AS Incremento
+            FROM (
+                SELECT
+                    fa.IDU,
+                    fa.Posicion,
+                    pr.Nombre AS Planta,
+                    fa.Fecha AS Fecha_Actividad,
+                    CAST(COALESCE(SUM(CASE
+                        WHEN co.Fecha <= fa.Fecha THEN co.Cantidad
+                    END), 0) AS SIGNED) AS Ventas_Antes,
+                    CAST(COALESCE(SUM(CASE
+                        WHEN co.Fecha >= fa.Fecha THEN co.Cantidad
+                    END), 0) AS SIGNED) AS Ventas_Despues
+                FROM FechasActividad fa
+                JOIN Producto pr ON fa.IDProd = pr.IDProd
+                LEFT JOIN Compra co
+                    ON co.IDProd = fa.IDProd
+                    AND co.Fecha BETWEEN DATE_SUB(fa.Fecha, INTERVAL 14 DAY)
+                        AND DATE_ADD(fa.Fecha, INTERVAL 14 DAY)
+                WHERE fa.Reciente <= 2
+                GROUP BY fa.IDU, fa.IDProd, pr.Nombre, fa.Fecha, fa.Posicion
+            ) ventas
+            ORDER BY IDU, Posicion, Fecha_Actividad DESC
+        """,
+        ("Contribucion", "Producto", "Compra"),
+    ),
+    "conversion": (
+        """
+            WITH Seguidores AS (
+                SELECT DISTINCT p.IDU AS Influencer, r.IDU AS Seguidor
+                FROM Reaccionar r
+                JOIN Publicacion p ON r.IDPub = p.IDPub
+                WHERE p.IDU IN ({ids})
+            )
+            SELECT
+                s.Influencer AS IDU,
+                COUNT(*) AS Total_Seguidores,
+                COUNT(compradores.IDUC) AS Compraron,
+                ROUND(COUNT(compradores.IDUC) * 100.0 / NULLIF(COUNT(*), 0), 2) AS Tasa_Conversion
+            FROM Seguidores s
+            LEFT JOIN (SELECT DISTINCT IDUC FROM Compra) compradores
+                ON s.Seguidor = compradores.IDUC
+            GROUP BY s.Influencer
+        """,
+        ("Reaccionar", "Publicacion", "Compra"),
+    ),
+}
+
+
+def get_top_influencers(limit=5, fecha_inicio=None, fecha_fin=None):
+    """Retorna (IDU, Nombre, Puntaje) de los usuarios con mayor puntaje.
+
+    Sin fechas lee InfluencerScore por su indice de puntaje. Con fechas, el peso
+    de las reacciones se suma desde ActividadDiaria para ese rango; los
+    comentarios no tienen fecha y cuentan completos.
+    """
+    if fecha_inicio is None or fecha_fin is None:
+        return mysql_run_query(
+            """
+            SELECT s.IDU, u.Nombre, s.Puntaje
+            FROM InfluencerScore s
+            JOIN Usuario u ON s.IDU = u.IDU
+            ORDER BY s.Puntaje DESC
+            LIMIT %s
+        """,
+            (limit,),
         )
+
+    return mysql_run_query(
+        """
         SELECT
-            iu.IDU,
+            s.IDU,
             u.Nombre,
-            (iu.Peso_Reacciones + iu.Peso_Comentarios) AS Puntaje_Interacciones
-        FROM InteraccionesUsuario iu
-        JOIN Usuario u ON iu.IDU = u.IDU
-        ORDER BY Puntaje_Interacciones DESC
-        LIMIT 5
-    """)
+            COALESCE(SUM(a.PesoReaccionesRecibidas), 0) + s.PesoComentarios AS Puntaje
+        FROM InfluencerScore s
+        JOIN Usuario u ON s.IDU = u.IDU
+        LEFT JOIN ActividadDiaria a
+            ON a.IDU = s.IDU
+            AND a.Dia BETWEEN %s AND %s
+        GROUP BY s.IDU, u.Nombre, s.PesoComentarios
+        ORDER BY Puntaje DESC
+        LIMIT %s
+    """,
+        (fecha_inicio, fecha_fin, limit),
+    )
 
-    influencers = cursor.fetchall()
 
-    if influencers:
-        st.success(f"✅ Se identificaron {len(influencers)} influencers principales")
+def load_influencer_impact(influencer_ids):
+    """Calcula plantas, impacto en ventas y conversión de varios influencers a la vez"""
+    params = tuple(influencer_ids)
+    placeholders = ", ".join(["%s"] * len(params))
+    cache = get_query_cache()
 
-        df_influencers = pd.DataFrame(
-            influencers, columns=["ID", "Nombre", "Puntaje de Interacción"]
+    results = {}
+    for key, (sql, tables) in INFLUENCER_IMPACT_QUERIES.items():
+        results[key] = cache.get_or_load(
+            f"influencers_{key}",
+            lambda sql=sql: mysql_fetch_dataframe(sql.format(ids=placeholders), params),
+            params=params,
+            tables=tables,
         )
-        st.markdown("### 🏆 Top 5 Influencers")
-        st.dataframe(df_influencers, use_container_width=True)
+    return results
 
-        selected_influencer = st.selectbox(
-            "Selecciona un influencer para análisis detallado:",
-            options=[f"{inf[0]} - {inf[1]}" for inf in influencers],
-            key="influencer_select",
-        )
 
-        influencer_id = int(selected_influencer.split(" - ")[0])
+def handle_query_influencers():
+    st.markdown("## 🌟 Análisis de Influencers y su Impacto en Ventas")
 
-        if st.button("🔍 Analizar Impacto", key="analyze_impact"):
-            cursor.execute(
-                """
-                SELECT
-                    c.IDProd,
-                    pr.Nombre AS Planta,
-                    COUNT(*) AS Total_Contribuciones,
-                    (SELECT AVG(Puntuacion) FROM Compra WHERE IDProd = c.IDProd) AS Calificacion_Promedio
-                FROM Contribucion c
-                JOIN Producto pr ON c.IDProd = pr.IDProd
-                WHERE c.IDU = %s
-                GROUP BY c.IDProd, pr.Nombre
-                ORDER BY Total_Contribuciones DESC
-                LIMIT 5
-            """,
-                (influencer_id,),
+    filtrar_periodo = st.checkbox(
+        "Calcular el puntaje solo con reacciones de un período",
+        key="influencer_periodo",
+    )
+    fecha_inicio = fecha_fin = None
+    if filtrar_periodo:
+        col1, col2 = st.columns(2)
+        with col1:
+            fecha_inicio = st.date_input(
+                "Fecha Inicio:",
+                value=pd.to_datetime("2023-01-01"),
+                key="influencer_fecha_inicio",
+            )
+        with col2:
+            fecha_fin = st.date_input(
+                "Fecha Fin:",
+                value=pd.to_datetime("2024-12-31"),
+                key="influencer_fecha_fin",
             )
 
-            plantas_interactuadas = cursor.fetchall()
-
-            if plantas_interactuadas:
-                st.markdown("### 🌿 Plantas Más Interactuadas")
-                df_plantas = pd.DataFrame(
-                    plantas_interactuadas,
-                    columns=["ID", "Planta", "Contribuciones", "Calificación Promedio"],
-                )
-                st.dataframe(df_plantas, use_container_width=True)
+    influencers = get_top_influencers(5, fecha_inicio, fecha_fin)
 
-                st.markdown("### 📈 Análisis de Impacto Simplificado")
+    if not influencers:
+        return
 
-                impact_data = []
-                for planta in plantas_interactuadas[:3]:
-                    planta_id = planta[0]
-                    planta_nombre = planta[1]
+    st.success(f"✅ Se identificaron {len(influencers)} influencers principales")
 
-                    cursor.execute(
-                        """
-                        SELECT Fecha
-                        FROM Contribucion
-                        WHERE IDU = %s AND IDProd = %s
-                        ORDER BY Fecha DESC
-                        LIMIT 2
-                    """,
-                        (influencer_id, planta_id),
-                    )
-
-                    fechas_actividad = cursor.fetchall()
-
-                    for fecha_act in fechas_actividad:
-                        fecha_actividad = fecha_act[0]
-
-                        cursor.execute(
-                            """
-                            SELECT
-                                SUM(CASE
-                                    WHEN Fecha BETWEEN DATE_SUB(%s, INTERVAL 14 DAY) AND %s
-                                    THEN Cantidad ELSE 0
-                                END) AS Ventas_Antes,
-                                SUM(CASE
-                                    WHEN Fecha BETWEEN %s AND DATE_ADD(%s, INTERVAL 14 DAY)
-                                    THEN Cantidad ELSE 0
-                                END) AS Ventas_Despues
-                            FROM Compra
-                            WHERE IDProd = %s
-                                AND Fecha BETWEEN DATE_SUB(%s, INTERVAL 28 DAY)
-                                    AND DATE_ADD(%s, INTERVAL 28 DAY)
-                        """,
-                            (
-                                fecha_actividad,
-                                fecha_actividad,
-                                fecha_actividad,
-                                fecha_actividad,
-                                planta_id,
-                                fecha_actividad,
-                                fecha_actividad,
-                            ),
-                        )
-
-                        resultado = cursor.fetchone()
-
-                        if resultado:
-                            ventas_antes = resultado[0] or 0
-                            ventas_despues = resultado[1] or 0
-                            incremento = 0
-                            if ventas_antes > 0:
-                                incremento = round(
-                                    (
-                                        (ventas_despues - ventas_antes)
-                                        / ventas_antes
-                                        * 100
-                                    ),
-                                    2,
-                                )
+    df_influencers = pd.DataFrame(
+        influencers, columns=["ID", "Nombre", "Puntaje de Interacción"]
+    )
+    st.markdown("### 🏆 Top 5 Influencers")
+    st.dataframe(df_influencers, use_container_width=True)
 
-                            impact_data.append(
-                                {
-                                    "Planta": planta_nombre,
-                                    "Fecha Actividad": fecha_actividad,
-                                    "Ventas (2 semanas antes)": ventas_antes,
-                                    "Ventas (2 semanas después)": ventas_despues,
-                                    "Incremento %": incremento,
-                                }
-                            )
+    impacto_influencers = load_influencer_impact([inf[0] for inf in influencers])
 
-                if impact_data:
-                    df_impacto = pd.DataFrame(impact_data)
-                    st.dataframe(df_impacto, use_container_width=True)
+    selected_influencer = st.selectbox(
+        "Selecciona un influencer para análisis detallado:",
+        options=[f"{inf[0]} - {inf[1]}" for inf in influencers],
+        key="influencer_select",
+    )
 
-                    if len(df_impacto) > 0:
-                        avg_increase = df_impacto["Incremento %"].mean()
-                        max_increase = df_impacto["Incremento %"].max()
+    influencer_id = int(selected_influencer.split(" - ")[0])
+
+    if st.button("🔍 Analizar Impacto", key="analyze_impact"):
+        plantas = impacto_influencers["plantas"]
+        plantas_interactuadas = plantas[plantas["IDU"] == influencer_id]
+
+        if plantas_interactuadas.empty:
+            st.warning("No se encontraron plantas interactuadas por este influencer.")
+            return
+
+        st.markdown("### 🌿 Plantas Más Interactuadas")
+        df_plantas = plantas_interactuadas.drop(columns="IDU")
+        df_plantas.columns = [
+            "ID",
+            "Planta",
+            "Contribuciones",
+            "Calificación Promedio",
+        ]
+        st.dataframe(df_plantas, use_container_width=True)
+
+        st.markdown("### 📈 Análisis de Impacto Simplificado")
+
+        impacto = impacto_influencers["impacto"]
+        df_impacto = impacto[impacto["IDU"] == influencer_id].drop(columns="IDU")
+        df_impacto.columns = [
+            "Planta",
+            "Fecha Actividad",
+            "Ventas (2 semanas antes)",
+            "Ventas (2 semanas después)",
+            "Incremento %",
+        ]
+
+        if not df_impacto.empty:
+            st.dataframe(df_impacto, use_container_width=True)
+
+            avg_increase = df_impacto["Incremento %"].mean()
+            max_increase = df_impacto["Incremento %"].max()
+
+            col1, col2 = st.columns(2)
+            with col1:
+                st.metric("📈 Incremento Promedio", f"{avg_increase:.1f}%")
+            with col2:
+                st.metric("🚀 Máximo Incremento", f"{max_increase:.1f}%")
+
+        st.markdown("### 🔄 Tasa de Conversión Estimada")
+        conversiones = impacto_influencers["conversion"]
+        conversion = conversiones[conversiones["IDU"] == influencer_id]
+        total_seguidores, compraron, tasa_conversion = (
+            conversion[["Total_Seguidores", "Compraron", "Tasa_Conversion"]].iloc[0]
+            if not conversion.empty
+            else (0, 0, None)
+        )
 
-                        col1, col2 = st.columns(2)
-                        with col1:
-                            st.metric("📈 Incremento Promedio", f"{avg_increase:.1f}%")
-                        with col2:
-                            st.metric("🚀 Máximo Incremento", f"{max_increase:.1f}%")
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("👥 Seguidores que Reaccionaron", total_seguidores)
+        with col2:
+            st.metric("🛍️ Seguidores que Compraron", compraron)
+        with col3:
+            st.metric("📊 Tasa de Conversión Estimada", f"{tasa_conversion}%")
 
-                st.markdown("### 🔄 Tasa de Conversión Estimada")
-                cursor.execute(
-                    """
-                    WITH ReaccionesInfluencer AS (
-                        SELECT DISTINCT r.IDU
-                        FROM Reaccionar r
-                        JOIN Publicacion p ON r.IDPub = p.IDPub
-                        WHERE p.IDU = %s
-                    ),
-                    ComprasSeguidores AS (
-                        SELECT COUNT(DISTINCT c.IDUC) AS Compraron
-                        FROM Compra c
-                        WHERE c.IDUC IN (SELECT IDU FROM ReaccionesInfluencer)
-                    )
-                    SELECT
-                        (SELECT COUNT(*) FROM ReaccionesInfluencer) AS Total_Seguidores,
-                        Compraron,
-                        ROUND(Compraron * 100.0 / NULLIF((SELECT COUNT(*) FROM ReaccionesInfluencer), 0), 2) AS Tasa_Conversion
-                    FROM ComprasSeguidores
-                """,
-                    (influencer_id,),
-                )
 
-                conversion = cursor.fetchone()
-                if conversion:
-                    col1, col2, col3 = st.columns(3)
-                    with col1:
-                        st.metric("👥 Seguidores que Reaccionaron", conversion[0])
-                    with col2:
-                        st.metric("🛍️ Seguidores que Compraron", conversion[1])
-                    with col3:
-                        st.metric("📊 Tasa de Conversión Estimada", f"{conversion[2]}%")
+def load_seller_features():
+    """Estadísticas por vendedor, consultadas una vez por TTL del cache"""
 
-            else:
-                st.warning(
-                    "No se encontraron plantas interactuadas por este influencer."
-                )
+    def load():
+        with get_db_connection() as conn:
+            return seller_stats.load_seller_features(conn)
 
-    cursor.close()
-    conn.close()
+    return get_query_cache().get_or_load(
+        "seller_features",
+        load,
+        tables=seller_stats.SELLER_FEATURE_TABLES,
+        ttl=queries.COST_TTL[queries.HEAVY],
+    )
 
 
 def handle_query_anomalous_patterns():
@@ -1058,8 +1010,13 @@ def handle_query_anomalous_patterns():
     def no_anomaly_found():
         st.success("✅ No se encontraron patrones anomalos.")
 
-    conn = get_db_connection()
-    cursor = conn.cursor()
+    if st.button("🔄 Recargar estadísticas de vendedores", key="reload_sellers"):
+        get_query_cache().invalidate("seller_features")
+
+    features = load_seller_features()
+
+    with st.expander("Query Code"):
+        st.code(seller_stats.SELLER_FEATURES_SQL)
 
     st.markdown("## 📊 Patrón 1: Variaciones de Precio Significativas")
     col1, col2 = st.columns(2)
@@ -1069,34 +1026,27 @@ def handle_query_anomalous_patterns():
         )
     with col2:
         stddev_upper = st.slider(
-            "Cota superior de la desviación estándar", value=100, key="stddev_uppera"
-        )
-    query_a = """
-        SELECT
-            IDUV AS Vendedor,
-            COUNT(DISTINCT IDProd) AS Productos_Diferentes,
-            AVG(Precio) AS Precio_Promedio,
-            STDDEV(Precio) AS Desviacion_Precio
-        FROM Compra
-        GROUP BY IDUV
-        HAVING Desviacion_Precio > %s AND Desviacion_Precio <= %s
-        ORDER BY Desviacion_Precio DESC
-    """
-    with st.expander("Query Code"):
-        st.code(query_a)
-    cursor.execute(query_a, (stddev_lower, stddev_upper))
-
-    pattern1 = cursor.fetchall()
-    if pattern1:
-        df_pattern1 = pd.DataFrame(
-            pattern1,
-            columns=[
-                "ID Vendedor",
-                "Productos Diferentes",
-                "Precio Promedio",
-                "Desviación de Precio",
-            ],
+            "Cota superior de la desviación estándar",
+            value=100,
+            key="stddev_uppera",
         )
+
+    pattern1 = seller_stats.price_variation(features, stddev_lower, stddev_upper)
+    if not pattern1.empty:
+        df_pattern1 = pattern1[
+            [
+                "Vendedor",
+                "Productos_Diferentes",
+                "Precio_Promedio",
+                "Desviacion_Precio",
+            ]
+        ]
+        df_pattern1.columns = [
+            "ID Vendedor",
+            "Productos Diferentes",
+            "Precio Promedio",
+            "Desviación de Precio",
+        ]
         st.dataframe(df_pattern1, use_container_width=True, height=300)
     else:
         no_anomaly_found()
@@ -1104,96 +1054,25 @@ def handle_query_anomalous_patterns():
     st.divider()
 
     st.markdown("## ⚖️ Patrón 2: Patrones de Calificación")
-    # col1, col2, col3 = st.columns(3)
-    # with col1:
-    #     stddev_lower = st.slider(
-    #         "Cota inferior de la desviación estándar",
-    #         min_value=0,
-    #         max_value=2,
-    #         value=0,
-    #         key="stddev_lowerb",
-    #     )
-    # with col2:
-    #     stddev_upper = st.slider(
-    #         "Cota superior de la desviación estándar",
-    #         min_value=0,
-    #         max_value=2,
-    #         value=2,
-    #         key="stddev_upperb",
-    #     )
-    # with col3:
-    #     total = st.number_input("Minimo de Calificiones", step=1)
-
-    # previous_query_b = """
-    #     SELECT
-    #         IDUV AS Vendedor,
-    #         COUNT(*) AS Total_Calificaciones,
-    #         AVG(Puntuacion) AS Calificacion_Promedio,
-    #         STDDEV(Puntuacion) AS Desviacion_Calificacion
-    #     FROM Compra
-    #     WHERE Puntuacion IS NOT NULL
-    #     GROUP BY IDUV
-    #     HAVING  Total_Calificaciones >= %s AND
-    #             Desviacion_Calificacion >= %s AND
-    #             Desviacion_Calificacion <= %s
-    #     ORDER BY Desviacion_Calificacion DESC
-    # """
-
-    query_b = """
-    WITH ProductRatings AS (
-                SELECT
-                    IDUV,
-                    IDProd,
-                    SUM(CASE WHEN Puntuacion = 1 THEN 1 ELSE 0 END) AS count_1,
-                    SUM(CASE WHEN Puntuacion = 2 THEN 1 ELSE 0 END) AS count_2,
-                    SUM(CASE WHEN Puntuacion = 3 THEN 1 ELSE 0 END) AS count_3,
-                    SUM(CASE WHEN Puntuacion = 4 THEN 1 ELSE 0 END) AS count_4,
-                    SUM(CASE WHEN Puntuacion = 5 THEN 1 ELSE 0 END) AS count_5,
-                    COUNT(*) AS total_ratings
-                FROM Compra
-                WHERE Puntuacion IS NOT NULL
-                GROUP BY IDUV, IDProd
-                HAVING total_ratings >= 5
-            ),
-            PolarizedProducts AS (
-                SELECT
-                    IDUV,
-                    IDProd,
-                    count_1,
-                    count_5,
-                    (count_2 + count_3 + count_4) AS count_middle
-                FROM ProductRatings
-                WHERE (count_1 + count_5) > (count_2 + count_3 + count_4) * 2
-                    AND count_1 > 0
-                    AND count_5 > 0
-            )
-            SELECT
-                pp.IDUV AS Vendedor,
-                COUNT(pp.IDProd) AS Productos_Polarizados,
-                AVG(pp.count_1) AS Promedio_1_estrella,
-                AVG(pp.count_5) AS Promedio_5_estrella,
-                AVG(pp.count_middle) AS Promedio_medio
-            FROM PolarizedProducts pp
-            GROUP BY pp.IDUV
-            HAVING COUNT(pp.IDProd) >= 2
-            ORDER BY Productos_Polarizados DESC
-    """
-    with st.expander("Query Code"):
-        st.code(query_b)
-    cursor.execute(query_b)
-
-    pattern2 = cursor.fetchall()
-    if pattern2:
-        df_pattern2 = pd.DataFrame(
-            pattern2,
-            columns=[
-                "ID Vendedor",
-                "Productos Polarizados",
-                "Promedio 1 estrella",
-                "Promedio 5 estrellas",
-                "Promedio central",
-            ],
-        )
+
+    pattern2 = seller_stats.polarized_ratings(features)
+    if not pattern2.empty:
+        df_pattern2 = pattern2[
+            [
+                "Vendedor",
+                "Productos_Polarizados",
+                "Promedio_1_estrella",
+                "Promedio_5_estrella",
+                "Promedio_medio",
+            ]
+        ]
+        df_pattern2.columns = [
+            "ID Vendedor",
+            "Productos Polarizados",
+            "Promedio 1 estrella",
+            "Promedio 5 estrellas",
+            "Promedio central",
+        ]
         st.dataframe(df_pattern2, use_container_width=True)
     else:
         no_anomaly_found()
@@ -1202,16 +1081,6 @@ def handle_query_anomalous_patterns():
 
     st.markdown("## 👥 Patrón 3: Patrones de Compradores")
 
-    query_c = """
-        SELECT
-            IDUV AS Vendedor,
-            COUNT(DISTINCT IDUC) AS Compradores_Unicos
-        FROM Compra
-        GROUP BY IDUV
-        HAVING Compradores_Unicos >= %s AND Compradores_Unicos <= %s
-        ORDER BY Compradores_Unicos ASC
-    """
-
     col1, col2 = st.columns(2)
     with col1:
         unique_buyers_lower = st.number_input(
@@ -1221,79 +1090,25 @@ def handle_query_anomalous_patterns():
         unique_buyers_upper = st.number_input(
             "Máximo de Compradores Únicos", value=50, step=1
         )
-    with st.expander("Query Code"):
-        st.code(query_c)
-    cursor.execute(query_c, (unique_buyers_lower, unique_buyers_upper))
-
-    pattern3 = cursor.fetchall()
-    if pattern3:
-        df_pattern3 = pd.DataFrame(
-            pattern3,
-            columns=["ID Vendedor", "Compradores Únicos"],
-        )
+
+    pattern3 = seller_stats.unique_buyers(
+        features, unique_buyers_lower, unique_buyers_upper
+    )
+    if not pattern3.empty:
+        df_pattern3 = pattern3[["Vendedor", "Compradores_Unicos"]]
+        df_pattern3.columns = ["ID Vendedor", "Compradores Únicos"]
         st.dataframe(df_pattern3, use_container_width=True, height=300)
 
     st.divider()
     # st.markdown("### 🎯 Resumen de Hallazgos")
 
-    suspicious_sellers = {}
-
-    for seller in pattern1[:5]:
-        seller_id = seller[0]
-        if seller_id not in suspicious_sellers:
-            suspicious_sellers[seller_id] = {"Patrones": [], "Evidencias": []}
-        suspicious_sellers[seller_id]["Patrones"].append("Alta variación de precios")
-        suspicious_sellers[seller_id]["Evidencias"].append(
-            f"Desviación: {seller[3]:.2f}"
-        )
-
-    for seller in pattern2[:5]:
-        seller_id = seller[0]
-        if seller_id not in suspicious_sellers:
-            suspicious_sellers[seller_id] = {"Patrones": [], "Evidencias": []}
-        suspicious_sellers[seller_id]["Patrones"].append(
-            "Calificaciones inconsistentes"
-        )
-        suspicious_sellers[seller_id]["Evidencias"].append(
-            f"Desv. calificación: {seller[3]:.2f}"
-        )
-
-    for seller in pattern3[:5]:
-        seller_id = seller[0]
-        if seller_id not in suspicious_sellers:
-            suspicious_sellers[seller_id] = {"Patrones": [], "Evidencias": []}
-        suspicious_sellers[seller_id]["Patrones"].append("Pocos compradores únicos")
-        suspicious_sellers[seller_id]["Evidencias"].append(f"Compradores: {seller[1]}")
-
-    if suspicious_sellers:
-        suspicious_list = []
-        for seller_id, data in suspicious_sellers.items():
-            cursor.execute("SELECT Nombre FROM Usuario WHERE IDU = %s", (seller_id,))
-            seller_name = cursor.fetchone()
-            name = seller_name[0] if seller_name else f"Vendedor {seller_id}"
-
-            suspicious_list.append(
-                {
-                    "ID Vendedor": seller_id,
-                    "Nombre": name,
-                    "Patrones Detectados": len(data["Patrones"]),
-                    "Evidencias": "; ".join(data["Evidencias"]),
-                }
-            )
-
-        df_suspicious = pd.DataFrame(suspicious_list)
-        df_suspicious = df_suspicious.sort_values(
-            "Patrones Detectados", ascending=False
-        )
-
+    df_suspicious = seller_stats.suspicious_sellers(pattern1, pattern2, pattern3)
+    if not df_suspicious.empty:
         st.markdown("## 🔴 Vendedores con Patrones Sospechosos")
         st.dataframe(df_suspicious, use_container_width=True)
     else:
         st.success("✅ No se encontraron patrones anómalos significativos.")
 
-    cursor.close()
-    conn.close()
-
 
 def show_query_selector(selected_query=None):
     st.markdown("## 📊 Selector de Consultas SQL")
@@ -1334,7 +1149,7 @@ def show_query_selector(selected_query=None):
     elif selected_query == "q":
         handle_query_anomalous_patterns()
     else:
-        query_text = queries.queries[selected_query]
+        query_text = queries.registry[selected_query].sql
         with st.expander("Query Code"):
             st.code(query_text)
         st.session_state.query_results = mysql_get_query_results(selected_query)
@@ -995,3 +995,670 @@ INSERT INTO Contribucion_Video (IDProd, Fecha, IDV) VALUES
 (27, '2023-08-07', 49),
 (48, '2023-07-20', 50);
 
+
+-- Indices para las reacciones de una publicacion por dia (triggers de
+-- ActividadDiaria), la actividad por usuario y fecha, y las ventas por planta
+-- alrededor de una fecha
+CREATE INDEX idx_reaccionar_usuario_fecha ON Reaccionar(IDU, Fecha);
+CREATE INDEX idx_reaccionar_pub_fecha ON Reaccionar(IDPub, Fecha);
+CREATE INDEX idx_compra_usuario_fecha ON Compra(IDUC, Fecha);
+CREATE INDEX idx_compra_producto_fecha ON Compra(IDProd, Fecha);
+CREATE INDEX idx_contribucion_usuario_fecha ON Contribucion(IDU, Fecha);
+
+-- Orden estable de los comentarios para migrarlos a Neo4j. Se agrega despues de
+-- insertar los datos para que siga el orden de la llave (IDU, IDPub).
+ALTER TABLE Comentar ADD COLUMN Secuencia INT NOT NULL AUTO_INCREMENT UNIQUE;
+
+-- Actividad agregada por usuario y dia. Los triggers actividad_* suman deltas a
+-- las celdas que toca cada fila, salvo Comentarios (publicaciones comentadas con
+-- reacciones ese dia), que recalcula RefrescarComentariosActividad() a partir de
+-- CambioActividadComentario. Se reconstruye completa con
+-- CALL ReconstruirActividadDiaria()
+CREATE TABLE IF NOT EXISTS ActividadDiaria(
+    IDU INT NOT NULL,
+    Dia DATE NOT NULL,
+    Publicaciones INT NOT NULL DEFAULT 0,
+    ReaccionesDadas INT NOT NULL DEFAULT 0,
+    ReaccionesDadasPositivas INT NOT NULL DEFAULT 0,
+    ReaccionesDadasNegativas INT NOT NULL DEFAULT 0,
+    ReaccionesRecibidas INT NOT NULL DEFAULT 0,
+    ReaccionesRecibidasPositivas INT NOT NULL DEFAULT 0,
+    ReaccionesRecibidasNegativas INT NOT NULL DEFAULT 0,
+    PesoReaccionesRecibidas DOUBLE NOT NULL DEFAULT 0,
+    Comentarios INT NOT NULL DEFAULT 0,
+    Compras INT NOT NULL DEFAULT 0,
+    Unidades INT NOT NULL DEFAULT 0,
+    Monto DOUBLE NOT NULL DEFAULT 0,
+    Contribuciones INT NOT NULL DEFAULT 0,
+    PRIMARY KEY(IDU, Dia),
+    FOREIGN KEY cal_usuario(IDU) REFERENCES Usuario(IDU) ON DELETE CASCADE ON UPDATE CASCADE
+);
+
+-- Cambios pendientes para la columna Comentarios de ActividadDiaria: una fila con
+-- Dia cuando una publicacion gana o pierde su primera reaccion de ese dia, o con
+-- IDU cuando ese usuario agrega o elimina un comentario en la publicacion
+CREATE TABLE IF NOT EXISTS CambioActividadComentario(
+    Secuencia BIGINT NOT NULL AUTO_INCREMENT,
+    IDPub INT NOT NULL,
+    IDU INT,
+    Dia DATE,
+    PRIMARY KEY(Secuencia)
+);
+
+-- Puntaje de interacciones de cada autor de publicaciones. Lo mantienen los
+-- triggers influencer_* y se reconstruye con CALL ReconstruirInfluencerScore()
+CREATE TABLE IF NOT EXISTS InfluencerScore(
+    IDU INT NOT NULL,
+    PesoReacciones DOUBLE NOT NULL DEFAULT 0,
+    PesoComentarios INT NOT NULL DEFAULT 0,
+    Puntaje DOUBLE AS (PesoReacciones + PesoComentarios) STORED,
+    PRIMARY KEY(IDU),
+    INDEX idx_influencer_puntaje(Puntaje),
+    FOREIGN KEY cal_usuario(IDU) REFERENCES Usuario(IDU) ON DELETE CASCADE ON UPDATE CASCADE
+);
+
+-- Periodo al que pertenece una fecha según la granularidad del análisis
+-- (fin de semana ISO para 'Semanal', fin de mes para 'Mensual')
+DROP FUNCTION IF EXISTS PeriodoActividad;
+DROP FUNCTION IF EXISTS PesoReaccion;
+DROP PROCEDURE IF EXISTS AnalizarUsuario;
+DROP PROCEDURE IF EXISTS SumarActividad;
+DROP PROCEDURE IF EXISTS SumarReaccionActividad;
+DROP PROCEDURE IF EXISTS RefrescarComentariosActividad;
+DROP PROCEDURE IF EXISTS ReconstruirActividadDiaria;
+DROP PROCEDURE IF EXISTS SumarPuntajeInfluencer;
+DROP PROCEDURE IF EXISTS ReconstruirInfluencerScore;
+
+DELIMITER //
+
+CREATE FUNCTION PeriodoActividad(fecha DATE, granularidad VARCHAR(10))
+RETURNS DATE
+DETERMINISTIC
+NO SQL
+BEGIN
+    RETURN CASE granularidad
+        WHEN 'Semanal' THEN DATE_ADD(fecha, INTERVAL 6 - WEEKDAY(fecha) DAY)
+        WHEN 'Mensual' THEN LAST_DAY(fecha)
+        ELSE fecha
+    END;
+END //
+
+-- Peso de una reaccion en el puntaje de interacciones de su autor
+CREATE FUNCTION PesoReaccion(tipo CHAR(21))
+RETURNS DOUBLE
+DETERMINISTIC
+NO SQL
+BEGIN
+    RETURN CASE tipo
+        WHEN 'Me gusta' THEN 1
+        WHEN 'Me encanta' THEN 2
+        WHEN 'Me asombra' THEN 1.5
+        ELSE 0
+    END;
+END //
+
+-- Análisis de actividad de un usuario. Retorna, en orden, las series de
+-- publicaciones, reacciones dadas, reacciones recibidas, comentarios, compras y
+-- contribuciones agrupadas por periodo a partir de ActividadDiaria, y una fila
+-- con las plantas más compradas y contribuidas.
+CREATE PROCEDURE AnalizarUsuario(
+    IN p_idu INT,
+    IN p_inicio DATE,
+    IN p_fin DATE,
+    IN p_granularidad VARCHAR(10)
+)
+BEGIN
+    SELECT
+        PeriodoActividad(Dia, p_granularidad) AS Periodo,
+        CAST(SUM(Publicaciones) AS SIGNED) AS Publicaciones
+    FROM ActividadDiaria
+    WHERE IDU = p_idu
+        AND Dia BETWEEN p_inicio AND p_fin
+        AND Publicaciones > 0
+    GROUP BY Periodo
+    ORDER BY Periodo;
+
+    SELECT
+        PeriodoActividad(Dia, p_granularidad) AS Periodo,
+        CAST(SUM(ReaccionesDadas) AS SIGNED) AS Reacciones_Dadas,
+        CAST(SUM(ReaccionesDadasPositivas) AS SIGNED) AS Positivas,
+        CAST(SUM(ReaccionesDadasNegativas) AS SIGNED) AS Negativas
+    FROM ActividadDiaria
+    WHERE IDU = p_idu
+        AND Dia BETWEEN p_inicio AND p_fin
+        AND ReaccionesDadas > 0
+    GROUP BY Periodo
+    ORDER BY Periodo;
+
+    SELECT
+        PeriodoActividad(Dia, p_granularidad) AS Periodo,
+        CAST(SUM(ReaccionesRecibidas) AS SIGNED) AS Reacciones_Recibidas,
+        CAST(SUM(ReaccionesRecibidasPositivas) AS SIGNED) AS Positivas,
+        CAST(SUM(ReaccionesRecibidasNegativas) AS SIGNED) AS Negativas
+    FROM ActividadDiaria
+    WHERE IDU = p_idu
+        AND Dia BETWEEN p_inicio AND p_fin
+        AND ReaccionesRecibidas > 0
+    GROUP BY Periodo
+    ORDER BY Periodo;
+
+    SELECT
+        PeriodoActividad(Dia, p_granularidad) AS Periodo,
+        CAST(SUM(Comentarios) AS SIGNED) AS Comentarios
+    FROM ActividadDiaria
+    WHERE IDU = p_idu
+        AND Dia BETWEEN p_inicio AND p_fin
+        AND Comentarios > 0
+    GROUP BY Periodo
+    ORDER BY Periodo;
+
+    SELECT
+        PeriodoActividad(Dia, p_granularidad) AS Periodo,
+        CAST(SUM(Compras) AS SIGNED) AS Compras,
+        CAST(SUM(Unidades) AS SIGNED) AS Unidades,
+        SUM(Monto) AS Monto
+    FROM ActividadDiaria
+    WHERE IDU = p_idu
+        AND Dia BETWEEN p_inicio AND p_fin
+        AND Compras > 0
+    GROUP BY Periodo
+    ORDER BY Periodo;
+
+    SELECT
+        PeriodoActividad(Dia, p_granularidad) AS Periodo,
+        CAST(SUM(Contribuciones) AS SIGNED) AS Contribuciones
+    FROM ActividadDiaria
+    WHERE IDU = p_idu
+        AND Dia BETWEEN p_inicio AND p_fin
+        AND Contribuciones > 0
+    GROUP BY Periodo
+    ORDER BY Periodo;
+
+    SELECT
+        (
+            SELECT pr.Nombre
+            FROM Compra c
+            JOIN Producto pr ON c.IDProd = pr.IDProd
+            WHERE c.IDUC = p_idu
+                AND c.Fecha BETWEEN p_inicio AND p_fin
+            GROUP BY c.IDProd, pr.Nombre
+            ORDER BY SUM(c.Cantidad) DESC
+            LIMIT 1
+        ) AS Planta_Mas_Comprada,
+        (
+            SELECT pr.Nombre
+            FROM Contribucion c
+            JOIN Producto pr ON c.IDProd = pr.IDProd
+            WHERE c.IDU = p_idu
+                AND c.Fecha BETWEEN p_inicio AND p_fin
+            GROUP BY c.IDProd, pr.Nombre
+            ORDER BY COUNT(*) DESC
+            LIMIT 1
+        ) AS Planta_Mas_Contribuida;
+END //
+
+-- Suma deltas a la fila de ActividadDiaria de un usuario en un dia. Las filas
+-- que quedan sin actividad se eliminan para que la tabla solo contenga dias con
+-- datos.
+CREATE PROCEDURE SumarActividad(
+    IN p_idu INT,
+    IN p_dia DATE,
+    IN p_publicaciones INT,
+    IN p_dadas INT,
+    IN p_dadas_positivas INT,
+    IN p_dadas_negativas INT,
+    IN p_recibidas INT,
+    IN p_recibidas_positivas INT,
+    IN p_recibidas_negativas INT,
+    IN p_peso DOUBLE,
+    IN p_compras INT,
+    IN p_unidades INT,
+    IN p_monto DOUBLE,
+    IN p_contribuciones INT
+)
+BEGIN
+    INSERT INTO ActividadDiaria (
+        IDU, Dia, Publicaciones,
+        ReaccionesDadas, ReaccionesDadasPositivas, ReaccionesDadasNegativas,
+        ReaccionesRecibidas, ReaccionesRecibidasPositivas, ReaccionesRecibidasNegativas,
+        PesoReaccionesRecibidas,
+        Compras, Unidades, Monto,
+        Contribuciones
+    ) VALUES (
+        p_idu, p_dia, p_publicaciones,
+        p_dadas, p_dadas_positivas, p_dadas_negativas,
+        p_recibidas, p_recibidas_positivas, p_recibidas_negativas,
+        p_peso,
+        p_compras, p_unidades, p_monto,
+        p_contribuciones
+    )
+    ON DUPLICATE KEY UPDATE
+        Publicaciones = Publicaciones + p_publicaciones,
+        ReaccionesDadas = ReaccionesDadas + p_dadas,
+        ReaccionesDadasPositivas = ReaccionesDadasPositivas + p_dadas_positivas,
+        ReaccionesDadasNegativas = ReaccionesDadasNegativas + p_dadas_negativas,
+        ReaccionesRecibidas = ReaccionesRecibidas + p_recibidas,
+        ReaccionesRecibidasPositivas = ReaccionesRecibidasPositivas + p_recibidas_positivas,
+        ReaccionesRecibidasNegativas = ReaccionesRecibidasNegativas + p_recibidas_negativas,
+        PesoReaccionesRecibidas = PesoReaccionesRecibidas + p_peso,
+        Compras = Compras + p_compras,
+        Unidades = Unidades + p_unidades,
+        Monto = Monto + p_monto,
+        Contribuciones = Contribuciones + p_contribuciones;
+
+    DELETE FROM ActividadDiaria
+    WHERE IDU = p_idu AND Dia = p_dia
+        AND Publicaciones = 0 AND ReaccionesDadas = 0 AND ReaccionesRecibidas = 0
+        AND Comentarios = 0 AND Compras = 0 AND Contribuciones = 0;
+END //
+
+-- Suma (p_signo = 1) o resta (p_signo = -1) una reaccion en las celdas de quien
+-- reacciona y del autor de la publicacion. p_cambia_dia indica que es la
+-- primera o la ultima reaccion de la publicacion ese dia: solo entonces cambian
+-- las publicaciones del autor y los comentarios de ese dia.
+CREATE PROCEDURE SumarReaccionActividad(
+    IN p_idu INT,
+    IN p_idpub INT,
+    IN p_tipo CHAR(21),
+    IN p_dia DATE,
+    IN p_signo INT,
+    IN p_cambia_dia BOOLEAN
+)
+BEGIN
+    DECLARE v_autor INT;
+    DECLARE v_positiva INT DEFAULT p_tipo IN ('Me gusta', 'Me encanta', 'Me asombra', 'Me divierte');
+    DECLARE v_negativa INT DEFAULT p_tipo IN ('Me enoja', 'Me entristece');
+
+    SELECT IDU INTO v_autor FROM Publicacion WHERE IDPub = p_idpub;
+
+    CALL SumarActividad(
+        p_idu, p_dia, 0,
+        p_signo, p_signo * v_positiva, p_signo * v_negativa,
+        0, 0, 0, 0,
+        0, 0, 0,
+        0
+    );
+    CALL SumarActividad(
+        v_autor, p_dia, IF(p_cambia_dia, p_signo, 0),
+        0, 0, 0,
+        p_signo, p_signo * v_positiva, p_signo * v_negativa, p_signo * PesoReaccion(p_tipo),
+        0, 0, 0,
+        0
+    );
+
+    IF p_cambia_dia THEN
+        INSERT INTO CambioActividadComentario (IDPub, Dia) VALUES (p_idpub, p_dia);
+    END IF;
+END //
+
+-- Recalcula la columna Comentarios de las celdas afectadas por los cambios
+-- registrados en CambioActividadComentario hasta la ultima Secuencia leida al
+-- empezar. Los cambios que lleguen mientras tanto quedan para la siguiente
+-- llamada.
+CREATE PROCEDURE RefrescarComentariosActividad()
+BEGIN
+    DECLARE v_hasta BIGINT;
+
+    SELECT MAX(Secuencia) INTO v_hasta FROM CambioActividadComentario;
+
+    IF v_hasta IS NOT NULL THEN
+        DROP TEMPORARY TABLE IF EXISTS CeldasComentarios;
+        CREATE TEMPORARY TABLE CeldasComentarios(
+            IDU INT NOT NULL,
+            Dia DATE NOT NULL,
+            PRIMARY KEY(IDU, Dia)
+        );
+
+        -- Dias en que una publicacion empezo o dejo de tener reacciones
+        INSERT IGNORE INTO CeldasComentarios
+        SELECT c.IDU, l.Dia
+        FROM CambioActividadComentario l
+        JOIN Comentar c ON c.IDPub = l.IDPub
+        WHERE l.Secuencia <= v_hasta AND l.Dia IS NOT NULL;
+
+        -- Comentarios agregados o eliminados: los dias con reacciones de la
+        -- publicacion y los dias en que el usuario ya tenia comentarios
+        INSERT IGNORE INTO CeldasComentarios
+        SELECT l.IDU, r.Fecha
+        FROM CambioActividadComentario l
+        JOIN Reaccionar r ON r.IDPub = l.IDPub
+        WHERE l.Secuencia <= v_hasta AND l.IDU IS NOT NULL;
+
+        INSERT IGNORE INTO CeldasComentarios
+        SELECT a.IDU, a.Dia
+        FROM CambioActividadComentario l
+        JOIN ActividadDiaria a ON a.IDU = l.IDU
+        WHERE l.Secuencia <= v_hasta AND a.Comentarios > 0;
+
+        INSERT INTO ActividadDiaria (IDU, Dia, Comentarios)
+        SELECT * FROM (
+            SELECT
+                t.IDU,
+                t.Dia,
+                (
+                    SELECT COUNT(DISTINCT c.IDPub)
+                    FROM Comentar c
+                    JOIN Reaccionar r ON c.IDPub = r.IDPub
+                    WHERE c.IDU = t.IDU AND r.Fecha = t.Dia
+                ) AS Cantidad
+            FROM CeldasComentarios t
+        ) celdas
+        ON DUPLICATE KEY UPDATE Comentarios = celdas.Cantidad;
+
+        DELETE a FROM ActividadDiaria a
+        JOIN CeldasComentarios t ON a.IDU = t.IDU AND a.Dia = t.Dia
+        WHERE a.Publicaciones = 0 AND a.ReaccionesDadas = 0 AND a.ReaccionesRecibidas = 0
+            AND a.Comentarios = 0 AND a.Compras = 0 AND a.Contribuciones = 0;
+
+        DELETE FROM CambioActividadComentario WHERE Secuencia <= v_hasta;
+        DROP TEMPORARY TABLE CeldasComentarios;
+    END IF;
+END //
+
+-- Reconstruye ActividadDiaria desde las tablas base
+CREATE PROCEDURE ReconstruirActividadDiaria()
+BEGIN
+    DELETE FROM CambioActividadComentario;
+    DELETE FROM ActividadDiaria;
+
+    INSERT INTO ActividadDiaria
+    SELECT
+        IDU, Dia,
+        SUM(Publicaciones),
+        SUM(ReaccionesDadas), SUM(ReaccionesDadasPositivas), SUM(ReaccionesDadasNegativas),
+        SUM(ReaccionesRecibidas), SUM(ReaccionesRecibidasPositivas), SUM(ReaccionesRecibidasNegativas),
+        SUM(PesoReaccionesRecibidas),
+        SUM(Comentarios),
+        SUM(Compras), SUM(Unidades), SUM(Monto),
+        SUM(Contribuciones)
+    FROM (
+        SELECT p.IDU, r.Fecha AS Dia, COUNT(DISTINCT p.IDPub) AS Publicaciones,
+            0 AS ReaccionesDadas, 0 AS ReaccionesDadasPositivas, 0 AS ReaccionesDadasNegativas,
+            0 AS ReaccionesRecibidas, 0 AS ReaccionesRecibidasPositivas, 0 AS ReaccionesRecibidasNegativas,
+            0 AS PesoReaccionesRecibidas,
+            0 AS Comentarios, 0 AS Compras, 0 AS Unidades, 0 AS Monto, 0 AS Contribuciones
+        FROM Publicacion p
+        JOIN Reaccionar r ON p.IDPub = r.IDPub
+        GROUP BY p.IDU, r.Fecha
+
+        UNION ALL
+
+        SELECT IDU, Fecha, 0,
+            COUNT(*),
+            COUNT(CASE WHEN Tipo IN ('Me gusta', 'Me encanta', 'Me asombra', 'Me divierte') THEN 1 END),
+            COUNT(CASE WHEN Tipo IN ('Me enoja', 'Me entristece') THEN 1 END),
+            0, 0, 0, 0, 0, 0, 0, 0, 0
+        FROM Reaccionar
+        GROUP BY IDU, Fecha
+
+        UNION ALL
+
+        SELECT p.IDU, r.Fecha, 0, 0, 0, 0,
+            COUNT(*),
+            COUNT(CASE WHEN r.Tipo IN ('Me gusta', 'Me encanta', 'Me asombra', 'Me divierte') THEN 1 END),
+            COUNT(CASE WHEN r.Tipo IN ('Me enoja', 'Me entristece') THEN 1 END),
+            SUM(PesoReaccion(r.Tipo)),
+            0, 0, 0, 0, 0
+        FROM Reaccionar r
+        JOIN Publicacion p ON r.IDPub = p.IDPub
+        GROUP BY p.IDU, r.Fecha
+
+        UNION ALL
+
+        SELECT c.IDU, r.Fecha, 0, 0, 0, 0, 0, 0, 0, 0,
+            COUNT(DISTINCT c.IDPub),
+            0, 0, 0, 0
+        FROM Comentar c
+        JOIN Reaccionar r ON c.IDPub = r.IDPub
+        GROUP BY c.IDU, r.Fecha
+
+        UNION ALL
+
+        SELECT IDUC, Fecha, 0, 0, 0, 0, 0, 0, 0, 0, 0,
+            COUNT(*), SUM(Cantidad), SUM(Precio * Cantidad),
+            0
+        FROM Compra
+        GROUP BY IDUC, Fecha
+
+        UNION ALL
+
+        SELECT IDU, Fecha, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
+            COUNT(*)
+        FROM Contribucion
+        GROUP BY IDU, Fecha
+    ) actividad
+    GROUP BY IDU, Dia;
+END //
+
+CREATE TRIGGER actividad_reaccionar_insert
+AFTER INSERT ON Reaccionar
+FOR EACH ROW
+BEGIN
+    CALL SumarReaccionActividad(
+        NEW.IDU, NEW.IDPub, NEW.Tipo, NEW.Fecha, 1,
+        NOT EXISTS (
+            SELECT 1 FROM Reaccionar
+            WHERE IDPub = NEW.IDPub AND Fecha = NEW.Fecha AND IDU <> NEW.IDU
+        )
+    );
+END //
+
+CREATE TRIGGER actividad_reaccionar_update
+AFTER UPDATE ON Reaccionar
+FOR EACH ROW
+BEGIN
+    DECLARE v_mismo_dia BOOLEAN;
+    SET v_mismo_dia = OLD.IDPub = NEW.IDPub AND OLD.Fecha = NEW.Fecha;
+
+    CALL SumarReaccionActividad(
+        OLD.IDU, OLD.IDPub, OLD.Tipo, OLD.Fecha, -1,
+        NOT v_mismo_dia AND NOT EXISTS (
+            SELECT 1 FROM Reaccionar WHERE IDPub = OLD.IDPub AND Fecha = OLD.Fecha
+        )
+    );
+    CALL SumarReaccionActividad(
+        NEW.IDU, NEW.IDPub, NEW.Tipo, NEW.Fecha, 1,
+        NOT v_mismo_dia AND NOT EXISTS (
+            SELECT 1 FROM Reaccionar
+            WHERE IDPub = NEW.IDPub AND Fecha = NEW.Fecha AND IDU <> NEW.IDU
+        )
+    );
+END //
+
+CREATE TRIGGER actividad_reaccionar_delete
+AFTER DELETE ON Reaccionar
+FOR EACH ROW
+BEGIN
+    CALL SumarReaccionActividad(
+        OLD.IDU, OLD.IDPub, OLD.Tipo, OLD.Fecha, -1,
+        NOT EXISTS (
+            SELECT 1 FROM Reaccionar WHERE IDPub = OLD.IDPub AND Fecha = OLD.Fecha
+        )
+    );
+END //
+
+CREATE TRIGGER actividad_comentar_insert
+AFTER INSERT ON Comentar
+FOR EACH ROW
+BEGIN
+    INSERT INTO CambioActividadComentario (IDPub, IDU) VALUES (NEW.IDPub, NEW.IDU);
+END //
+
+CREATE TRIGGER actividad_comentar_update
+AFTER UPDATE ON Comentar
+FOR EACH ROW
+BEGIN
+    IF OLD.IDU <> NEW.IDU OR OLD.IDPub <> NEW.IDPub THEN
+        INSERT INTO CambioActividadComentario (IDPub, IDU)
+        VALUES (OLD.IDPub, OLD.IDU), (NEW.IDPub, NEW.IDU);
+    END IF;
+END //
+
+CREATE TRIGGER actividad_comentar_delete
+AFTER DELETE ON Comentar
+FOR EACH ROW
+BEGIN
+    INSERT INTO CambioActividadComentario (IDPub, IDU) VALUES (OLD.IDPub, OLD.IDU);
+END //
+
+CREATE TRIGGER actividad_compra_insert
+AFTER INSERT ON Compra
+FOR EACH ROW
+BEGIN
+    CALL SumarActividad(
+        NEW.IDUC, NEW.Fecha, 0, 0, 0, 0, 0, 0, 0, 0,
+        1, NEW.Cantidad, NEW.Precio * NEW.Cantidad, 0
+    );
+END //
+
+CREATE TRIGGER actividad_compra_update
+AFTER UPDATE ON Compra
+FOR EACH ROW
+BEGIN
+    CALL SumarActividad(
+        OLD.IDUC, OLD.Fecha, 0, 0, 0, 0, 0, 0, 0, 0,
+        -1, -OLD.Cantidad, -OLD.Precio * OLD.Cantidad, 0
+    );
+    CALL SumarActividad(
+        NEW.IDUC, NEW.Fecha, 0, 0, 0, 0, 0, 0, 0, 0,
+        1, NEW.Cantidad, NEW.Precio * NEW.Cantidad, 0
+    );
+END //
+
+CREATE TRIGGER actividad_compra_delete
+AFTER DELETE ON Compra
+FOR EACH ROW
+BEGIN
+    CALL SumarActividad(
+        OLD.IDUC, OLD.Fecha, 0, 0, 0, 0, 0, 0, 0, 0,
+        -1, -OLD.Cantidad, -OLD.Precio * OLD.Cantidad, 0
+    );
+END //
+
+CREATE TRIGGER actividad_contribucion_insert
+AFTER INSERT ON Contribucion
+FOR EACH ROW
+BEGIN
+    CALL SumarActividad(NEW.IDU, NEW.Fecha, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1);
+END //
+
+CREATE TRIGGER actividad_contribucion_update
+AFTER UPDATE ON Contribucion
+FOR EACH ROW
+BEGIN
+    CALL SumarActividad(OLD.IDU, OLD.Fecha, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, -1);
+    CALL SumarActividad(NEW.IDU, NEW.Fecha, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1);
+END //
+
+CREATE TRIGGER actividad_contribucion_delete
+AFTER DELETE ON Contribucion
+FOR EACH ROW
+BEGIN
+    CALL SumarActividad(OLD.IDU, OLD.Fecha, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, -1);
+END //
+
+-- Suma pesos al puntaje del autor de una publicacion
+CREATE PROCEDURE SumarPuntajeInfluencer(
+    IN p_idpub INT,
+    IN p_reacciones DOUBLE,
+    IN p_comentarios INT
+)
+BEGIN
+    INSERT INTO InfluencerScore (IDU, PesoReacciones, PesoComentarios)
+    SELECT IDU, p_reacciones, p_comentarios
+    FROM Publicacion
+    WHERE IDPub = p_idpub
+    ON DUPLICATE KEY UPDATE
+        PesoReacciones = PesoReacciones + p_reacciones,
+        PesoComentarios = PesoComentarios + p_comentarios;
+END //
+
+-- Reconstruye InfluencerScore desde las tablas base. Cada publicacion con al
+-- menos un comentario suma 2 puntos a su autor.
+CREATE PROCEDURE ReconstruirInfluencerScore()
+BEGIN
+    DELETE FROM InfluencerScore;
+
+    INSERT INTO InfluencerScore (IDU, PesoReacciones, PesoComentarios)
+    SELECT
+        p.IDU,
+        COALESCE(SUM(reacciones.Peso), 0),
+        COUNT(comentadas.IDPub) * 2
+    FROM Publicacion p
+    LEFT JOIN (
+        SELECT IDPub, SUM(PesoReaccion(Tipo)) AS Peso
+        FROM Reaccionar
+        GROUP BY IDPub
+    ) reacciones ON p.IDPub = reacciones.IDPub
+    LEFT JOIN (
+        SELECT DISTINCT IDPub
+        FROM Comentar
+    ) comentadas ON p.IDPub = comentadas.IDPub
+    GROUP BY p.IDU;
+END //
+
+CREATE TRIGGER influencer_publicacion_insert
+AFTER INSERT ON Publicacion
+FOR EACH ROW
+BEGIN
+    INSERT IGNORE INTO InfluencerScore (IDU) VALUES (NEW.IDU);
+END //
+
+CREATE TRIGGER influencer_reaccionar_insert
+AFTER INSERT ON Reaccionar
+FOR EACH ROW
+BEGIN
+    CALL SumarPuntajeInfluencer(NEW.IDPub, PesoReaccion(NEW.Tipo), 0);
+END //
+
+CREATE TRIGGER influencer_reaccionar_update
+AFTER UPDATE ON Reaccionar
+FOR EACH ROW
+BEGIN
+    CALL SumarPuntajeInfluencer(OLD.IDPub, -PesoReaccion(OLD.Tipo), 0);
+    CALL SumarPuntajeInfluencer(NEW.IDPub, PesoReaccion(NEW.Tipo), 0);
+END //
+
+CREATE TRIGGER influencer_reaccionar_delete
+AFTER DELETE ON Reaccionar
+FOR EACH ROW
+BEGIN
+    CALL SumarPuntajeInfluencer(OLD.IDPub, -PesoReaccion(OLD.Tipo), 0);
+END //
+
+CREATE TRIGGER influencer_comentar_insert
+AFTER INSERT ON Comentar
+FOR EACH ROW
+BEGIN
+    IF (SELECT COUNT(*) FROM Comentar WHERE IDPub = NEW.IDPub) = 1 THEN
+        CALL SumarPuntajeInfluencer(NEW.IDPub, 0, 2);
+    END IF;
+END //
+
+CREATE TRIGGER influencer_comentar_update
+AFTER UPDATE ON Comentar
+FOR EACH ROW
+BEGIN
+    IF OLD.IDPub <> NEW.IDPub THEN
+        IF NOT EXISTS (SELECT 1 FROM Comentar WHERE IDPub = OLD.IDPub) THEN
+            CALL SumarPuntajeInfluencer(OLD.IDPub, 0, -2);
+        END IF;
+        IF (SELECT COUNT(*) FROM Comentar WHERE IDPub = NEW.IDPub) = 1 THEN
+            CALL SumarPuntajeInfluencer(NEW.IDPub, 0, 2);
+        END IF;
+    END IF;
+END //
+
+CREATE TRIGGER influencer_comentar_delete
+AFTER DELETE ON Comentar
+FOR EACH ROW
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM Comentar WHERE IDPub = OLD.IDPub) THEN
+        CALL SumarPuntajeInfluencer(OLD.IDPub, 0, -2);
+    END IF;
+END //
+
+DELIMITER ;
+
+CALL ReconstruirActividadDiaria();
+CALL ReconstruirInfluencerScore();